@@ -0,0 +1,132 @@
+""" This module contains the deadline bounded acquisition of the device readings of a tick.
+
+**Description:**
+
+    Every device of the control loop is read by a worker of a ThreadPoolExecutor. The control
+    loop waits for the readings only until the deadline budget of the tick. A device which
+    misses the deadline does not delay the tick: its last good value stays available, tagged
+    with its age, and the read keeps running in the background. Its result is applied when it
+    arrives, and no new read of the device is started before it has finished.
+    take() returns each value once, e.g. for the data logs, value and age() are the last good
+    value for decisions like the control of the inverter, which declare the maximum age they
+    accept. Every value keeps the tick on which its read was started (TICK of submit), so a late
+    value is logged with the time of its own tick and not with the tick that takes it. A read that raises or returns None is a failure, it leaves the last good value untouched.
+
+"""
+import concurrent.futures
+import threading
+import time
+
+
+# EMBEDDING Acquisition CLASS ----------------------------------------------------
+
+class Acquisition(object):
+    """This class implements the reading of one device with the last good value and its age"""
+
+    def __init__(self, NAME, BREAKER=None):
+        ''' Constructor for this class. '''
+        self.NAME = NAME
+        self.BREAKER = BREAKER  # Circuit_Breaker of the device, or None
+        self._lock = threading.Lock()
+        self._future = None
+        self._future_tick = None
+        self._new = False
+        self._error = None
+        self.value = None  # last good value
+        self.time = None  # time.monotonic of the last good value
+        self.tick = None  # TICK of the read of the last good value
+        self.late = 0  # ticks in which the read missed the deadline
+
+    def busy(self):
+        """Returns True if a read is still running."""
+        future = self._future
+        return future is not None and not future.done()
+
+    def submit(self, POLLER, FUNCTION, *ARGS, TICK=None, **KWARGS):
+        """This function starts a read of the device, unless the previous read is still running or
+        the circuit breaker of the device is open.
+
+        Args:
+            POLLER: concurrent.futures.ThreadPoolExecutor.
+            FUNCTION: read function of the device, its arguments follow.
+            TICK: time of the tick that starts the read, e.g. returned by Tick_Scheduler.wait. Default=None
+
+        Returns: Boolean value True if a read was started
+
+        """
+        if self.busy() or (self.BREAKER is not None and not self.BREAKER.allow()):
+            return False
+        future = POLLER.submit(FUNCTION, *ARGS, **KWARGS)
+        with self._lock:
+            self._future = future
+            self._future_tick = TICK
+        future.add_done_callback(self._apply)  # applies the result as soon as it arrives
+        return True
+
+    def _apply(self, FUTURE):
+        """Applies the result of a finished read once, from the worker or from wait_readings."""
+        with self._lock:
+            if FUTURE is not self._future:
+                return
+            self._future = None
+            tick = self._future_tick
+        error = FUTURE.exception()
+        if error is None and FUTURE.result() is None:
+            error = IOError('no data from ' + self.NAME)  # read functions that print their error and return None
+        if error is not None:  # the last good value and its time are kept
+            self._error = error
+            if self.BREAKER is not None:
+                self.BREAKER.failure(error)
+            return
+        with self._lock:
+            self.value = FUTURE.result()
+            self.time = time.monotonic()
+            self.tick = tick
+            self._new = True
+        if self.BREAKER is not None:
+            self.BREAKER.success()
+
+    def age(self, NOW=None):
+        """Returns the age of the last good value in seconds, infinite if there is none."""
+        if self.time is None:
+            return float('inf')
+        return (time.monotonic() if NOW is None else NOW) - self.time
+
+    def take(self, DEFAULT=()):
+        """Returns (value, tick) if the value is new since the last take, e.g. a late result of an earlier tick, else (DEFAULT, None)."""
+        with self._lock:
+            if not self._new:
+                return list(DEFAULT), None
+            self._new = False
+            return self.value, self.tick
+
+    def take_error(self):
+        """Returns the error of the last failed read once, or None."""
+        with self._lock:
+            error, self._error = self._error, None
+            return error
+
+
+def wait_readings(READINGS, TIMEOUT):
+    """This function waits until all running reads are finished or TIMEOUT seconds have passed
+    and applies the finished results.
+
+    Args:
+        READINGS: list of Acquisition.
+        TIMEOUT: deadline budget in seconds.
+
+    Returns: list of the Acquisition that missed the deadline
+
+    """
+    futures = {}
+    for reading in READINGS:
+        future = reading._future  # None once the result was applied by the worker
+        if future is not None:
+            futures[future] = reading
+    done, pending = concurrent.futures.wait(list(futures), timeout=max(0.0, TIMEOUT))
+    for future in done:
+        futures[future]._apply(future)
+    missed = [futures[future] for future in pending]
+    for reading in missed:
+        reading.late += 1
+    return missed
@@ -0,0 +1,336 @@
+""" This module contains a columnar, compressed archive for the Pylontech US2000B BMS log.
+
+**Description:**
+
+    The archive is an alternative to the daily '.csv' files of US2000B.log_BMS. The rows are
+    buffered in memory and written in chunks of CHUNK_ROWS rows as NumPy '.npz' files, one
+    typed array per column, each compressed on its own:
+        time:           uint32 [rows], seconds since midnight
+        soc, voltage, current, temperature:
+                        float32 [rows, modules], NaN if a module is missing
+        b_status, v_status, c_status, t_status:
+                        uint8 [rows, modules], index into status_names, 0 = missing
+        status_names:   str [n], the status strings of the chunk
+    A chunk is named 'YYYY-MM-DD.NNN.npz'. The day index 'index.json' lists the chunks, rows,
+    and modules of every day, so loading a time range only opens the files of these days and
+    never parses text. The open chunk is rewritten with all of its rows every FLUSH_INTERVAL
+    seconds (like the fsync interval of the '.csv' log), so a killed program loses at most the
+    rows of the last FLUSH_INTERVAL seconds. A chunk is closed once it holds CHUNK_ROWS rows,
+    at midnight, and by close().
+    The chunks are compressed, which keeps the archive small on the SD card but means that
+    they cannot be memory-mapped: np.load ignores mmap_mode for '.npz' files. load() instead
+    decompresses only the columns and days that are asked for.
+    convert_csv() converts the existing '.csv' history into the archive, one chunk per day.
+    The module can be run as a script: python3 bms_archive.py CSV_PATH ARCHIVE_PATH
+
+"""
+import numpy as np
+import datetime
+import json
+import os
+import csv
+import glob
+import sys
+import time
+from snapshot import record_time
+
+
+# ARCHIVE COLUMNS ----------------------------------------------------
+
+VALUE_FIELDS = ('soc', 'voltage', 'current', 'temperature')  # read_BMS columns 0-3
+STATUS_FIELDS = ('b_status', 'v_status', 'c_status', 't_status')  # read_BMS columns 4-7
+CSV_FIELDS = {'SoC': 'soc', 'Voltage': 'voltage', 'Current': 'current', 'Temperature': 'temperature',
+              'B_Status': 'b_status', 'V_Status': 'v_status', 'C_Status': 'c_status', 'T_Status': 't_status'}
+
+
+def parse_time(TEXT):
+    """Returns the seconds since midnight of a log time 'HH:MM:SS' or 'HH:MM'."""
+    parts = [int(part) for part in TEXT.split(':')]
+    return parts[0] * 3600 + parts[1] * 60 + (parts[2] if len(parts) > 2 else 0)
+
+
+def to_float(TEXT):
+    """Returns the value of a '.csv' field, NaN if it is empty or not a number."""
+    try:
+        return float(TEXT)
+    except ValueError:
+        return np.nan
+
+
+def build_chunk(TIME, ROWS):
+    """This function converts rows into the typed column arrays of a chunk.
+
+    Args:
+        TIME: list of seconds since midnight.
+        ROWS: list of rows, each a list of [n_modules] BMS_Snapshot returned by read_BMS, or of module value
+        lists in the same order: [SoC, Voltage, Current, Temperature, Battery Status, Voltage Status, Current Status, Temperature Status]
+
+    Returns: dict {column name: numpy array}
+
+    """
+    n_modules = max([len(row) for row in ROWS] + [1])
+    empty = [None] * 8
+    padded = [[tuple(module) for module in row] + [empty] * (n_modules - len(row)) for row in ROWS]
+    columns = {'time': np.asarray(TIME, dtype=np.uint32)}
+    for j, field in enumerate(VALUE_FIELDS):
+        values = [[np.nan if module[j] is None or module[j] == '' else module[j] for module in row] for row in padded]
+        columns[field] = np.array(values, dtype=np.float32).reshape(len(ROWS), n_modules)
+    names = {'': 0}
+    for j, field in enumerate(STATUS_FIELDS):
+        codes = []
+        for row in padded:
+            for module in row:
+                status = module[4 + j] if len(module) > 4 + j and module[4 + j] is not None else ''
+                if status not in names:
+                    names[status] = len(names)
+                codes.append(names[status])
+        columns[field] = codes
+    if len(names) > 255:
+        raise ValueError('Too many different status strings in one chunk: ' + str(len(names)))
+    for field in STATUS_FIELDS:
+        columns[field] = np.array(columns[field], dtype=np.uint8).reshape(len(ROWS), n_modules)
+    columns['status_names'] = np.array(sorted(names, key=names.get))
+    return columns
+
+
+# EMBEDDING BMS_Archive CLASS ----------------------------------------------------
+
+class BMS_Archive(object):
+    """This class implements the columnar archive of the BMS log"""
+
+    def __init__(self, PATH='../var/BMS_archive', CHUNK_ROWS=120, FLUSH_INTERVAL=60.0):
+        ''' Constructor for this class. '''
+        self.PATH = PATH
+        self.CHUNK_ROWS = CHUNK_ROWS
+        self.FLUSH_INTERVAL = FLUSH_INTERVAL  # seconds between two writes of the open chunk, 0 writes every row
+        os.makedirs(PATH, exist_ok=True)
+        self._index_file = os.path.join(PATH, 'index.json')
+        self._index = {}  # 'YYYY-MM-DD' -> {'chunks': [file names], 'rows': n, 'modules': n}
+        if os.path.isfile(self._index_file):
+            with open(self._index_file) as index_file:
+                self._index = json.load(index_file)
+        self._day = None
+        self._time = []
+        self._rows = []
+        self._chunk = None  # file name of the open chunk, once it was written
+        self._chunk_rows = 0  # rows of the open chunk in the index
+        self._synced = time.monotonic()
+
+    def __del__(self):
+        ''' Destructor for this class. '''
+        if self._rows:
+            self.flush()
+
+    def days(self):
+        """Returns the sorted list of the days in the archive, 'YYYY-MM-DD' strings."""
+        return sorted(self._index)
+
+    def append(self, BMS_LIST, TIME=None):
+        """This function adds one row of BMS data. The rows are written in chunks of CHUNK_ROWS rows,
+        the open chunk is written every FLUSH_INTERVAL seconds.
+
+        Args:
+            BMS_LIST: list of length [n_modules] of BMS_Snapshot returned by US2000B.read_BMS.
+            TIME: datetime of the row. Default=time of the reading
+
+        Returns: Boolean value True
+
+        """
+        if TIME is None:
+            TIME = (record_time(BMS_LIST[0]) if BMS_LIST else None) or datetime.datetime.now()
+        day = TIME.date().isoformat()
+        if day != self._day:
+            self.flush()
+            self._day = day
+        self._time.append(TIME.hour * 3600 + TIME.minute * 60 + TIME.second)
+        self._rows.append(BMS_LIST)
+        if len(self._rows) >= self.CHUNK_ROWS:
+            self.flush()
+        elif time.monotonic() - self._synced >= self.FLUSH_INTERVAL:
+            self.sync()
+        return True
+
+    def sync(self):
+        """This function writes the rows of the open chunk, it replaces the file of an earlier sync.
+
+        Returns: Boolean value True
+
+        """
+        if self._rows and len(self._rows) != self._chunk_rows:
+            self._chunk = self.write_chunk(self._day, build_chunk(self._time, self._rows), NAME=self._chunk, REPLACE_ROWS=self._chunk_rows)
+            self._chunk_rows = len(self._rows)
+        self._synced = time.monotonic()
+        return True
+
+    def flush(self):
+        """This function writes and closes the open chunk, the next row starts a new chunk.
+
+        Returns: Boolean value True
+
+        """
+        self.sync()
+        self._time = []
+        self._rows = []
+        self._chunk = None
+        self._chunk_rows = 0
+        return True
+
+    def close(self):
+        """Writes the buffered rows. Returns: Boolean value True"""
+        return self.flush()
+
+    def write_chunk(self, DAY, COLUMNS, NAME=None, REPLACE_ROWS=0):
+        """This function writes the column arrays of a chunk and adds the chunk to the day index.
+        The file is replaced atomically, so a chunk is never read half written.
+
+        Args:
+            DAY: day of the chunk, 'YYYY-MM-DD'.
+            COLUMNS: dict {column name: numpy array}, see build_chunk.
+            NAME: file name of a chunk of DAY to be replaced. Default=None (new chunk)
+            REPLACE_ROWS: rows of the replaced chunk in the index. Default=0
+
+        Returns: file name of the chunk
+
+        """
+        entry = self._index.setdefault(DAY, {'chunks': [], 'rows': 0, 'modules': 0})
+        name = NAME if NAME is not None else '%s.%03d.npz' % (DAY, len(entry['chunks']))
+        tmp_file = os.path.join(self.PATH, name + '.tmp')
+        with open(tmp_file, mode='wb') as chunk_file:
+            np.savez_compressed(chunk_file, **COLUMNS)
+        os.replace(tmp_file, os.path.join(self.PATH, name))
+        if name not in entry['chunks']:
+            entry['chunks'].append(name)
+        entry['rows'] += len(COLUMNS['time']) - REPLACE_ROWS
+        entry['modules'] = max(entry['modules'], COLUMNS['soc'].shape[1])
+        tmp_file = self._index_file + '.tmp'
+        with open(tmp_file, mode='w') as index_file:
+            json.dump(self._index, index_file, indent=0, sort_keys=True)
+        os.replace(tmp_file, self._index_file)
+        return name
+
+    def load(self, START, END=None, FIELDS=VALUE_FIELDS + STATUS_FIELDS):
+        """This function loads all rows of the days from START to END.
+
+        Args:
+            START: first day, datetime.date or 'YYYY-MM-DD'.
+            END: last day, datetime.date or 'YYYY-MM-DD'. Default=START
+            FIELDS: columns to load. Default=all columns
+
+        Returns: dict {'time': datetime64[s] array, field: array [rows, modules]},
+            the status fields are decoded into strings.
+
+        """
+        START = str(START)
+        END = START if END is None else str(END)
+        days = [day for day in self.days() if START <= day <= END]
+        n_modules = max([self._index[day]['modules'] for day in days] + [1])
+        parts = {field: [] for field in ('time',) + tuple(FIELDS)}
+        for day in days:
+            for name in self._index[day]['chunks']:
+                with np.load(os.path.join(self.PATH, name)) as chunk:
+                    parts['time'].append(np.datetime64(day, 's') + chunk['time'].astype('timedelta64[s]'))
+                    names = chunk['status_names'] if any(field in STATUS_FIELDS for field in FIELDS) else None
+                    for field in FIELDS:
+                        column = chunk[field]
+                        if field in STATUS_FIELDS:
+                            column = names[column]
+                        pad = n_modules - column.shape[1]
+                        if pad:
+                            column = np.pad(column, ((0, 0), (0, pad)), constant_values=np.nan if field in VALUE_FIELDS else '')
+                        parts[field].append(column)
+        result = {'time': np.concatenate(parts['time']) if parts['time'] else np.array([], dtype='datetime64[s]')}
+        for field in FIELDS:
+            result[field] = np.concatenate(parts[field]) if parts[field] else np.empty((0, n_modules))
+        return result
+
+
+def read_csv(FILENAME):
+    """This function reads a daily '.csv' file of US2000B.log_BMS column by column. Both the old
+    format without status columns and the current one are read. Incomplete lines are skipped.
+
+    Args:
+        FILENAME: path of the '.csv' file.
+
+    Returns: dict {column name: numpy array}, see build_chunk, or None if the file has no rows.
+
+    """
+    with open(FILENAME, newline='') as csvfile:
+        reader = csv.reader(csvfile)
+        header = next(reader, None)
+        if not header or header[0] != 'Time':
+            return None
+        lines = []
+        time = []
+        for line in reader:
+            if len(line) != len(header):
+                continue  # incomplete line after a power loss
+            try:
+                time.append(parse_time(line[0]))
+            except (ValueError, IndexError):
+                continue
+            lines.append(line)
+    if not lines:
+        return None
+    fields = [(position,) + tuple(column.rpartition('_')[::2]) for position, column in enumerate(header)]
+    fields = [(position, CSV_FIELDS[name], int(module) - 1) for position, name, module in fields
+              if name in CSV_FIELDS and module.isdigit()]
+    text = list(zip(*lines))
+    n_modules = max([module + 1 for position, field, module in fields if any(text[position])] + [1])
+    columns = {'time': np.asarray(time, dtype=np.uint32)}
+    for field in VALUE_FIELDS:
+        columns[field] = np.full((len(lines), n_modules), np.nan, dtype=np.float32)
+    for field in STATUS_FIELDS:
+        columns[field] = np.zeros((len(lines), n_modules), dtype=np.uint8)
+    names = {'': 0}
+    for position, field, module in fields:
+        if module >= n_modules:
+            continue
+        if field in VALUE_FIELDS:
+            try:
+                columns[field][:, module] = [float(value) if value else np.nan for value in text[position]]
+            except ValueError:
+                columns[field][:, module] = [to_float(value) for value in text[position]]
+        else:
+            for status in set(text[position]):
+                names.setdefault(status, len(names))
+            columns[field][:, module] = [names[status] for status in text[position]]
+    columns['status_names'] = np.array(sorted(names, key=names.get))
+    return columns
+
+
+def convert_csv(CSV_PATH='../var/BMS_log', PATH='../var/BMS_archive', OVERWRITE=False):
+    """This function converts the daily '.csv' files of US2000B.log_BMS into the archive, one
+    chunk per day.
+
+    Args:
+        CSV_PATH: directory of the '.csv' files.
+        PATH: directory of the archive.
+        OVERWRITE: convert days which are already in the archive again. Default=False
+
+    Returns: number of converted days
+
+    """
+    archive = BMS_Archive(PATH=PATH)
+    converted = 0
+    for filename in sorted(glob.glob(os.path.join(CSV_PATH, '*.csv'))):
+        day = os.path.basename(filename)[:-4]
+        if day in archive._index:
+            if not OVERWRITE:
+                continue
+            for name in archive._index.pop(day)['chunks']:
+                os.remove(os.path.join(PATH, name))
+        columns = read_csv(filename)
+        if columns is None:
+            print('Skipping ' + filename + ': no BMS log rows')
+            continue
+        archive.write_chunk(day, columns)
+        converted += 1
+    return converted
+
+
+if __name__ == '__main__':
+
+    if len(sys.argv) != 3:
+        print('Usage: python3 bms_archive.py CSV_PATH ARCHIVE_PATH')
+        sys.exit(1)
+    print('Converted days: ' + str(convert_csv(CSV_PATH=sys.argv[1], PATH=sys.argv[2])))
@@ -0,0 +1,200 @@
+""" This module contains a query interface for the '.csv' history of the Pylontech US2000B BMS log.
+
+**Description:**
+
+    The daily '.csv' files of US2000B.log_BMS in 'var/BMS_log' are read through a sparse time
+    index, which holds for every file the byte offset of the first row of every hour. The
+    index is stored in the log directory ('.bms_index.json') and only files which are new or
+    have changed since the last query are indexed again. A query maps the files of its time
+    window into memory and parses only the byte ranges of the hours inside the window, so a
+    few hours of a year of logs are read without touching the rest.
+    The result holds one NumPy array per column, e.g.:
+        history = BMS_History(PATH='../var/BMS_log')
+        data = history.query('2023-08-20 06:00', '2023-08-21 18:00', COLUMNS=['SoC_3', 'Voltage_3'])
+        data['time'], data['SoC_3']
+    Value columns are float64 with NaN for empty fields, status columns ('B_Status_1', ...)
+    are string arrays.
+
+"""
+import numpy as np
+import datetime
+import json
+import mmap
+import os
+import re
+import csv
+import glob
+
+
+LINE_TIME = re.compile(rb'^(\d{1,2}):(\d{1,2})(?::(\d{1,2}))?,', re.MULTILINE)  # 'HH:MM:SS,' or 'H:M,' at a line start
+
+
+def index_file(FILENAME, OFFSETS=None, START=0):
+    """This function builds the hourly byte offsets of a '.csv' log file.
+
+    Args:
+        FILENAME: path of the '.csv' file.
+        OFFSETS: offsets of a previous index of the same file, it is continued from START. Default=None
+        START: byte offset of the first line to scan. Default=0
+
+    Returns: list of 25 byte offsets, OFFSETS[h] is the first row with an hour >= h, OFFSETS[24] is the file size
+
+    """
+    size = os.path.getsize(FILENAME)
+    offsets = list(OFFSETS[:24]) if OFFSETS is not None else [None] * 24
+    for hour in range(24):
+        if offsets[hour] is not None and offsets[hour] >= START:
+            offsets[hour] = None  # hours after START are scanned again
+    if size > START:
+        with open(FILENAME, 'rb') as logfile:
+            with mmap.mmap(logfile.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                hour = 0
+                while hour < 24 and offsets[hour] is not None:
+                    hour += 1
+                previous = -1
+                for match in LINE_TIME.finditer(data, START):
+                    row_hour = int(match.group(1))
+                    if row_hour < previous:
+                        return [0] * 24 + [size]  # rows out of order, e.g. after a clock change, the file is always read completely
+                    previous = row_hour
+                    while hour <= min(row_hour, 23):
+                        offsets[hour] = match.start()
+                        hour += 1
+    for hour in range(23, -1, -1):  # hours without rows start where the next hour starts
+        if offsets[hour] is None:
+            offsets[hour] = offsets[hour + 1] if hour < 23 else size
+    return offsets + [size]
+
+
+# EMBEDDING BMS_History CLASS ----------------------------------------------------
+
+class BMS_History(object):
+    """This class implements time window queries over the '.csv' files of the BMS log"""
+
+    def __init__(self, PATH='../var/BMS_log'):
+        ''' Constructor for this class. '''
+        self.PATH = PATH
+        self._index_file = os.path.join(PATH, '.bms_index.json')
+        self._index = {}  # file name -> {'size': bytes, 'mtime': s, 'header': [names], 'offsets': [25 offsets]}
+        if os.path.isfile(self._index_file):
+            with open(self._index_file) as index:
+                self._index = json.load(index)
+
+    def days(self):
+        """Returns the sorted list of the days with a log file, 'YYYY-MM-DD' strings."""
+        return sorted(os.path.basename(filename)[:-4] for filename in glob.glob(os.path.join(self.PATH, '????-??-??.csv')))
+
+    def update_index(self, DAYS=None):
+        """This function indexes the files which are new or have changed since they were indexed.
+        A file that has grown, like the log of today, is only scanned from its last indexed hour.
+
+        Args:
+            DAYS: list of days to check. Default=all days
+
+        Returns: number of indexed files
+
+        """
+        updated = 0
+        for day in (self.days() if DAYS is None else DAYS):
+            name = day + '.csv'
+            filename = os.path.join(self.PATH, name)
+            if not os.path.isfile(filename):
+                continue
+            stat = os.stat(filename)
+            entry = self._index.get(name)
+            if entry is not None and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+                continue
+            if entry is not None and entry['size'] < stat.st_size:
+                last_hour = max([hour for hour in range(24) if entry['offsets'][hour] < entry['size']] + [0])
+                offsets = index_file(filename, entry['offsets'], START=entry['offsets'][last_hour])
+                header = entry['header']
+            else:
+                with open(filename, newline='') as logfile:
+                    header = next(csv.reader(logfile), [])
+                offsets = index_file(filename)
+            self._index[name] = {'size': stat.st_size, 'mtime': stat.st_mtime, 'header': header, 'offsets': offsets}
+            updated += 1
+        if updated:
+            try:
+                tmp_file = self._index_file + '.tmp'
+                with open(tmp_file, mode='w') as index:
+                    json.dump(self._index, index)
+                os.replace(tmp_file, self._index_file)
+            except OSError as error:
+                print('Unable to save the BMS log index:', error)
+        return updated
+
+    def query(self, START, END, COLUMNS=('SoC_1',)):
+        """This function returns the rows of the BMS log between START and END.
+
+        Args:
+            START: begin of the window, datetime or 'YYYY-MM-DD[ HH:MM[:SS]]'.
+            END: end of the window (inclusive), datetime or 'YYYY-MM-DD[ HH:MM[:SS]]'.
+            COLUMNS: list of '.csv' column names, e.g. ['SoC_3', 'Voltage_3']. Default=['SoC_1']
+
+        Returns: dict {'time': datetime64[s] array, column: array}
+
+        """
+        START = parse_datetime(START)
+        END = parse_datetime(END)
+        days = [day for day in self.days() if START.date().isoformat() <= day <= END.date().isoformat()]
+        self.update_index(days)
+        parts = {column: [] for column in ('time',) + tuple(COLUMNS)}
+        for day in days:
+            name = day + '.csv'
+            entry = self._index.get(name)
+            if entry is None or entry['size'] == 0:
+                continue
+            date = datetime.date.fromisoformat(day)
+            first = (START - datetime.datetime.combine(date, datetime.time())).total_seconds()
+            last = (END - datetime.datetime.combine(date, datetime.time())).total_seconds()
+            begin = entry['offsets'][max(0, min(23, int(first // 3600)))] if first > 0 else entry['offsets'][0]
+            end = entry['offsets'][max(0, min(24, int(last // 3600) + 1))]
+            if begin >= end:
+                continue
+            with open(os.path.join(self.PATH, name), 'rb') as logfile:
+                with mmap.mmap(logfile.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    lines = data[begin:end].decode(errors='replace').splitlines()
+            self._parse(lines, entry['header'], date, first, last, COLUMNS, parts)
+        result = {'time': np.concatenate(parts['time']) if parts['time'] else np.array([], dtype='datetime64[s]')}
+        for column in COLUMNS:
+            if parts[column]:
+                result[column] = np.concatenate(parts[column])
+            else:
+                result[column] = np.array([], dtype=str if '_Status_' in column else np.float64)
+        return result
+
+    def _parse(self, LINES, HEADER, DATE, FIRST, LAST, COLUMNS, PARTS):
+        """Parses the lines of one file and appends the rows from FIRST to LAST seconds of the day to PARTS."""
+        rows = [row for row in csv.reader(LINES) if len(row) == len(HEADER)]
+        seconds = np.array([seconds_of_day(row[0]) for row in rows], dtype=np.int64)
+        selected = (seconds >= 0) & (seconds >= FIRST) & (seconds <= LAST)  # the header line has no time
+        rows = [row for row, keep in zip(rows, selected) if keep]
+        PARTS['time'].append(np.datetime64(DATE, 's') + seconds[selected].astype('timedelta64[s]'))
+        positions = {name: position for position, name in enumerate(HEADER)}
+        for column in COLUMNS:
+            position = positions.get(column)
+            if '_Status_' in column:
+                values = [row[position] for row in rows] if position is not None else [''] * len(rows)
+                PARTS[column].append(np.array(values, dtype=str))
+            else:
+                values = [float(row[position]) if row[position] else np.nan for row in rows] if position is not None else [np.nan] * len(rows)
+                PARTS[column].append(np.array(values, dtype=np.float64))
+
+
+def seconds_of_day(TEXT):
+    """Returns the seconds since midnight of a log time 'HH:MM:SS' or 'H:M', -1 if it is malformed."""
+    try:
+        parts = [int(part) for part in TEXT.split(':')]
+        return parts[0] * 3600 + parts[1] * 60 + (parts[2] if len(parts) > 2 else 0)
+    except (ValueError, IndexError):
+        return -1
+
+
+def parse_datetime(VALUE):
+    """Returns a datetime of a datetime, date, or 'YYYY-MM-DD[ HH:MM[:SS]]' string."""
+    if isinstance(VALUE, datetime.datetime):
+        return VALUE
+    if isinstance(VALUE, datetime.date):
+        return datetime.datetime.combine(VALUE, datetime.time())
+    return datetime.datetime.fromisoformat(str(VALUE))
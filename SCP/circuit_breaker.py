@@ -0,0 +1,116 @@
+""" This module contains the circuit breakers of the Conext devices.
+
+**Description:**
+
+    Every device has its own circuit breaker with its own error counter. The breaker is
+    closed while the device answers. After FAILURES consecutive errors it opens: the control
+    loop skips the device, its values of the tick are missing (stale), and a background thread
+    tries to reconnect the device with an exponential backoff from RETRY_MIN to RETRY_MAX
+    seconds. After a successful reconnect the breaker is half-open, the next read is a trial:
+    it closes the breaker on success and opens it again on an error.
+    The control loop never waits for a reconnect, so one unreachable device does not stop
+    the control of the other devices.
+
+"""
+import threading
+
+
+BREAKER_CLOSED = 'closed'
+BREAKER_OPEN = 'open'
+BREAKER_HALF_OPEN = 'half-open'
+
+
+# EMBEDDING Circuit_Breaker CLASS ----------------------------------------------------
+
+class Circuit_Breaker(object):
+    """This class implements the circuit breaker of one device"""
+
+    def __init__(self, NAME, RECONNECT, FAILURES=5, RETRY_MIN=5.0, RETRY_MAX=300.0):
+        ''' Constructor for this class. '''
+        self.NAME = NAME
+        self.RECONNECT = RECONNECT  # function without arguments that returns True if the device is connected again
+        self.FAILURES = FAILURES
+        self.RETRY_MIN = RETRY_MIN
+        self.RETRY_MAX = RETRY_MAX
+        self._lock = threading.Lock()
+        self._thread = None
+        self.state = BREAKER_CLOSED
+        self.failures = 0  # consecutive errors
+        self.errors = 0  # all errors
+
+    def allow(self):
+        """Returns True if the device may be used, i.e. the breaker is closed or half-open."""
+        return self.state != BREAKER_OPEN
+
+    @property
+    def stale(self):
+        """True if the values of the device are missing, i.e. the breaker is not closed or the last read failed."""
+        return self.state != BREAKER_CLOSED or self.failures > 0
+
+    def success(self):
+        """Records a successful read and closes the breaker."""
+        with self._lock:
+            if self.state == BREAKER_HALF_OPEN:
+                print('Reconnect with ' + self.NAME + ' Succesful!')
+            self.state = BREAKER_CLOSED
+            self.failures = 0
+
+    def failure(self, ERROR=None):
+        """Records an error, the breaker opens after FAILURES consecutive errors or on an error of the trial read."""
+        with self._lock:
+            self.failures += 1
+            self.errors += 1
+            print('Communication Error With ' + self.NAME + '. Try:' + str(self.failures) +
+                  ('' if ERROR is None else ' (' + str(ERROR) + ')'))
+            if self.state == BREAKER_HALF_OPEN or (self.state == BREAKER_CLOSED and self.failures >= self.FAILURES):
+                self.state = BREAKER_OPEN
+                print(self.NAME + ' is offline, its values are stale until it is reconnected')
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = Reconnect_Thread(self)
+                    self._thread.start()
+
+    def reconnected(self):
+        """Called by the Reconnect_Thread, the next read is a trial read."""
+        with self._lock:
+            if self.state == BREAKER_OPEN:
+                self.state = BREAKER_HALF_OPEN
+
+    def close(self):
+        """Stops a running reconnect thread."""
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+
+
+# EMBEDDING Reconnect_Thread CLASS ----------------------------------------------------
+
+class Reconnect_Thread(threading.Thread):
+    """This class tries to reconnect the device of an open Circuit_Breaker with an exponential backoff"""
+
+    def __init__(self, BREAKER, group=None, name=None):
+
+        threading.Thread.__init__(self, group=group, name=name)
+        self.daemon = True
+
+        self._stopevent = threading.Event()  # used to stop the thread.
+
+        self.BREAKER = BREAKER
+
+    def run(self):
+        """Main reconnect loop"""
+        delay = self.BREAKER.RETRY_MIN
+        while not self._stopevent.wait(delay):
+            print('Reconnect with ' + self.BREAKER.NAME)
+            try:
+                connected = self.BREAKER.RECONNECT()
+            except Exception as error:
+                print('Reconnect with ' + self.BREAKER.NAME + ' failed:', error)
+                connected = False
+            if connected:
+                self.BREAKER.reconnected()
+                return
+            delay = min(2 * delay, self.BREAKER.RETRY_MAX)
+
+    def join(self, timeout=None):
+        """Stop the thread"""
+        self._stopevent.set()
+        threading.Thread.join(self, timeout)
@@ -15,98 +15,308 @@
 The main class in this module ("conect_com") allows the user to
 communicate with the Schneider devices. Each device then
 has its own class which includes the device specific functions.
+The register address, type, and scale of each value are defined
+in the register map tables of the module "conext_map".
+All device objects of one ComBox share one connection of the
+module "modbus_pool", which reconnects with an exponential backoff.
+The snapshot functions are also available as coroutines, which use
+the pipelined asyncio client of the module "modbus_async".
+The registers of a block read are decoded by a Register_Decoder, which
+unpacks all values of the block with one precompiled struct.Struct.
 
 """
 import numpy as np
 import time
+import asyncio
 from struct import *
-from pyModbusTCP.client import ModbusClient
+from modbus_pool import get_pool
+from conext_map import *
+from modbus_async import AsyncModbusClient
+from snapshot import Snapshot
 
-# EMBEDDING com CLASS ----------------------------------------------------
 
-class com(object):
-    """This class implements the modbusTCP connection functions """
-    def __init__(self):
-        ''' Constructor for this class. '''
-        self._port = 0
+MODBUS_MAX_REGISTERS = 125 # Maximum number of registers per read holding registers request (Modbus PDU limit)
 
 
-    def __del__(self):
-        ''' Destructor for this class. '''
-        if self._port !=0:
-            self.close()
+# BLOCK READ FUNCTIONS ----------------------------------------------------
+
+def plan_block_reads(REGISTERS, MAX_GAP=64, MAX_COUNT=MODBUS_MAX_REGISTERS):
+    """This function merges adjacent or nearby register ranges into the fewest Modbus block reads.
+
+    Args:
+        REGISTERS: list of (address, count) tuples of the registers to be read.
+        MAX_GAP: maximum number of unused registers that may be read to join two ranges. Default=64
+        MAX_COUNT: maximum number of registers in one request. Default=125
+
+    Returns: list of (address, count) tuples, one for each Modbus request.
+
+    """
+    blocks = []
+    for address, count in sorted(set(REGISTERS)):
+        end = address + count
+        if blocks:
+            start, stop = blocks[-1]
+            if address - stop <= MAX_GAP and max(stop, end) - start <= MAX_COUNT:
+                blocks[-1] = (start, max(stop, end))
+                continue
+        blocks.append((address, end))
+    return [(start, stop - start) for start, stop in blocks]
+
+
+def enum_array(ENUM):
+    """Returns an enum table as (first code, array of names), the name of a code is names[code - first]."""
+    first = min(ENUM)
+    names = np.full(max(ENUM) - first + 2, UNKNOWN_STATE, dtype=object)  # the last entry is for unknown codes
+    for code, name in ENUM.items():
+        names[code - first] = name
+    return first, names
 
+_STATUS_ARRAYS = {name: enum_array(enum) for name, enum in STATUS_COLUMNS.items()}
 
+def decode_status(NAME, CODES):
+    """This function converts the codes of a status column into their names, e.g. for rows
+    read from the mysql tables.
 
+    Args:
+        NAME: status column, see STATUS_COLUMNS in conext_map.
+        CODES: code or array of codes.
 
-    def open (self,SERVER_HOST = "192.168.0.210",SERVER_PORT = 502,SERVER_UNIT = 201):
-        """Open modbus connection to the ComBox
+    Returns: str or numpy array of str {status names}, UNKNOWN_STATE for unknown codes
+
+    """
+    first, names = _STATUS_ARRAYS[NAME]
+    index = np.asarray(CODES, dtype=np.int64) - first
+    index = np.where((index >= 0) & (index < len(names) - 1), index, len(names) - 1)
+    result = names[index]
+    return result if np.ndim(result) else str(result)
+
+
+# EMBEDDING Register_Decoder CLASS ----------------------------------------------------
+
+class Register_Decoder(object):
+    """This class reads and decodes a fixed list of register map entries. The block reads are
+    planned once, and for every block a struct.Struct is compiled, which unpacks all values of
+    the block from its registers in one call. Values that overlap in a block are unpacked by a
+    second Struct of the same block."""
+
+    def __init__(self, FIELDS, MAX_GAP=64):
+        ''' Constructor for this class. '''
+        self.FIELDS = tuple(FIELDS)
+        self.REGISTERS = [(field[0], REGISTER_TYPES[field[1]]) for field in self.FIELDS]
+        self.BLOCKS = plan_block_reads(self.REGISTERS, MAX_GAP=MAX_GAP)
+        self._words = []  # per block: Struct that packs the registers of the block into bytes
+        self._layers = []  # per block: list of (Struct, field indices) of values that do not overlap
+        for start, count in self.BLOCKS:
+            self._words.append(Struct('<%dH' % count))
+            layers = []  # [format, end offset in bytes, field indices]
+            inside = sorted([i for i, (address, n) in enumerate(self.REGISTERS) if start <= address < start + count],
+                            key=lambda i: self.REGISTERS[i][0])
+            for i in inside:
+                offset = 2 * (self.REGISTERS[i][0] - start)
+                layer = next((layer for layer in layers if layer[1] <= offset), None)
+                if layer is None:
+                    layer = ['<', 0, []]
+                    layers.append(layer)
+                layer[0] += 'x' * (offset - layer[1]) + REGISTER_FORMATS[self.FIELDS[i][1]]
+                layer[1] = offset + 2 * self.REGISTERS[i][1]
+                layer[2].append(i)
+            self._layers.append([(Struct(format), indices) for format, end, indices in layers])
+
+    def decode(self, BITSTREAMS, RAW=False):
+        """This function decodes all values from the registers of the block reads.
 
         Args:
-            SERVER_HOST: network address of the ComBox. Default='192.168.0.210'
-            SERVER_PORT: modbus TCP port. Default='502'
-            SERVER_UNIT: modbus address of the ComBox. Default='201'
+            BITSTREAMS: list of register lists, one for each block of BLOCKS.
+            RAW: return the codes of enum values instead of their strings. Default=False
+
+        Returns: list of values in the order of FIELDS dtype=float, dtype=int, and dtype=str.
+
+        """
+        values = [None] * len(self.FIELDS)
+        for words, layers, bitstream in zip(self._words, self._layers, BITSTREAMS):
+            buffer = words.pack(*bitstream)
+            for layer, indices in layers:
+                for i, value in zip(indices, layer.unpack_from(buffer)):
+                    values[i] = value
+        for i, (address, type, scale, enum) in enumerate(self.FIELDS):
+            value = values[i]
+            if isinstance(value, bytes):
+                values[i] = str(value, 'utf-8').rstrip('\x00')
+            elif enum is not None:
+                values[i] = value if RAW else enum.get(value, UNKNOWN_STATE)
+            elif scale is not None:
+                values[i] = value / scale
+        return values
+
+    def _inside(self, BLOCK):
+        """Returns the register ranges of the values inside of a block."""
+        start, count = BLOCK
+        return sorted(set([(address, n) for address, n in self.REGISTERS if start <= address < start + count]))
+
+    def _assemble(self, BLOCK, RANGES, BITSTREAMS):
+        """Returns the registers of a block from the registers of its value ranges, unused registers are 0."""
+        start, count = BLOCK
+        registers = [0] * count
+        for (address, n), bitstream in zip(RANGES, BITSTREAMS):
+            if not bitstream:
+                raise IOError('Modbus read failed at register address 0x%04X' % address)
+            registers[address - start:address - start + n] = bitstream
+        return registers
+
+    def read(self, PORT, RAW=False):
+        """This function reads all blocks and decodes the values. If the device rejects a block,
+        the register ranges inside of this block are requested individually.
 
-        Returns: Boolean value True or False
+        Args:
+            PORT: open pyModbusTCP ModbusClient or PooledUnit.
+            RAW: return the codes of enum values instead of their strings. Default=False
+
+        Returns: list of values in the order of FIELDS, see decode.
 
         """
-        self._port = ModbusClient(SERVER_HOST, SERVER_PORT, SERVER_UNIT)
-        if not self._port.is_open():
-            if not self._port.open():
-                print("unable to connect to " + SERVER_HOST + ":" + str(SERVER_PORT))
+        bitstreams = []
+        for block in self.BLOCKS:
+            bitstream = PORT.read_holding_registers(*block)
+            if not bitstream:
+                ranges = self._inside(block)
+                bitstream = self._assemble(block, ranges, [PORT.read_holding_registers(address, n) for address, n in ranges])
+            bitstreams.append(bitstream)
+        return self.decode(bitstreams, RAW)
 
-        return self._port.is_open()
+    async def async_read(self, CLIENT, UNIT, RAW=False):
+        """This function is the asyncio variant of read. All block reads are sent at once over the
+        pipelined connection of the client.
 
-    def close(self):
-        """Closes the modbusTCP connection
+        Args:
+            CLIENT: open AsyncModbusClient.
+            UNIT: modbus address of the device.
+            RAW: return the codes of enum values instead of their strings. Default=False
 
-        Returns: Boolean value True or False
+        Returns: list of values in the order of FIELDS, see decode.
 
         """
-        self._port.close()
-        return not self._port.is_open()
+        bitstreams = list(await asyncio.gather(*[CLIENT.read_holding_registers(UNIT, start, count) for start, count in self.BLOCKS]))
+        for b, block in enumerate(self.BLOCKS):
+            if not bitstreams[b]:
+                ranges = self._inside(block)
+                retries = await asyncio.gather(*[CLIENT.read_holding_registers(UNIT, address, n) for address, n in ranges])
+                bitstreams[b] = self._assemble(block, ranges, retries)
+        return self.decode(bitstreams, RAW)
 
-    def is_connected(self):
-        """This function checks if the connection to the Schneider Conext ComBox is established
-        and if it responds to readout commands. It requests the firmware version of the ComBox
-        and checks for an received bitstream.
 
-        Returns: Boolean value True or False
+_REGISTER_DECODERS = {}
 
-        return
-        """
-        bitstream = self._port.read_holding_registers(0x001E, 7)  # 0x001E Firmware Version str20 r
-        if bitstream:
-            return True
-        else:
-            return False
+def register_decoder(REGISTER_MAP, NAMES):
+    """Returns the Register_Decoder of the named values of a register map, it is compiled on the first call."""
+    key = (id(REGISTER_MAP), tuple(NAMES))
+    decoder = _REGISTER_DECODERS.get(key)
+    if decoder is None:
+        decoder = _REGISTER_DECODERS[key] = Register_Decoder([REGISTER_MAP[name] for name in NAMES])
+    return decoder
 
-    def reconnect(self, SERVER_HOST = "192.168.0.210",SERVER_PORT = 502,SERVER_UNIT = 201):
-        """Reconnects communication with modbus client.
+
+# EMBEDDING Rate_Scheduler CLASS ----------------------------------------------------
+
+class Rate_Scheduler(object):
+    """This class implements the multi-rate acquisition of a snapshot. Every value belongs to a
+    rate class (see RATE_CLASSES in conext_map), only the values of the classes which are due are
+    read, the other values of the snapshot are the last known values."""
+
+    def __init__(self, NAMES, RATES, SLOW_INTERVAL=300.0, TICK_INTERVAL=0.0):
+        ''' Constructor for this class. '''
+        self.NAMES = tuple(NAMES)
+        self.INTERVALS = {RATE_ONCE: None, RATE_SLOW: SLOW_INTERVAL, RATE_TICK: TICK_INTERVAL, RATE_FAST: 0.0}  # None: once per connection
+        self._classes = [RATES.get(name, RATE_TICK) for name in self.NAMES]
+        self._values = [None] * len(self.NAMES)
+        self.reset()
+
+    def reset(self):
+        """Marks all values as unknown, so the next snapshot reads every rate class, e.g. after a reconnect."""
+        self._last_read = dict.fromkeys(RATE_CLASSES)  # rate class -> time of the last read, None = never
+
+    def invalidate(self, NAME):
+        """Marks the rate class of a value as due, so the next snapshot reads it again, e.g. after it was written."""
+        if NAME in self.NAMES:
+            self._last_read[self._classes[self.NAMES.index(NAME)]] = None
+
+    def due(self, NOW):
+        """Returns the rate classes which are due at NOW (time.monotonic seconds)."""
+        due = set()
+        for rate, last in self._last_read.items():
+            interval = self.INTERVALS[rate]
+            if last is None or (interval is not None and NOW - last >= interval - 0.5):  # tolerates a late tick
+                due.add(rate)
+        return due
+
+    def read(self, READ_VALUES, RAW=False, NOW=None):
+        """This function reads the values of the rate classes which are due and returns the snapshot.
 
         Args:
-            SERVER_HOST: network address of the ComBox. Default='192.168.0.210'
-            SERVER_PORT: modbus TCP port. Default='502'
-            SERVER_UNIT: modbus address of the ComBox. Default='201'
+            READ_VALUES: read_values function of the device.
+            RAW: return the codes of enum values instead of their strings. Default=False
+            NOW: time.monotonic seconds. Default=now
 
-        Returns: Boolean value True or False
+        Returns: list of values in the order of NAMES
 
         """
-        if self._port !=0:
-            self.close()
-        self.open(SERVER_HOST=SERVER_HOST, SERVER_PORT=SERVER_PORT, SERVER_UNIT=SERVER_UNIT)
-        time.sleep(1)
-        return self.is_connected()
+        if NOW is None:
+            NOW = time.monotonic()
+        due = self.due(NOW)
+        positions = [i for i, rate in enumerate(self._classes) if rate in due]
+        if positions:
+            values = READ_VALUES([self.NAMES[i] for i in positions], RAW=RAW)
+            for i, value in zip(positions, values):
+                self._values[i] = value
+        for rate in due:
+            self._last_read[rate] = NOW
+        return list(self._values)
 
+    async def async_read(self, READ_VALUES, RAW=False, NOW=None):
+        """This function is the asyncio variant of read, READ_VALUES is the async_read_values function of the device."""
+        if NOW is None:
+            NOW = time.monotonic()
+        due = self.due(NOW)
+        positions = [i for i, rate in enumerate(self._classes) if rate in due]
+        if positions:
+            values = await READ_VALUES([self.NAMES[i] for i in positions], RAW=RAW)
+            for i, value in zip(positions, values):
+                self._values[i] = value
+        for rate in due:
+            self._last_read[rate] = NOW
+        return list(self._values)
 
 
-# EMBEDDING ComBox CLASS ----------------------------------------------------
+# EMBEDDING XW_Snapshot CLASS ----------------------------------------------------
+
+class XW_Snapshot(Snapshot):
+    """This class holds the values returned by XW.read_Inverter_All, see XW_SNAPSHOT in conext_map"""
+
+    FIELDS = XW_SNAPSHOT
+    __slots__ = FIELDS
+
+
+# EMBEDDING MPPT_Snapshot CLASS ----------------------------------------------------
+
+class MPPT_Snapshot(Snapshot):
+    """This class holds the values returned by MPPT60.read_MPPT_All, see MPPT_SNAPSHOT in conext_map"""
+
+    FIELDS = MPPT_SNAPSHOT
+    __slots__ = FIELDS
+
+
+# EMBEDDING com CLASS ----------------------------------------------------
+
+class com(object):
+    """This class implements the modbusTCP connection functions """
+
+    REGISTER_MAP = COMBOX_MAP # register map of the device, see conext_map
+    SERVER_UNIT = 201 # default modbus address of the device
+    _rates = None # Rate_Scheduler of the snapshot of the device
 
-class ComBox():
-    """This class implements functions specific to the Schneider ComBox """
     def __init__(self):
         ''' Constructor for this class. '''
         self._port = 0
+        self._async_port = 0
 
 
     def __del__(self):
@@ -114,18 +324,25 @@ class ComBox():
         if self._port !=0:
             self.close()
 
-    def open (self,SERVER_HOST = "192.168.0.210",SERVER_PORT = 502,SERVER_UNIT = 201):
-        """Open modbus connection to the ComBox
+
+
+
+    def open (self,SERVER_HOST = "192.168.0.210",SERVER_PORT = 502,SERVER_UNIT = None):
+        """Open modbus connection to the device behind the ComBox
 
         Args:
             SERVER_HOST: network address of the ComBox. Default='192.168.0.210'
             SERVER_PORT: modbus TCP port. Default='502'
-            SERVER_UNIT: modbus address of the ComBox. Default='201'
+            SERVER_UNIT: modbus address of the device. Default=SERVER_UNIT of the class
 
         Returns: Boolean value True or False
 
         """
-        self._port = ModbusClient(SERVER_HOST, SERVER_PORT, SERVER_UNIT)
+        if SERVER_UNIT is None:
+            SERVER_UNIT = self.SERVER_UNIT
+        self._port = get_pool(SERVER_HOST, SERVER_PORT).unit(SERVER_UNIT)  # shared connection to the ComBox
+        if self._rates is not None:
+            self._rates.reset()  # the values of a new connection are all read again
         if not self._port.is_open():
             if not self._port.open():
                 print("unable to connect to " + SERVER_HOST + ":" + str(SERVER_PORT))
@@ -142,8 +359,8 @@ class ComBox():
         return not self._port.is_open()
 
     def is_connected(self):
-        """This function checks if the connection to the Schneider Conext ComBox is established
-        and if it responds to readout commands. It requests the firmware version of the ComBox
+        """This function checks if the connection to the Schneider Conext device is established
+        and if it responds to readout commands. It requests the firmware version of the device
         and checks for an received bitstream.
 
         Returns: Boolean value True or False
@@ -156,127 +373,137 @@ class ComBox():
         else:
             return False
 
-    def reconnect(self, SERVER_HOST="192.168.0.210", SERVER_PORT=502, SERVER_UNIT=201):
+    def reconnect(self, SERVER_HOST = "192.168.0.210",SERVER_PORT = 502,SERVER_UNIT = None):
         """Reconnects communication with modbus client.
 
         Args:
             SERVER_HOST: network address of the ComBox. Default='192.168.0.210'
             SERVER_PORT: modbus TCP port. Default='502'
-            SERVER_UNIT: modbus address of the ComBox. Default='201'
+            SERVER_UNIT: modbus address of the device. Default=SERVER_UNIT of the class
 
         Returns: Boolean value True or False
 
         """
-        if self._port != 0:
+        if self._port !=0:
             self.close()
         self.open(SERVER_HOST=SERVER_HOST, SERVER_PORT=SERVER_PORT, SERVER_UNIT=SERVER_UNIT)
         time.sleep(1)
         return self.is_connected()
 
-    def read_firmware(self):
-        """This function reads the firmware version of the ComBox and returns it as a string.
+    def read_values(self, NAMES, RAW=False):
+        """This function reads the named values of the register map of the device. All registers are
+        requested with as few block reads as possible and decoded according to the register map.
 
-        Returns: string {firmware version}
+        Args:
+            NAMES: list of value names of the register map.
+            RAW: return the codes of enum values instead of their strings. Default=False
+
+        Returns: list of values in the order of NAMES dtype=float, dtype=int, and dtype=str.
 
         """
-        bitstream = self._port.read_holding_registers(0x001E, 7)# 0x001E Firmware Version str14
-        result = str(unpack('%ds' % 14, pack('<HHHHHHH', bitstream[0], bitstream[1], bitstream[2], bitstream[3], bitstream[4], bitstream[5], bitstream[6]))[0], 'utf-8')# combines seven 16bit registers into str14
-        return result
+        return register_decoder(self.REGISTER_MAP, NAMES).read(self._port, RAW)
 
+    def read_value(self, NAME):
+        """This function reads one named value of the register map of the device.
 
-    def read_Grid_Voltage(self):
-        """This function reads the Grid Voltage from the ComBox and returns Volt.
+        Args:
+            NAME: value name of the register map.
 
-        Returns: float {Grid Voltage in Volt}
+        Returns: float, int, or str {decoded value}
 
         """
-        bitstream = self._port.read_holding_registers(0x004C, 2)# 0x004C Grid Voltage uint32 r
-        result = unpack('<L',pack('<HH',bitstream[0],bitstream[1]))[0]/1000.0 # combines two 16bit registers into uint32
-        return result
+        return self.read_values((NAME,))[0]
 
-    def read_Grid_Frequency(self):
-        """This function reads the Grid Frequency from the ComBox and returns it in Hz.
+    def read_written(self, NAME):
+        """This function reads a value back after it was written and marks it as due in the snapshot of
+        the device, so the next read_*_All does not return the value from before the write.
 
-        Returns: float {Grid Frequency in Hz}
+        Args:
+            NAME: value name of the register map.
 
-        """
-        bitstream = self._port.read_holding_registers(0x004E, 2)# 0x004E Grid Frequency uint32 r
-        result = unpack('<L', pack('<HH', bitstream[0], bitstream[1]))[0] / 100.0  # combines two 16bit registers into uint32
-        return result
+        Returns: float, int, or str {decoded value}
 
+        """
+        if self._rates is not None:
+            self._rates.invalidate(NAME)
+        return self.read_value(NAME)
 
-# EMBEDDING XW CLASS ----------------------------------------------------
+    def open_async(self, CLIENT, SERVER_UNIT = None):
+        """Attaches the device to an AsyncModbusClient, which can be shared by all devices behind
+        the same ComBox. The client is opened by the caller with "await CLIENT.open()".
 
-class XW():
-    """This class implements functions specific to the Schneider XW+ 8548E Inverter """
-    def __init__(self):
-        ''' Constructor for this class. '''
-        self._port = 0
+        Args:
+            CLIENT: AsyncModbusClient connected to the ComBox.
+            SERVER_UNIT: modbus address of the device. Default=SERVER_UNIT of the class
 
+        Returns: NONE
 
-    def __del__(self):
-        ''' Destructor for this class. '''
-        if self._port !=0:
-            self.close()
+        """
+        if SERVER_UNIT is None:
+            SERVER_UNIT = self.SERVER_UNIT
+        self._async_port = CLIENT
+        self._async_unit = SERVER_UNIT
+        if self._rates is not None:
+            self._rates.reset()  # the values of a new connection are all read again
 
-    def open (self,SERVER_HOST = "192.168.0.210",SERVER_PORT = 502,SERVER_UNIT = 10):
-        """Open modbus connection to the ComBox
+    async def async_read_values(self, NAMES, RAW=False):
+        """This function is the asyncio variant of read_values and requires open_async.
 
         Args:
-            SERVER_HOST: network address of the ComBox. Default='192.168.0.210'
-            SERVER_PORT: modbus TCP port. Default='502'
-            SERVER_UNIT: modbus address of the XW+ Inverter. Default='10'
+            NAMES: list of value names of the register map.
+            RAW: return the codes of enum values instead of their strings. Default=False
 
-        Returns: Boolean value True or False
+        Returns: list of values in the order of NAMES dtype=float, dtype=int, and dtype=str.
 
         """
-        self._port = ModbusClient(SERVER_HOST, SERVER_PORT, SERVER_UNIT)
-        if not self._port.is_open():
-            if not self._port.open():
-                print("unable to connect to " + SERVER_HOST + ":" + str(SERVER_PORT))
+        return await register_decoder(self.REGISTER_MAP, NAMES).async_read(self._async_port, self._async_unit, RAW)
 
-        return self._port.is_open()
 
-    def close(self):
-        """Closes the modbusTCP connection
 
-        Returns: Boolean value True or False
+# EMBEDDING ComBox CLASS ----------------------------------------------------
 
-        """
-        self._port.close()
-        return not self._port.is_open()
+class ComBox(com):
+    """This class implements functions specific to the Schneider ComBox """
 
-    def is_connected(self):
-        """This function checks if the connection to the Schneider Conext XW+ is established
-        and if it responds to readout commands. It requests the firmware version of the XW+
-        and checks for an received bitstream.
+    REGISTER_MAP = COMBOX_MAP
+    SERVER_UNIT = 201 # default modbus address of the ComBox
 
-        Returns: Boolean value True or False
+    def read_firmware(self):
+        """This function reads the firmware version of the ComBox and returns it as a string.
+
+        Returns: string {firmware version}
 
-        return
         """
-        bitstream = self._port.read_holding_registers(0x001E, 7)  # 0x001E Firmware Version str20 r
-        if bitstream:
-            return True
-        else:
-            return False
+        return self.read_value('firmware')
 
-    def reconnect(self, SERVER_HOST="192.168.0.210", SERVER_PORT=502, SERVER_UNIT=10):
-        """Reconnects communication with modbus client.
+    def read_Grid_Voltage(self):
+        """This function reads the Grid Voltage from the ComBox and returns Volt.
 
-        Args:
-            SERVER_HOST: network address of the ComBox. Default='192.168.0.210'
-            SERVER_PORT: modbus TCP port. Default='502'
-            SERVER_UNIT: modbus address of the XW+ Inverter. Default='10'
+        Returns: float {Grid Voltage in Volt}
 
-        Returns: Boolean value True or False
+        """
+        return self.read_value('grid_voltage')
+
+    def read_Grid_Frequency(self):
+        """This function reads the Grid Frequency from the ComBox and returns it in Hz.
+
+        Returns: float {Grid Frequency in Hz}
 
         """
-        if self._port != 0:
-            self.close()
-        self.open(SERVER_HOST=SERVER_HOST, SERVER_PORT=SERVER_PORT, SERVER_UNIT=SERVER_UNIT)
-        time.sleep(1)
-        return self.is_connected()
+        return self.read_value('grid_frequency')
+
+# EMBEDDING XW CLASS ----------------------------------------------------
+
+class XW(com):
+    """This class implements functions specific to the Schneider XW+ 8548E Inverter """
+
+    REGISTER_MAP = XW_MAP
+    SERVER_UNIT = 10 # default modbus address of the XW+ Inverter
+
+    def __init__(self, SLOW_INTERVAL=300.0, TICK_INTERVAL=0.0):
+        ''' Constructor for this class. '''
+        com.__init__(self)
+        self._rates = Rate_Scheduler(XW_SNAPSHOT, XW_RATES, SLOW_INTERVAL=SLOW_INTERVAL, TICK_INTERVAL=TICK_INTERVAL)  # multi-rate snapshot
 
     def read_firmware(self):
         """This function reads the firmware version of the XW+ inverter and returns it as a string.
@@ -284,9 +511,7 @@ class XW():
         Returns: string {firmware version}
 
         """
-        bitstream = self._port.read_holding_registers(0x001E, 7)# 0x001E Firmware Version str14 r
-        result = str(unpack('%ds' % 14, pack('<HHHHHHH', bitstream[0], bitstream[1], bitstream[2], bitstream[3], bitstream[4], bitstream[5], bitstream[6]))[0], 'utf-8')  # combines seven 16bit registers into str14
-        return result.rstrip('\x00')
+        return self.read_value('firmware')
 
     def read_device_name(self):
         """This function reads the device name of the XW+ inverter and returns it as a string.
@@ -294,9 +519,7 @@ class XW():
         Returns: string {device name}
 
         """
-        bitstream = self._port.read_holding_registers(0x0000, 8)# 0x0000 Device Name str16 r
-        result = str(unpack('%ds' % 16, pack('<HHHHHHHH', bitstream[0], bitstream[1], bitstream[2], bitstream[3], bitstream[4], bitstream[5], bitstream[6], bitstream[7]))[0], 'utf-8')  # combines seven 16bit registers into str14
-        return result.rstrip('\x00')
+        return self.read_value('device_name')
 
     ###################################################################################################
     # Grid AC Read Functions
@@ -307,9 +530,7 @@ class XW():
         Returns: float {Grid AC Voltage in Volt}
 
         """
-        bitstream = self._port.read_holding_registers(0x0062, 2)  # 0x0062 Grid Voltage uint32 r
-        result = unpack('<L', pack('<HH', bitstream[0], bitstream[1]))[0] / 1000.0  # combines two 16bit registers into uint32
-        return result
+        return self.read_value('grid_voltage')
 
     def read_Grid_Current(self):
         """This function reads the Grid AC Current from the XW+ inverter and returns the Current in [Ampere].
@@ -317,9 +538,7 @@ class XW():
         Returns: float {Grid AC Current in Ampere}
 
         """
-        bitstream = self._port.read_holding_registers(0x0064, 2)  # 0x0064 Grid AC Current sint32 r
-        result = unpack('<l', pack('<HH', bitstream[0], bitstream[1]))[0] / 1000.0  # combines two 16bit registers into sint32
-        return result
+        return self.read_value('grid_current')
 
     def read_Grid_Power(self):
         """This function reads the Grid AC Power from the XW+ inverter and returns the Power in [Watt].
@@ -327,10 +546,7 @@ class XW():
         Returns: float {Grid AC Power in Watt}
 
         """
-        bitstream = self._port.read_holding_registers(0x0066, 2)  # 0x0066 Grid AC Power sint32 r
-        result = unpack('<l', pack('<HH', bitstream[0], bitstream[1]))[0] / 1.0  # combines two 16bit registers into sint32
-        return result
-
+        return self.read_value('grid_power')
 
     def read_Grid_Frequency(self):
         """This function reads the Grid AC Frequency from the XW+ inverter and returns it in Hz.
@@ -338,10 +554,7 @@ class XW():
         Returns: float {Grid AC Frequency in Hz}
 
         """
-        bitstream = self._port.read_holding_registers(0x0061, 1)  # 0x0061 Grid Frequency uint16 r
-        result = unpack('<H', pack('<H', bitstream[0]))[0] / 100.0
-        return result
-
+        return self.read_value('grid_frequency')
 
     ###################################################################################################
     # Load AC Read Functions
@@ -352,9 +565,7 @@ class XW():
         Returns: float {Load AC Voltage in Volt}
 
         """
-        bitstream = self._port.read_holding_registers(0x008C, 2)  # 0x008C Load Voltage uint32 r
-        result = unpack('<L', pack('<HH', bitstream[0], bitstream[1]))[0] / 1000.0  # combines two 16bit registers into uint32
-        return result
+        return self.read_value('load_voltage')
 
     def read_Load_Current(self):
         """This function reads the Load AC Current from the XW+ inverter and returns the Current in [Ampere].
@@ -362,9 +573,7 @@ class XW():
         Returns: float {Load AC Current in Ampere}
 
         """
-        bitstream = self._port.read_holding_registers(0x0096, 2)  # 0x0096 Load AC Current uint32 r
-        result = unpack('<L', pack('<HH', bitstream[0], bitstream[1]))[0] / 1000.0  # combines two 16bit registers into uint32
-        return result
+        return self.read_value('load_current')
 
     def read_Load_Power(self):
         """This function reads the Load AC Power from the XW+ inverter and returns the Power in [Watt].
@@ -372,10 +581,7 @@ class XW():
         Returns: float {Load AC Power in Watt}
 
         """
-        bitstream = self._port.read_holding_registers(0x009A, 2)  # 0x009A Load AC Power uint32 r
-        result = unpack('<L', pack('<HH', bitstream[0], bitstream[1]))[0] / 1.0  # combines two 16bit registers into uint32
-        return result
-
+        return self.read_value('load_power')
 
     def read_Load_Frequency(self):
         """This function reads the Load AC Frequency from the XW+ inverter and returns it in Hz.
@@ -383,9 +589,7 @@ class XW():
         Returns: float {Load AC Frequency in Hz}
 
         """
-        bitstream = self._port.read_holding_registers(0x0098, 1)  # 0x0098 Load Frequency uint16 r
-        result = unpack('<H', pack('<H', bitstream[0]))[0] / 100.0
-        return result
+        return self.read_value('load_frequency')
 
     ###################################################################################################
     # Inverter DC Read Functions
@@ -396,9 +600,7 @@ class XW():
         Returns: float {Inverter DC Current in Ampere}
 
         """
-        bitstream = self._port.read_holding_registers(0x0058, 2)  # 0x0058 Invert DC Current uint32 r
-        result = unpack('<L', pack('<HH', bitstream[0], bitstream[1]))[0] / 1000.0  # combines two 16bit registers into uint32
-        return result
+        return self.read_value('inverter_dc_current')
 
     def read_Inverter_DC_Power(self):
         """This function reads the Inverter DC Power from the XW+ inverter and returns the Power in [Watt].
@@ -406,11 +608,8 @@ class XW():
         Returns: float {Inverter DC Power in Watt}
 
         """
-        bitstream = self._port.read_holding_registers(0x005A, 2)  # 0x005A Invert DC Power uint32 r
-        result = unpack('<L', pack('<HH', bitstream[0], bitstream[1]))[0] / 1.0  # combines two 16bit registers into uint32
-        return result
+        return self.read_value('inverter_dc_power')
 
-    
     ###################################################################################################
     # Inverter Energy Read Functions
     ###################################################################################################
@@ -420,9 +619,7 @@ class XW():
         Returns: float {Energy from Grid in kWh}
 
         """
-        bitstream = self._port.read_holding_registers(0x010C, 2)  # 0x010C Grid Input Energy This Month uint32 r
-        result = unpack('<L', pack('<HH', bitstream[0], bitstream[1]))[0] / 1000.0  # combines two 16bit registers into uint32
-        return result
+        return self.read_value('energy_grid_month')
 
     def read_Energy_Load_Month(self):
         """This function reads the energy output to the load in the current month from the XW+ inverter and returns the Energy in [kWh].
@@ -430,9 +627,7 @@ class XW():
         Returns: float {Energy to Load in kWh}
 
         """
-        bitstream = self._port.read_holding_registers(0x013C, 2)  # 0x013C Load Output Energy This Month uint32 r
-        result = unpack('<L', pack('<HH', bitstream[0], bitstream[1]))[0] / 1000.0  # combines two 16bit registers into uint32
-        return result
+        return self.read_value('energy_load_month')
 
     def read_Energy_Battery_Month(self):
         """This function reads the energy output from the battery in the current month from the XW+ inverter and returns the Energy in [kWh].
@@ -440,10 +635,7 @@ class XW():
         Returns: float {Energy from Battery in kWh}
 
         """
-        bitstream = self._port.read_holding_registers(0x00DC, 2)  # 0x013C Energy From Battery This Month uint32 r
-        result = unpack('<L', pack('<HH', bitstream[0], bitstream[1]))[0] / 1000.0  # combines two 16bit registers into uint32
-        return result
-
+        return self.read_value('energy_battery_month')
 
     ###################################################################################################
     # Inverter Status, Error, and Warning Flags
@@ -454,14 +646,7 @@ class XW():
         Returns: string {Waring Status}
 
         """
-        bitstream = self._port.read_holding_registers(0x004C, 1) # 0x007A Inverter Active Warnings Flag uint16 r
-        result = unpack('<H', pack('<H', bitstream[0]))[0]
-        if result == 0:
-            return str('No Warnings')
-        elif result == 1:
-            return str('Active Warnings')
-        else:
-            return str('UNKNOWN STATE!')
+        return self.read_value('inverter_active_warnings_status')
 
     def read_Inverter_Active_Fault(self):
         """This function reads the Active Fault Flag from the XW+ inverter and returns the fault status as a string.
@@ -469,14 +654,7 @@ class XW():
         Returns: string {Fault Status}
 
         """
-        bitstream = self._port.read_holding_registers(0x004B, 1) # 0x007A Inverter Active Faults Flag uint16 r
-        result = unpack('<H', pack('<H', bitstream[0]))[0]
-        if result == 0:
-            return str('No Faults')
-        elif result == 1:
-            return str('Active Faults')
-        else:
-            return str('UNKNOWN STATE!')
+        return self.read_value('inverter_active_faults_status')
 
     def read_Inverter_Status(self):
         """This function reads the Inverter Status from the XW+ inverter and returns the status as a string.
@@ -484,41 +662,7 @@ class XW():
         Returns: string {status}
 
         """
-        bitstream = self._port.read_holding_registers(0x007A, 1) # 0x007A Inverter Status uint16 r
-        result = unpack('<H', pack('<H', bitstream[0]))[0]
-        if result == 1024:
-            return str('Invert')
-        elif result == 1025:
-            return str('AC Pass Through')
-        elif result == 1026:
-            return str('APS Only')
-        elif result == 1027:
-            return str('Load Sense')
-        elif result == 1028:
-            return str('Inverter Disabled')
-        elif result == 1029:
-            return str('Load Sense Ready')
-        elif result == 1030:
-            return str('Engaging Inverter')
-        elif result == 1031:
-            return str('Invert Fault')
-        elif result == 1032:
-            return str('Inverter Standby')
-        elif result == 1033:
-            return str('Grid-Tied')
-        elif result == 1034:
-            return str('Grid Support')
-        elif result == 1035:
-            return str('Gen Support')
-        elif result == 1036:
-            return str('Sell-to-Grid')
-        elif result == 1037:
-            return str('Load Shaving')
-        elif result == 1038:
-            return str('Grid Frequency Stabilization')
-        else:
-            return str('UNKNOWN STATE!')
-
+        return self.read_value('inverter_status')
 
     ###################################################################################################
     # Inverter Battery Related Functions
@@ -529,9 +673,7 @@ class XW():
         Returns: float {Low Battery Cut Out in Volt}
 
         """
-        bitstream = self._port.read_holding_registers(0x017C, 2) # 0x017C Low Battery Cut Out uint32 r/w
-        result = unpack('<L', pack('<HH', bitstream[0], bitstream[1]))[0] / 1000.0  # combines two 16bit registers into uint32
-        return result
+        return self.read_value('battery_low_voltage')
 
     def write_Low_Battery_Cut_Out(self, voltage=47):
         """This function writes the Low Battery Cut Out to the XW+ inverter and returns the value in the register.
@@ -547,10 +689,7 @@ class XW():
         else:
             print ('ERROR: Low Battery Voltage value out of range!')
 
-        bitstream = self._port.read_holding_registers(0x017C, 2) # 0x017C Low Battery Cut Out uint32 r/w
-        result = unpack('<L', pack('<HH', bitstream[0], bitstream[1]))[0] / 1000.0  # combines two 16bit registers into uint32
-        return result
-
+        return self.read_written('battery_low_voltage')
 
     def read_Low_Battery_Cut_Out_Delay(self):
         """This function reads the Low Battery Cut Out Delay from the XW+ inverter and returns it in Seconds.
@@ -558,9 +697,7 @@ class XW():
         Returns: float {Low Battery Cut Out Delay in Seconds}
 
         """
-        bitstream = self._port.read_holding_registers(0x017E, 1)  # 0x017E Low Battery Cut Out Delay uint16 r/w
-        result = unpack('<H', pack('<H', bitstream[0]))[0] / 100.0
-        return result
+        return self.read_value('battery_low_voltage_delay')
 
     def write_Low_Battery_Cut_Out_Delay(self, delay=0.1):
         """This function writes the Low Battery Cut Out Delay to the XW+ inverter and returns the value in the register.
@@ -576,10 +713,7 @@ class XW():
         else:
             print ('ERROR: Low Battery Delay value out of range!')
 
-        bitstream = self._port.read_holding_registers(0x017E, 1)  # 0x017E Low Battery Cut Out Delay uint16 r/w
-        result = unpack('<H', pack('<H', bitstream[0]))[0]/100.0
-        return result    
-
+        return self.read_written('battery_low_voltage_delay')
 
     def read_Hysteresis(self):
         """This function reads the Low_Battery_Cut_Out Hysteresis from the XW+ inverter and returns it in Volt.
@@ -587,10 +721,7 @@ class XW():
         Returns: float {Low Battery Cut Out Hysteresis in Volt}
 
         """
-
-        bitstream = self._port.read_holding_registers(0x01F2, 2)  # 0x017C Low Battery Cut Out Hysteresis uint32 r/w
-        result = unpack('<L', pack('<HH', bitstream[0], bitstream[1]))[0] / 1000.0  # combines two 16bit registers into uint32
-        return result
+        return self.read_value('battery_hysteresis')
 
     def write_Hysteresis(self, voltage=2.3):
         """This function writes the Low Battery Cut Out Hysteresis to the XW+ inverter and returns the value in the register.
@@ -606,10 +737,7 @@ class XW():
         else:
             print ('ERROR: Hysteresis Voltage value out of range!')
 
-        bitstream = self._port.read_holding_registers(0x01F2, 2)  # 0x017C Low Battery Cut Out Hysteresis uint32 r/w
-        result = unpack('<L', pack('<HH', bitstream[0], bitstream[1]))[0] / 1000.0  # combines two 16bit registers into uint32
-        return result
-
+        return self.read_written('battery_hysteresis')
 
     ###################################################################################################
     # Inverter Control Functions
@@ -620,12 +748,7 @@ class XW():
         Returns: str {Grid Support state}
 
         """
-        bitstream = self._port.read_holding_registers(0x01B3, 1)  # 0x01B3 Grid Support uint16 r
-        result = unpack('<H', pack('<H', bitstream[0]))[0]
-        if result == 0:
-            return str('Disable')
-        if result == 1:
-            return str('Enable')
+        return self.read_value('inverter_grid_support_status')
 
     def write_Grid_Support_Status(self, status):
         """This function writes the Grid Support to the XW+ inverter and returns the value in the register.
@@ -640,13 +763,7 @@ class XW():
         else:
             print ('ERROR:Grid Support Input Parameter must be: "enable" or "disable"')
 
-        bitstream = self._port.read_holding_registers(0x01B2, 1)  # 0x01B3 Grid Support uint16 r/w
-        result = unpack('<H', pack('<H', bitstream[0]))[0]
-        if result == 0:
-            return str('Disable')
-        if result == 1:
-            return str('Enable')
-
+        return self.read_written('inverter_grid_support_status')
 
     def read_Load_Shave_Status(self):
         """This function reads the Load Shave status from the XW+ inverter and returns the state.
@@ -654,12 +771,7 @@ class XW():
         Returns: str {Load Shave state}
 
         """
-        bitstream = self._port.read_holding_registers(0x01B2, 1)  # 0x017E Low Battery Cut Out Delay uint16 r/w
-        result = unpack('<H', pack('<H', bitstream[0]))[0]
-        if result == 0:
-            return str('Disable')
-        if result == 1:
-            return str('Enable')
+        return self.read_value('inverter_load_shave_status')
 
     def write_Load_Shave_Status(self, status):
         """This function writes the Load Shave to the XW+ inverter and returns the value in the register.
@@ -674,12 +786,7 @@ class XW():
         else:
             print ('ERROR: Load Shave Input Parameter must be: "enable" or "disable"')
 
-        bitstream = self._port.read_holding_registers(0x01B2, 1)  # 0x01B2 Load Shave uint16 r/w
-        result = unpack('<H', pack('<H', bitstream[0]))[0]
-        if result == 0:
-            return str('Disable')
-        if result == 1:
-            return str('Enable')
+        return self.read_written('inverter_load_shave_status')
 
     ###################################################################################################
     # Inverter Read All for SQL Query
@@ -688,123 +795,48 @@ class XW():
 
     def read_Inverter_All(self):
         """This function reads all inverter XW+ specific values and returns a list with the aquired values.
+        The values are defined by XW_SNAPSHOT in conext_map and are read with a few block reads (see plan_block_reads).
+        Only the values of the rate classes which are due (XW_RATES) are read, the others are the last known values.
 
         Args:
             NONE
 
-        Returns: XW_list: list of length [1] containing:
+        Returns: XW_list: list of length [1] of XW_Snapshot with the values:
             [inverter, grid_voltage, grid_current, grid_power, grid_frequency, load_voltage, load_current, load_power, load_frequency,
             inverter_dc_current, inverter_dc_power, energy_grid_month, energy_load_month, energy_battery_month, battery_low_voltage,
             battery_low_voltage_delay, battery_hysteresis, inverter_status, inverter_active_warnings_status, inverter_active_faults_status,
             inverter_grid_support_status, inverter_load_shave_status]
-            dtype=float and dtype=str.
-
-
-        """
-        XW_list = [[0 for i in range(22)] for j in range(1)]
-
-            
-        XW_list[0][0] = self.read_device_name()
-        XW_list[0][1] = self.read_Grid_Voltage()
-        XW_list[0][2] = self.read_Grid_Current()
-        XW_list[0][3] = self.read_Grid_Power()
-        XW_list[0][4] = self.read_Grid_Frequency()
-        XW_list[0][5] = self.read_Load_Voltage()
-        XW_list[0][6] = self.read_Load_Current()
-        XW_list[0][7] = self.read_Load_Power()
-        XW_list[0][8] = self.read_Load_Frequency()
-        XW_list[0][9] = self.read_Inverter_DC_Current()
-        XW_list[0][10] = self.read_Inverter_DC_Power()
-        XW_list[0][11] = self.read_Energy_Grid_Month()
-        XW_list[0][12] = self.read_Energy_Load_Month()
-        XW_list[0][13] = self.read_Energy_Battery_Month()
-        XW_list[0][14] = self.read_Low_Battery_Cut_Out()
-        XW_list[0][15] = self.read_Low_Battery_Cut_Out_Delay()
-        XW_list[0][16] = self.read_Hysteresis()
-        XW_list[0][17] = self.read_Inverter_Status()
-        XW_list[0][18] = self.read_Inverter_Active_Warning()
-        XW_list[0][19] = self.read_Inverter_Active_Fault()
-        XW_list[0][20] = self.read_Grid_Support_Status()
-        XW_list[0][21] = self.read_Load_Shave_Status()
-
-        return XW_list
-
-
-
-
-
-# EMBEDDING MPPT 60 150 CLASS ----------------------------------------------------
-
-class MPPT60():
-    """This class implements functions specific to the Schneider MPPT 60 150 Charge Controller"""
-    def __init__(self):
-        ''' Constructor for this class. '''
-        self._port = 0
+            dtype=float, dtype=str, and dtype=int for the status codes (see decode_status), and the unix time of the read (time).
 
 
-    def __del__(self):
-        ''' Destructor for this class. '''
-        if self._port !=0:
-            self.close()
-
-    def open (self,SERVER_HOST = "192.168.0.210",SERVER_PORT = 502,SERVER_UNIT = 30):
-        """Open modbus connection to the MPPT 60 150
-
-        Args:
-            SERVER_HOST: network address of the ComBox. Default='192.168.0.210'
-            SERVER_PORT: modbus TCP port. Default='502'
-            SERVER_UNIT: modbus address of the MPPT 60 150 Charge Controller. Default='30'
-
-        Returns: Boolean value True or False
-
         """
-        self._port = ModbusClient(SERVER_HOST, SERVER_PORT, SERVER_UNIT)
-        if not self._port.is_open():
-            if not self._port.open():
-                print("unable to connect to " + SERVER_HOST + ":" + str(SERVER_PORT))
+        XW_list = [XW_Snapshot(self._rates.read(self.read_values, RAW=True))]
 
-        return self._port.is_open()
+        return XW_list
 
-    def close(self):
-        """Closes the modbusTCP connection
+    async def async_read_Inverter_All(self):
+        """This function is the asyncio variant of read_Inverter_All and requires open_async.
+        Several devices behind one ComBox can be read in parallel with asyncio.gather.
 
-        Returns: Boolean value True or False
+        Returns: XW_list: list of length [1], see read_Inverter_All.
 
         """
-        self._port.close()
-        return not self._port.is_open()
+        XW_list = [XW_Snapshot(await self._rates.async_read(self.async_read_values, RAW=True))]
 
-    def is_connected(self):
-        """This function checks if the connection to the Schneider Conext MPPT 60 150 is established
-        and if it responds to readout commands. It requests the firmware version of the device
-        and checks for an received bitstream.
-
-        Returns: Boolean value True or False
-
-        return
-        """
-        bitstream = self._port.read_holding_registers(0x001E, 7)  # 0x001E Firmware Version str20 r
-        if bitstream:
-            return True
-        else:
-            return False
+        return XW_list
 
-    def reconnect(self, SERVER_HOST="192.168.0.210", SERVER_PORT=502, SERVER_UNIT=30):
-        """Reconnects communication with modbus client.
+# EMBEDDING MPPT 60 150 CLASS ----------------------------------------------------
 
-        Args:
-            SERVER_HOST: network address of the ComBox. Default='192.168.0.210'
-            SERVER_PORT: modbus TCP port. Default='502'
-            SERVER_UNIT: modbus address of the MPPT 60 150 Charge Controller. Default='30'
+class MPPT60(com):
+    """This class implements functions specific to the Schneider MPPT 60 150 Charge Controller"""
 
-        Returns: Boolean value True or False
+    REGISTER_MAP = MPPT_MAP
+    SERVER_UNIT = 30 # default modbus address of the MPPT 60 150 Charge Controller
 
-        """
-        if self._port != 0:
-            self.close()
-        self.open(SERVER_HOST=SERVER_HOST, SERVER_PORT=SERVER_PORT, SERVER_UNIT=SERVER_UNIT)
-        time.sleep(1)
-        return self.is_connected()
+    def __init__(self, SLOW_INTERVAL=300.0, TICK_INTERVAL=0.0):
+        ''' Constructor for this class. '''
+        com.__init__(self)
+        self._rates = Rate_Scheduler(MPPT_SNAPSHOT, MPPT_RATES, SLOW_INTERVAL=SLOW_INTERVAL, TICK_INTERVAL=TICK_INTERVAL)  # multi-rate snapshot
 
     def read_firmware(self):
         """This function reads the firmware version of the MPPT 60 150 Charge Controller and returns it as a string.
@@ -812,9 +844,7 @@ class MPPT60():
         Returns: string {firmware version}
 
         """
-        bitstream = self._port.read_holding_registers(0x001E, 7)# 0x001E Firmware Version str14 r
-        result = str(unpack('%ds' % 14, pack('<HHHHHHH', bitstream[0], bitstream[1], bitstream[2], bitstream[3], bitstream[4], bitstream[5], bitstream[6]))[0], 'utf-8')  # combines seven 16bit registers into str14
-        return result.rstrip('\x00')
+        return self.read_value('firmware')
 
     def read_device_name(self):
         """This function reads the device name of the MPPT 60 150 Charge Controller and returns it as a string.
@@ -822,9 +852,7 @@ class MPPT60():
         Returns: string {device name}
 
         """
-        bitstream = self._port.read_holding_registers(0x0000, 8)# 0x0000 Device Name str16 rw
-        result = str(unpack('%ds' % 16, pack('<HHHHHHHH', bitstream[0], bitstream[1], bitstream[2], bitstream[3], bitstream[4], bitstream[5], bitstream[6], bitstream[7]))[0], 'utf-8')  # combines eight 16bit registers into str16
-        return result.rstrip('\x00')
+        return self.read_value('device_name')
 
     ###################################################################################################
     # MPPT Energy Read Functions
@@ -835,9 +863,7 @@ class MPPT60():
         Returns: float {Energy from PV in kWh}
 
         """
-        bitstream = self._port.read_holding_registers(0x006A, 2)  # 0x006A Energy from PV this day uint32 r
-        result = unpack('<L', pack('<HH', bitstream[0], bitstream[1]))[0] / 1000.0  # combines two 16bit registers into uint32
-        return result
+        return self.read_value('energy_pv_day')
 
     def read_Energy_PV_Week(self):
         """This function reads the energy input from the PV in the current week from the MPPT 60 150 Charge Controller and returns the Energy in [kWh].
@@ -845,9 +871,7 @@ class MPPT60():
         Returns: float {Energy from PV in kWh}
 
         """
-        bitstream = self._port.read_holding_registers(0x006E, 2)  # 0x006E Energy from PV this week uint32 r
-        result = unpack('<L', pack('<HH', bitstream[0], bitstream[1]))[0] / 1000.0  # combines two 16bit registers into uint32
-        return result
+        return self.read_value('energy_pv_week')
 
     def read_Energy_PV_Month(self):
         """This function reads the energy input from the PV in the current month from the MPPT 60 150 Charge Controller and returns the Energy in [kWh].
@@ -855,9 +879,7 @@ class MPPT60():
         Returns: float {Energy from PV in kWh}
 
         """
-        bitstream = self._port.read_holding_registers(0x0072, 2)  # 0x0072 Energy from PV this Month uint32 r
-        result = unpack('<L', pack('<HH', bitstream[0], bitstream[1]))[0] / 1000.0  # combines two 16bit registers into uint32
-        return result
+        return self.read_value('energy_pv_month')
 
     def read_Energy_PV_Year(self):
         """This function reads the energy input from the PV in the current year from the MPPT 60 150 Charge Controller and returns the Energy in [kWh].
@@ -865,10 +887,7 @@ class MPPT60():
         Returns: float {Energy from PV in kWh}
 
         """
-        bitstream = self._port.read_holding_registers(0x0076, 2)  # 0x0076 Energy from PV this Year uint32 r
-        result = unpack('<L', pack('<HH', bitstream[0], bitstream[1]))[0] / 1000.0  # combines two 16bit registers into uint32
-        return result
-
+        return self.read_value('energy_pv_year')
 
     ###################################################################################################
     # MPPT DC Input Read Functions
@@ -879,9 +898,7 @@ class MPPT60():
         Returns: float {MPPP DC Input Voltage in Volt}
 
         """
-        bitstream = self._port.read_holding_registers(0x004C, 2)  # 0x004C Input DC Voltage uint32 r
-        result = unpack('<L', pack('<HH', bitstream[0], bitstream[1]))[0] / 1000.0  # combines two 16bit registers into uint32
-        return result
+        return self.read_value('dc_input_voltage')
 
     def read_DC_Input_Current(self):
         """This function reads the MPPT DC Input Current and returns the value in [Ampere].
@@ -889,9 +906,7 @@ class MPPT60():
         Returns: float {MPPT DC Input Current in Ampere}
 
         """
-        bitstream = self._port.read_holding_registers(0x004E, 2)  # 0x004E Input DC Current uint32 r
-        result = unpack('<L', pack('<HH', bitstream[0], bitstream[1]))[0] / 1000.0  # combines two 16bit registers into uint32
-        return result
+        return self.read_value('dc_input_current')
 
     def read_DC_Input_Power(self):
         """This function reads the MPPT DC Input Power and returns the value in [Watt].
@@ -899,9 +914,7 @@ class MPPT60():
         Returns: float {MPPT DC Input Power in Watt}
 
         """
-        bitstream = self._port.read_holding_registers(0x0050, 2)  # 0x0050 Input DC Power uint32 r
-        result = unpack('<L', pack('<HH', bitstream[0], bitstream[1]))[0] / 1.0  # combines two 16bit registers into uint32
-        return result
+        return self.read_value('dc_input_power')
 
     ###################################################################################################
     # MPPT DC Output Read Functions
@@ -912,9 +925,7 @@ class MPPT60():
         Returns: float {MPPP DC Output Voltage in Volt}
 
         """
-        bitstream = self._port.read_holding_registers(0x0058, 2)  # 0x0058 Output DC Voltage sint32 r
-        result = unpack('<l', pack('<HH', bitstream[0], bitstream[1]))[0] / 1000.0  # combines two 16bit registers into sint32
-        return result
+        return self.read_value('dc_output_voltage')
 
     def read_DC_Output_Current(self):
         """This function reads the MPPT DC Output Current and returns the value in [Ampere].
@@ -922,9 +933,7 @@ class MPPT60():
         Returns: float {MPPT DC Output Current in Ampere}
 
         """
-        bitstream = self._port.read_holding_registers(0x005A, 2)  # 0x005A Output DC Current sint32 r
-        result = unpack('<l', pack('<HH', bitstream[0], bitstream[1]))[0] / 1000.0  # combines two 16bit registers into sint32
-        return result
+        return self.read_value('dc_output_current')
 
     def read_DC_Output_Power(self):
         """This function reads the MPPT DC Output Power and returns the value in [Watt].
@@ -932,9 +941,7 @@ class MPPT60():
         Returns: float {MPPT DC Output Power in Watt}
 
         """
-        bitstream = self._port.read_holding_registers(0x005C, 2)  # 0x005C Output DC Power uint32 r
-        result = unpack('<L', pack('<HH', bitstream[0], bitstream[1]))[0] / 1.0  # combines two 16bit registers into uint32
-        return result
+        return self.read_value('dc_output_power')
 
     def read_DC_Output_Power_Percentage(self):
         """This function reads the MPPT DC Output Power Percentage and returns the value in [%].
@@ -942,9 +949,7 @@ class MPPT60():
         Returns: float {MPPT DC Output Power Percentage in %}
 
         """
-        bitstream = self._port.read_holding_registers(0x005E, 2)  # 0x005E Output DC Power Percentage uint16 r
-        result = unpack('<H', pack('<H', bitstream[0]))[0] / 1.0  # unpacks the 16bit bitstream into uint16
-        return result
+        return self.read_value('dc_output_power_percentage')
 
     ###################################################################################################
     # MPPT Status, Error, and Warning Flags
@@ -955,14 +960,7 @@ class MPPT60():
         Returns: string {Waring Status}
 
         """
-        bitstream = self._port.read_holding_registers(0x0045, 1) # 0x0045 Active Warnings Flag uint16 r
-        result = unpack('<H', pack('<H', bitstream[0]))[0]
-        if result == 0:
-            return str('No Warnings')
-        elif result == 1:
-            return str('Active Warnings')
-        else:
-            return str('UNKNOWN STATE!')
+        return self.read_value('mppt_active_warnings_status')
 
     def read_MPPT_Active_Fault(self):
         """This function reads the Active Fault Flag from the MPPT 60 150 Charge Controller and returns the fault status as a string.
@@ -970,14 +968,7 @@ class MPPT60():
         Returns: string {Fault Status}
 
         """
-        bitstream = self._port.read_holding_registers(0x0044, 1) # 0x0044 Active Faults Flag uint16 r
-        result = unpack('<H', pack('<H', bitstream[0]))[0]
-        if result == 0:
-            return str('No Faults')
-        elif result == 1:
-            return str('Active Faults')
-        else:
-            return str('UNKNOWN STATE!')
+        return self.read_value('mppt_active_faults_status')
 
     def read_MPPT_Status(self):
         """This function reads the MPPT 60 150 Charge Controller Status and returns the status as a string.
@@ -985,24 +976,7 @@ class MPPT60():
         Returns: string {status}
 
         """
-        bitstream = self._port.read_holding_registers(0x0040, 1) # 0x0040 Device Status uint16 r
-        result = unpack('<H', pack('<H', bitstream[0]))[0]
-        if result == 0:
-            return str('Hibernate')
-        elif result == 1:
-            return str('Power Save')
-        elif result == 2:
-            return str('Safe Mode')
-        elif result == 3:
-            return str('Operating')
-        elif result == 4:
-            return str('Diagnostic Mode')
-        elif result == 5:
-            return str('Remote Power Off')
-        elif result == 255:
-            return str('Data Not Available')
-        else:
-            return str('UNKNOWN STATE!')
+        return self.read_value('mppt_status')
 
     def read_MPPT_Charger_Status(self):
         """This function reads the MPPT 60 150 Charge Controller Charger Status and returns the status as a string.
@@ -1010,53 +984,7 @@ class MPPT60():
         Returns: string {status}
 
         """
-        bitstream = self._port.read_holding_registers(0x0049, 1) # 0x0049 Charger Status uint16 r
-        result = unpack('<H', pack('<H', bitstream[0]))[0]
-        if result == 768:
-            return str('Not Charging')
-        elif result == 769:
-            return str('Bulk')
-        elif result == 770:
-            return str('Absorption')
-        elif result == 771:
-            return str('Overcharge')
-        elif result == 772:
-            return str('Equalize')
-        elif result == 773:
-            return str('Float')
-        elif result == 774:
-            return str('No Float')
-        elif result == 775:
-            return str('Constant VI')
-        elif result == 776:
-            return str('Charger Disabled')
-        elif result == 777:
-            return str('Qualifying AC')
-        elif result == 778:
-            return str('Qualifying APS')
-        elif result == 779:
-            return str('Engaging Charger')
-        elif result == 780:
-            return str('Charge Fault')
-        elif result == 781:
-            return str('Charger Suspend')
-        elif result == 782:
-            return str('AC Good')
-        elif result == 783:
-            return str('APS Good')
-        elif result == 784:
-            return str('AC Fault')
-        elif result == 785:
-            return str('Charge')
-        elif result == 786:
-            return str('Absorption Exit Pending')
-        elif result == 787:
-            return str('Ground Fault')
-        elif result == 788:
-            return str('AC Good Pending')
-        else:
-            return str('UNKNOWN STATE!')
-
+        return self.read_value('mppt_charger_status')
 
     ###################################################################################################
     # MPPT Read All for SQL Query
@@ -1065,42 +993,31 @@ class MPPT60():
 
     def read_MPPT_All(self):
         """This function reads all inverter XW+ specific values and returns a list with the aquired values.
+        Only the values of the rate classes which are due (MPPT_RATES) are read, the others are the last known values.
 
         Args:
             NONE
 
-        Returns: MPPT_list: list of length [1] containing:
+        Returns: MPPT_list: list of length [1] of MPPT_Snapshot with the values:
             [device_name,dc_input_voltage,dc_input_current,dc_input_power,dc_output_voltage,dc_output_current,dc_output_power,
             dc_output_power_percentage,energy_pv_day,energy_pv_week,energy_pv_month,energy_pv_year,mppt_status,
             mppt_charger_status,mppt_active_warnings_status,mppt_active_faults_status]
-            dtype=float and dtype=str.
-
-
-        """
-        MPPT_list = [[0 for i in range(16)] for j in range(1)]
-            
-        MPPT_list[0][0] = self.read_device_name()
-        MPPT_list[0][1] = self.read_DC_Input_Voltage()
-        MPPT_list[0][2] = self.read_DC_Input_Current()
-        MPPT_list[0][3] = self.read_DC_Input_Power()
-        MPPT_list[0][4] = self.read_DC_Output_Voltage()
-        MPPT_list[0][5] = self.read_DC_Output_Current()
-        MPPT_list[0][6] = self.read_DC_Output_Power()
-        MPPT_list[0][7] = self.read_DC_Output_Power_Percentage()
-        MPPT_list[0][8] = self.read_Energy_PV_Day()
-        MPPT_list[0][9] = self.read_Energy_PV_Week()
-        MPPT_list[0][10] = self.read_Energy_PV_Month()
-        MPPT_list[0][11] = self.read_Energy_PV_Year()
-        MPPT_list[0][12] = self.read_MPPT_Status()
-        MPPT_list[0][13] = self.read_MPPT_Charger_Status()
-        MPPT_list[0][14] = self.read_MPPT_Active_Warning()
-        MPPT_list[0][15] = self.read_MPPT_Active_Fault()
-    
-        return MPPT_list
+            dtype=float, dtype=str, and dtype=int for the status codes (see decode_status), and the unix time of the read (time).
 
 
+        """
+        MPPT_list = [MPPT_Snapshot(self._rates.read(self.read_values, RAW=True))]
 
+        return MPPT_list
 
+    async def async_read_MPPT_All(self):
+        """This function is the asyncio variant of read_MPPT_All and requires open_async.
+        Several devices behind one ComBox can be read in parallel with asyncio.gather.
 
+        Returns: MPPT_list: list of length [1], see read_MPPT_All.
 
+        """
+        MPPT_list = [MPPT_Snapshot(await self._rates.async_read(self.async_read_values, RAW=True))]
+
+        return MPPT_list
 
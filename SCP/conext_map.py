@@ -0,0 +1,205 @@
+""" This module contains the modbus register maps of the Schneider Conext; ComBox, MPPT60 150,
+and XW+ Battery Inverter.
+
+**Description:**
+
+    Each device has one table which lists for every value its name, register address, type,
+    scale, and enum table. The values are taken from the Modbus map documents in the
+    "documents" directory. The name of each value is identical to the column name in the
+    mysql database. The tables are used by the device classes in "conext_com" to read and
+    decode the registers, so a new value only requires a new line in the table.
+    Register types:
+        uint16: one 16bit register
+        uint32: two 16bit registers, low word first
+        sint32: two 16bit registers, low word first, signed
+        strN:   N/2 16bit registers containing a string of N characters
+    The scale is the divisor applied to the raw register value. An enum table converts the
+    raw register value into a string. The mysql tables store the raw code of the status
+    columns (STATUS_COLUMNS) as SMALLINT, the names are kept in the lookup table conext_status.
+    The rate class of a value (XW_RATES, MPPT_RATES) defines how often it is read by the
+    snapshot functions, see RATE_CLASSES.
+
+"""
+
+
+# ENUM TABLES ----------------------------------------------------
+
+UNKNOWN_STATE = 'UNKNOWN STATE!'
+
+WARNING_STATUS = {0: 'No Warnings',
+                  1: 'Active Warnings'}
+
+FAULT_STATUS = {0: 'No Faults',
+                1: 'Active Faults'}
+
+ENABLE_STATUS = {0: 'Disable',
+                 1: 'Enable'}
+
+INVERTER_STATUS = {1024: 'Invert',
+                   1025: 'AC Pass Through',
+                   1026: 'APS Only',
+                   1027: 'Load Sense',
+                   1028: 'Inverter Disabled',
+                   1029: 'Load Sense Ready',
+                   1030: 'Engaging Inverter',
+                   1031: 'Invert Fault',
+                   1032: 'Inverter Standby',
+                   1033: 'Grid-Tied',
+                   1034: 'Grid Support',
+                   1035: 'Gen Support',
+                   1036: 'Sell-to-Grid',
+                   1037: 'Load Shaving',
+                   1038: 'Grid Frequency Stabilization'}
+
+MPPT_STATUS = {0: 'Hibernate',
+               1: 'Power Save',
+               2: 'Safe Mode',
+               3: 'Operating',
+               4: 'Diagnostic Mode',
+               5: 'Remote Power Off',
+               255: 'Data Not Available'}
+
+CHARGER_STATUS = {768: 'Not Charging',
+                  769: 'Bulk',
+                  770: 'Absorption',
+                  771: 'Overcharge',
+                  772: 'Equalize',
+                  773: 'Float',
+                  774: 'No Float',
+                  775: 'Constant VI',
+                  776: 'Charger Disabled',
+                  777: 'Qualifying AC',
+                  778: 'Qualifying APS',
+                  779: 'Engaging Charger',
+                  780: 'Charge Fault',
+                  781: 'Charger Suspend',
+                  782: 'AC Good',
+                  783: 'APS Good',
+                  784: 'AC Fault',
+                  785: 'Charge',
+                  786: 'Absorption Exit Pending',
+                  787: 'Ground Fault',
+                  788: 'AC Good Pending'}
+
+
+# REGISTER TYPES ----------------------------------------------------
+
+REGISTER_TYPES = {'uint16': 1, 'uint32': 2, 'sint32': 2, 'str14': 7, 'str16': 8} # number of 16bit registers per type
+REGISTER_FORMATS = {'uint16': 'H', 'uint32': 'I', 'sint32': 'i', 'str14': '14s', 'str16': '16s'} # struct format of the little endian registers
+
+
+# RATE CLASSES ----------------------------------------------------
+
+RATE_ONCE = 'once'  # read once per connection, e.g. the device name
+RATE_SLOW = 'slow'  # read every slow interval (default 5 minutes), e.g. energy counters and settings
+RATE_TICK = 'tick'  # read every tick interval (default every control loop tick)
+RATE_FAST = 'fast'  # read on every snapshot, e.g. power and current
+RATE_CLASSES = (RATE_ONCE, RATE_SLOW, RATE_TICK, RATE_FAST)
+
+
+# ComBox REGISTER MAP ----------------------------------------------------
+
+COMBOX_MAP = {
+    # name                  address  type      scale   enum
+    'firmware':            (0x001E, 'str14',  None,   None),
+    'grid_voltage':        (0x004C, 'uint32', 1000.0, None),
+    'grid_frequency':      (0x004E, 'uint32', 100.0,  None),
+}
+
+
+# XW REGISTER MAP ----------------------------------------------------
+
+XW_MAP = {
+    # name                              address  type      scale   enum
+    'device_name':                     (0x0000, 'str16',  None,   None),
+    'grid_voltage':                    (0x0062, 'uint32', 1000.0, None),
+    'grid_current':                    (0x0064, 'sint32', 1000.0, None),
+    'grid_power':                      (0x0066, 'sint32', 1.0,    None),
+    'grid_frequency':                  (0x0061, 'uint16', 100.0,  None),
+    'load_voltage':                    (0x008C, 'uint32', 1000.0, None),
+    'load_current':                    (0x0096, 'uint32', 1000.0, None),
+    'load_power':                      (0x009A, 'uint32', 1.0,    None),
+    'load_frequency':                  (0x0098, 'uint16', 100.0,  None),
+    'inverter_dc_current':             (0x0058, 'uint32', 1000.0, None),
+    'inverter_dc_power':               (0x005A, 'uint32', 1.0,    None),
+    'energy_grid_month':               (0x010C, 'uint32', 1000.0, None),
+    'energy_load_month':               (0x013C, 'uint32', 1000.0, None),
+    'energy_battery_month':            (0x00DC, 'uint32', 1000.0, None),
+    'battery_low_voltage':             (0x017C, 'uint32', 1000.0, None),
+    'battery_low_voltage_delay':       (0x017E, 'uint16', 100.0,  None),
+    'battery_hysteresis':              (0x01F2, 'uint32', 1000.0, None),
+    'inverter_status':                 (0x007A, 'uint16', None,   INVERTER_STATUS),
+    'inverter_active_warnings_status': (0x004C, 'uint16', None,   WARNING_STATUS),
+    'inverter_active_faults_status':   (0x004B, 'uint16', None,   FAULT_STATUS),
+    'inverter_grid_support_status':    (0x01B3, 'uint16', None,   ENABLE_STATUS),
+    'inverter_load_shave_status':      (0x01B2, 'uint16', None,   ENABLE_STATUS),
+    'firmware':                        (0x001E, 'str14',  None,   None),
+}
+
+# Values returned by XW.read_Inverter_All(), in the column order of the conext_xw table.
+XW_SNAPSHOT = ('device_name', 'grid_voltage', 'grid_current', 'grid_power', 'grid_frequency', 'load_voltage',
+               'load_current', 'load_power', 'load_frequency', 'inverter_dc_current', 'inverter_dc_power',
+               'energy_grid_month', 'energy_load_month', 'energy_battery_month', 'battery_low_voltage',
+               'battery_low_voltage_delay', 'battery_hysteresis', 'inverter_status', 'inverter_active_warnings_status',
+               'inverter_active_faults_status', 'inverter_grid_support_status', 'inverter_load_shave_status')
+
+# Rate classes of the snapshot values, values which are not listed are read with RATE_TICK.
+XW_RATES = {'device_name': RATE_ONCE,
+            'grid_current': RATE_FAST,
+            'grid_power': RATE_FAST,
+            'load_current': RATE_FAST,
+            'load_power': RATE_FAST,
+            'inverter_dc_current': RATE_FAST,
+            'inverter_dc_power': RATE_FAST,
+            'energy_grid_month': RATE_SLOW,
+            'energy_load_month': RATE_SLOW,
+            'energy_battery_month': RATE_SLOW,
+            'battery_low_voltage': RATE_SLOW,
+            'battery_low_voltage_delay': RATE_SLOW,
+            'battery_hysteresis': RATE_SLOW}
+
+
+# MPPT 60 150 REGISTER MAP ----------------------------------------------------
+
+MPPT_MAP = {
+    # name                          address  type      scale   enum
+    'device_name':                 (0x0000, 'str16',  None,   None),
+    'dc_input_voltage':            (0x004C, 'uint32', 1000.0, None),
+    'dc_input_current':            (0x004E, 'uint32', 1000.0, None),
+    'dc_input_power':              (0x0050, 'uint32', 1.0,    None),
+    'dc_output_voltage':           (0x0058, 'sint32', 1000.0, None),
+    'dc_output_current':           (0x005A, 'sint32', 1000.0, None),
+    'dc_output_power':             (0x005C, 'uint32', 1.0,    None),
+    'dc_output_power_percentage':  (0x005E, 'uint16', 1.0,    None),
+    'energy_pv_day':               (0x006A, 'uint32', 1000.0, None),
+    'energy_pv_week':              (0x006E, 'uint32', 1000.0, None),
+    'energy_pv_month':             (0x0072, 'uint32', 1000.0, None),
+    'energy_pv_year':              (0x0076, 'uint32', 1000.0, None),
+    'mppt_status':                 (0x0040, 'uint16', None,   MPPT_STATUS),
+    'mppt_charger_status':         (0x0049, 'uint16', None,   CHARGER_STATUS),
+    'mppt_active_warnings_status': (0x0045, 'uint16', None,   WARNING_STATUS),
+    'mppt_active_faults_status':   (0x0044, 'uint16', None,   FAULT_STATUS),
+    'firmware':                    (0x001E, 'str14',  None,   None),
+}
+
+# Values returned by MPPT60.read_MPPT_All(), in the column order of the conext_mppt table.
+MPPT_SNAPSHOT = ('device_name', 'dc_input_voltage', 'dc_input_current', 'dc_input_power', 'dc_output_voltage',
+                 'dc_output_current', 'dc_output_power', 'dc_output_power_percentage', 'energy_pv_day', 'energy_pv_week',
+                 'energy_pv_month', 'energy_pv_year', 'mppt_status', 'mppt_charger_status', 'mppt_active_warnings_status',
+                 'mppt_active_faults_status')
+
+# Rate classes of the snapshot values, values which are not listed are read with RATE_TICK.
+MPPT_RATES = {'device_name': RATE_ONCE,
+              'dc_input_current': RATE_FAST,
+              'dc_input_power': RATE_FAST,
+              'dc_output_current': RATE_FAST,
+              'dc_output_power': RATE_FAST,
+              'dc_output_power_percentage': RATE_FAST,
+              'energy_pv_day': RATE_SLOW,
+              'energy_pv_week': RATE_SLOW,
+              'energy_pv_month': RATE_SLOW,
+              'energy_pv_year': RATE_SLOW}
+
+# Enum tables of the status columns, which are stored as raw codes in the mysql tables.
+STATUS_COLUMNS = {name: field[3] for register_map in (XW_MAP, MPPT_MAP) for name, field in register_map.items()
+                  if field[3] is not None and name in XW_SNAPSHOT + MPPT_SNAPSHOT}
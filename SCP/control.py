@@ -5,6 +5,12 @@
 from conext_com import *
 from pylontech_com import *
 from mysql_write import *
+from mysql_retention import *
+from bms_archive import BMS_Archive
+from tick_scheduler import Tick_Scheduler
+from circuit_breaker import Circuit_Breaker
+from acquisition import Acquisition, wait_readings
+from concurrent.futures import ThreadPoolExecutor
 import time
 
 
@@ -15,35 +21,29 @@ def runtime_error_pylontech(ERROR_COUNTER):
         exit()
     return
 
-def runtime_error_conext(self, ERROR_COUNTER, MODBUS_ADDRESS):
-    print('Communication Error With Conext Device Modbus Address:'+str(MODBUS_ADDRESS)+'. Try:'+str(ERROR_COUNTER))
-
-
-    if ERROR_COUNTER >=5:
-        print('Reconnect with Conext Device Modbus Address:'+str(MODBUS_ADDRESS))
-        time.sleep(300)
-        if self.reconnect(SERVER_UNIT=MODBUS_ADDRESS):
-            print('Reconnect with Conext Succesful!')
-            return True
-    if ERROR_COUNTER >=120:
-        exit()
-    return False
+def conext_breaker(self, NAME, MODBUS_HOST, MODBUS_ADDRESS):
+    # Circuit breaker of a Conext device, the device is reconnected in the background while it is offline.
+    return Circuit_Breaker(NAME=NAME + ' (Modbus Address:' + str(MODBUS_ADDRESS) + ')',
+                           RECONNECT=lambda: self.reconnect(SERVER_HOST=MODBUS_HOST, SERVER_UNIT=MODBUS_ADDRESS))
 
 
 def control(Serial_Port, Modbus_Host, Modbus_Address_XW, Modbus_Address_MPPT_West,\
-            Modbus_Address_MPPT_East, Battery_Modules, Cadance, Display, CSV_Log, SQL_Log, Control,\
-            SoC_high, SoC_low, Battery_low, Battery_hysteresis, Default_battery_low, Default_battery_hysteresis,\
-            Log_file_path, SQL_Host, SQL_Auth, SQL_User, SQL_Password, SQL_Database):
+            Modbus_Address_MPPT_East, Modbus_Slow_Interval, Modbus_Tick_Interval, Battery_Modules, BMS_Cache_TTL, Cell_Monitor, Cell_Log_File_Path, Cadance, Cadance_Skip_Overruns, Acquisition_Budget, Display, CSV_Log, SQL_Log, Control,\
+            SoC_high, SoC_low, SoC_Max_Age, Battery_low, Battery_hysteresis, Default_battery_low, Default_battery_hysteresis,\
+            Log_file_path, CSV_Log_Fsync_Interval, CSV_Log_Format, BMS_Archive_Path, SQL_Host, SQL_Auth, SQL_User, SQL_Password, SQL_Database,\
+            SQL_Flush_Interval, SQL_Flush_Rows, SQL_Buffer_Rows, SQL_Spool_Path, SQL_Rollup,\
+            SQL_Deadband, SQL_Deadband_Max_Silence, SQL_Retention_Months, SQL_Retention_Archive):
 
 
 
+    poller = None  # Device read workers, shut down on every exit path
     try:
 
         print('SolarControl:1.1.0 ')
 
         # ---------------------------------------------------------------------------#
         # Initialise communication to BMS
-        PYLONTECH = US2000B()
+        PYLONTECH = US2000B(CACHE_TTL=BMS_Cache_TTL, LOG_FSYNC_INTERVAL=CSV_Log_Fsync_Interval)  # One 'pwr' reading per tick for logging, display, and control
         tmp_b = PYLONTECH.initialise(port=Serial_Port)
         print('BATTERY Connection Initialised:' + str(tmp_b))
 
@@ -53,12 +53,13 @@ def control(Serial_Port, Modbus_Host, Modbus_Address_XW, Modbus_Address_MPPT_Wes
         time.sleep(1)
         tmp_b = PYLONTECH.is_connected()
         print('BATTERY Connection Established:' + str(tmp_b))
+        BMS_Archive_Log = BMS_Archive(PATH=BMS_Archive_Path, FLUSH_INTERVAL=CSV_Log_Fsync_Interval) if CSV_Log and CSV_Log_Format == 'npz' else None
         # ---------------------------------------------------------------------------#
 
 
         # ---------------------------------------------------------------------------#
         # Establish communication to Inverter
-        Inv = XW()
+        Inv = XW(SLOW_INTERVAL=Modbus_Slow_Interval, TICK_INTERVAL=Modbus_Tick_Interval)
         Inv.open(SERVER_HOST=Modbus_Host, SERVER_UNIT=Modbus_Address_XW)
         time.sleep(1)
         tmp_c = Inv.is_connected()
@@ -67,7 +68,7 @@ def control(Serial_Port, Modbus_Host, Modbus_Address_XW, Modbus_Address_MPPT_Wes
 
         # ---------------------------------------------------------------------------#
         # Establish communication to Charge Controller West Roof
-        MPPT_West = MPPT60()
+        MPPT_West = MPPT60(SLOW_INTERVAL=Modbus_Slow_Interval, TICK_INTERVAL=Modbus_Tick_Interval)
         MPPT_West.open(SERVER_HOST=Modbus_Host, SERVER_UNIT=Modbus_Address_MPPT_West)
         time.sleep(1)
         tmp_mw = MPPT_West.is_connected()
@@ -76,7 +77,7 @@ def control(Serial_Port, Modbus_Host, Modbus_Address_XW, Modbus_Address_MPPT_Wes
 
         # ---------------------------------------------------------------------------#
         # Establish communication to Charge Controller East Roof
-        MPPT_East = MPPT60()
+        MPPT_East = MPPT60(SLOW_INTERVAL=Modbus_Slow_Interval, TICK_INTERVAL=Modbus_Tick_Interval)
         MPPT_East.open(SERVER_HOST=Modbus_Host, SERVER_UNIT=Modbus_Address_MPPT_East)
         time.sleep(1)
         tmp_me = MPPT_East.is_connected()
@@ -86,11 +87,19 @@ def control(Serial_Port, Modbus_Host, Modbus_Address_XW, Modbus_Address_MPPT_Wes
 
         # ---------------------------------------------------------------------------#
         # Connect to MySQL Server
-        SQL= MySQL_com()
+        SQL_Filter = MySQL_Deadband(MAX_SILENCE=SQL_Deadband_Max_Silence) if SQL_Deadband else None  # Change-only writes
+        SQL= MySQL_com(ROLLUP=SQL_Rollup, DEADBAND=SQL_Filter)
         SQL.open(HOST=SQL_Host,USER =SQL_User,PASSWORD=SQL_Password,DATABASE=SQL_Database,AUTH_PLUGIN=SQL_Auth)
         time.sleep(1)
         tmp_s = SQL.is_connected()
         print('SQL Server Connection Established:' + str(tmp_s))
+        SQL_Spool = MySQL_Spool(PATH=SQL_Spool_Path)  # Keeps undelivered rows on disk during database outages
+        SQL_Writer = MySQL_write_Thread(SQL=SQL, FLUSH_INTERVAL=SQL_Flush_Interval, FLUSH_ROWS=SQL_Flush_Rows, MAX_ROWS=SQL_Buffer_Rows, SPOOL=SQL_Spool)
+        SQL_Writer.start()  # Writes the SQL data in batches in the background
+        SQL_Partitions = MySQL_com()  # Own connection, MySQL_com is not shared between threads
+        SQL_Partitions.open(HOST=SQL_Host,USER =SQL_User,PASSWORD=SQL_Password,DATABASE=SQL_Database,AUTH_PLUGIN=SQL_Auth)
+        SQL_Retention = MySQL_Retention_Thread(RETENTION=MySQL_Retention(SQL=SQL_Partitions, RETENTION_MONTHS=SQL_Retention_Months, ARCHIVE=SQL_Retention_Archive))
+        SQL_Retention.start()  # Creates and removes the monthly partitions once a day
         # ---------------------------------------------------------------------------#
 
 
@@ -118,106 +127,139 @@ def control(Serial_Port, Modbus_Host, Modbus_Address_XW, Modbus_Address_MPPT_Wes
 
 
         # ---------------------------------------------------------------------------#
+        XW_Breaker = conext_breaker(Inv, 'INVERTER', MODBUS_HOST=Modbus_Host, MODBUS_ADDRESS=Modbus_Address_XW)
+        MPPT_West_Breaker = conext_breaker(MPPT_West, 'MPPT West Roof', MODBUS_HOST=Modbus_Host, MODBUS_ADDRESS=Modbus_Address_MPPT_West)
+        MPPT_East_Breaker = conext_breaker(MPPT_East, 'MPPT East Roof', MODBUS_HOST=Modbus_Host, MODBUS_ADDRESS=Modbus_Address_MPPT_East)
+        Cell_Breaker = Circuit_Breaker(NAME='BMS Cells', RECONNECT=lambda: True)  # The serial port is shared with read_BMS, the breaker only backs off the cell reads
+        poller = ThreadPoolExecutor(max_workers=5)  # One worker per reading, the BMS, its cells, and every Modbus unit are read concurrently
         try:  # Program Loop
             print('Write Battery Low Voltage Cut: '+str(Inv.write_Low_Battery_Cut_Out(Battery_low))+' Volt')
             time.sleep(1)
             print('Write Battery Hysteresis: '+str(Inv.write_Hysteresis(Battery_hysteresis))+' Volt')
             time.sleep(1)
             error_counter_pylontech=0
-            error_counter_conext = 0
+            Ticker = Tick_Scheduler(PERIOD=Cadance, SKIP_OVERRUNS=Cadance_Skip_Overruns)  # Ticks on a fixed grid aligned to the wall clock
+            Ticker_Report = max(1, int(round(3600.0 / Cadance)))  # Ticks between the statistics reports
+            BMS_Reading = Acquisition('BMS')
+            XW_Reading = Acquisition('INVERTER', BREAKER=XW_Breaker)
+            MPPT_West_Reading = Acquisition('MPPT West Roof', BREAKER=MPPT_West_Breaker)
+            MPPT_East_Reading = Acquisition('MPPT East Roof', BREAKER=MPPT_East_Breaker)
+            Cell_Reading = Acquisition('BMS Cells', BREAKER=Cell_Breaker)  # Cell_Reading.value holds the arrays of all modules
             while True:
-                time.sleep(Cadance)
-                if CSV_Log or SQL_Log:  # Condition to log BMS data into .csv file or SQL Database.
-                    try:
-                        tmp_bms_log = PYLONTECH.read_BMS(N_MODULES=Battery_Modules)
-                    except:
-                        error_counter_pylontech=error_counter_pylontech+1
-                        runtime_error_pylontech(ERROR_COUNTER=error_counter_pylontech)
-                    
-                    try:
-                        tmp_xw_log = Inv.read_Inverter_All()
-                    except:
-                        error_counter_conext = error_counter_conext + 1
-                        if runtime_error_conext(Inv, ERROR_COUNTER=error_counter_conext, MODBUS_ADDRESS=Modbus_Address_XW):
-                            error_counter_conext=0                        
-                        
-                    try:
-                        tmp_mppt_west_log = MPPT_West.read_MPPT_All()
-                    except:
-                        error_counter_conext = error_counter_conext + 1
-                        if runtime_error_conext(MPPT_West, ERROR_COUNTER=error_counter_conext, MODBUS_ADDRESS=Modbus_Address_MPPT_West):
-                            error_counter_conext=0     
+                Tick_Time = Ticker.wait()
+                if Ticker.ticks % Ticker_Report == 0:
+                    print(Ticker.report())
+
+                # Offline devices and devices whose read of an earlier tick is still running are not read again
+                BMS_Reading.submit(poller, PYLONTECH.read_BMS, N_MODULES=Battery_Modules, TICK=Tick_Time)
+                XW_Reading.submit(poller, Inv.read_Inverter_All, TICK=Tick_Time)
+                MPPT_West_Reading.submit(poller, MPPT_West.read_MPPT_All, TICK=Tick_Time)
+                MPPT_East_Reading.submit(poller, MPPT_East.read_MPPT_All, TICK=Tick_Time)
+                if Cell_Monitor:  # One module per tick (round robin)
+                    Cell_Reading.submit(poller, PYLONTECH.read_cells, N_MODULES=Battery_Modules, TICK=Tick_Time)
+                for reading in wait_readings((BMS_Reading, XW_Reading, MPPT_West_Reading, MPPT_East_Reading, Cell_Reading), TIMEOUT=Acquisition_Budget):
+                    print(reading.NAME + ' missed the tick deadline, last value is ' + ('%.0f' % reading.age()) + ' s old')
+                if BMS_Reading.take_error() is not None:
+                    error_counter_pylontech=error_counter_pylontech+1
+                    runtime_error_pylontech(ERROR_COUNTER=error_counter_pylontech)
 
-                    try:
-                        tmp_mppt_east_log = MPPT_East.read_MPPT_All()
-                    except:
-                        error_counter_conext = error_counter_conext + 1
-                        if runtime_error_conext(MPPT_East, ERROR_COUNTER=error_counter_conext, MODBUS_ADDRESS=Modbus_Address_MPPT_East):
-                            error_counter_conext=0   
-
-                        
-                    tmp_mppt_log = tmp_mppt_west_log + tmp_mppt_east_log
-                    if CSV_Log:
+                if CSV_Log or SQL_Log:  # Condition to log BMS data into .csv file or SQL Database.
+                    # Values that are new since the last tick with the tick of their read, stale devices are not written
+                    tmp_bms_log, bms_tick = BMS_Reading.take()
+                    tmp_xw_log, xw_tick = XW_Reading.take()
+                    tmp_mppt_west_log, mppt_west_tick = MPPT_West_Reading.take()
+                    tmp_mppt_east_log, mppt_east_tick = MPPT_East_Reading.take()
+                    if CSV_Log and tmp_bms_log:
                         try:
-                            PYLONTECH.log_BMS(PATH=Log_file_path,BMS_LIST=tmp_bms_log)
+                            if BMS_Archive_Log is not None:
+                                BMS_Archive_Log.append(BMS_LIST=tmp_bms_log, TIME=bms_tick)
+                            else:
+                                PYLONTECH.log_BMS(PATH=Log_file_path,BMS_LIST=tmp_bms_log)
                         except:
                             error_counter_pylontech=error_counter_pylontech+1
                             runtime_error_pylontech(ERROR_COUNTER=error_counter_pylontech)
+                    tmp_cells_log, cells_tick = Cell_Reading.take()
+                    if CSV_Log and tmp_cells_log:
+                        try:
+                            PYLONTECH.log_cells(PATH=Cell_Log_File_Path, CELLS=tmp_cells_log)
+                        except Exception as error:
+                            print('Cell log error:', error)
                     if SQL_Log:
                         try:
-                            SQL.write_BMS(BMS_LIST=tmp_bms_log)
-                            SQL.write_XW(XW_LIST=tmp_xw_log)
-                            SQL.write_MPPT(MPPT_LIST=tmp_mppt_log)
+                            # Every reading is queued with its own tick, a late reading is not moved to this tick
+                            SQL_Writer.write_snapshot(BMS_LIST=tmp_bms_log, TIME=bms_tick)
+                            SQL_Writer.write_snapshot(XW_LIST=tmp_xw_log, TIME=xw_tick)
+                            SQL_Writer.write_snapshot(MPPT_LIST=tmp_mppt_west_log, TIME=mppt_west_tick)
+                            SQL_Writer.write_snapshot(MPPT_LIST=tmp_mppt_east_log, TIME=mppt_east_tick)
                         except Exception as error:
                             print("SQL_Log error:", error)
 
 
                 if Display:  # Condition to print the SoC in terminal
                     try:
-                        tmp = PYLONTECH.read_SoC(N_MODULES=Battery_Modules)
-                        print('A:' + str(tmp[0][0]) + '\t' + 'B:' + str(tmp[1][0]) + '\t' + 'C:' + str(tmp[2][0]) + '\t' + \
-                              'D:' + str(tmp[3][0]) + '\t' + 'E:' + str(tmp[4][0]) + '\t' + 'F:' + str(tmp[5][0]) + '\t' \
-                             +Inv.read_Inverter_Status())
-                    except:
-                        error_counter_conext=error_counter_conext+1
-                        if runtime_error_conext(Inv,ERROR_COUNTER=error_counter_conext, MODBUS_ADDRESS=Modbus_Address_XW):
-                            error_counter_conext=0
+                        tmp = BMS_Reading.value  # Last good BMS reading, list of BMS_Snapshot
+                        print('A:' + str(tmp[0].soc) + '\t' + 'B:' + str(tmp[1].soc) + '\t' + 'C:' + str(tmp[2].soc) + '\t' + \
+                              'D:' + str(tmp[3].soc) + '\t' + 'E:' + str(tmp[4].soc) + '\t' + 'F:' + str(tmp[5].soc) + '\t' \
+                             +(decode_status('inverter_status', XW_Reading.value[0].inverter_status)
+                               if XW_Reading.value and not XW_Breaker.stale else 'INVERTER OFFLINE') \
+                             +'\t' + 'Age:' + ('%.0f' % BMS_Reading.age()) + ' s')
+                    except Exception as error:
+                        print('Display error:', error)
 
 
 
-                if Control:  # Condition to Control Inverter Based on SoC
+                if Control and XW_Breaker.allow() and BMS_Reading.age() > SoC_Max_Age:  # The decision needs a SoC which is not older than SoC_Max_Age
+                    print('SoC is ' + ('%.0f' % BMS_Reading.age()) + ' s old, inverter control skipped')
+                elif Control and XW_Breaker.allow():  # Condition to Control Inverter Based on SoC, skipped while the inverter is offline
                     try:
-                        Battery_SoC = PYLONTECH.read_SoC(N_MODULES=Battery_Modules)
+                        Battery_SoC = BMS_Reading.value
                         Avg_SoC = 0
-                        for i in range(len(Battery_SoC)) :
-                            Avg_SoC=Avg_SoC+Battery_SoC[i][0]
+                        for module in Battery_SoC:
+                            Avg_SoC=Avg_SoC+module.soc
                         Avg_SoC = round(Avg_SoC / Battery_Modules)
-                        
-                        if Avg_SoC >= SoC_high:  # Condition to enable Inverter Grid Support
-                            if Inv.read_Load_Shave_Status() == 'Disable':
-                                Inv.write_Load_Shave_Status('Enable')
-                                print('Grid Support: ON')
-                        if Avg_SoC <= SoC_low:  # Condition to disable Inverter Grid Support
-                            if Inv.read_Load_Shave_Status() == 'Enable':
-                                Inv.write_Load_Shave_Status('Disable')
-                                print('Grid Support: OFF')
-                    except:
-                        error_counter_conext = error_counter_conext + 1
-                        if runtime_error_conext(Inv, ERROR_COUNTER=error_counter_conext, MODBUS_ADDRESS=Modbus_Address_XW):
-                            error_counter_conext=0
+                    except Exception as error:  # BMS errors are not charged to the inverter
+                        Avg_SoC = None
+                        error_counter_pylontech=error_counter_pylontech+1
+                        runtime_error_pylontech(ERROR_COUNTER=error_counter_pylontech)
+                    if Avg_SoC is not None:
+                        try:
+                            if Avg_SoC >= SoC_high:  # Condition to enable Inverter Grid Support
+                                if Inv.read_Load_Shave_Status() == 'Disable':
+                                    Inv.write_Load_Shave_Status('Enable')
+                                    print('Grid Support: ON')
+                            if Avg_SoC <= SoC_low:  # Condition to disable Inverter Grid Support
+                                if Inv.read_Load_Shave_Status() == 'Enable':
+                                    Inv.write_Load_Shave_Status('Disable')
+                                    print('Grid Support: OFF')
+                        except Exception as error:
+                            XW_Breaker.failure(error)
 
 
         except Exception as error:
             print("An error occurred:", error)
+            poller.shutdown(wait=False, cancel_futures=True)  # Does not wait for reads stuck on a device
+            for breaker in (XW_Breaker, MPPT_West_Breaker, MPPT_East_Breaker, Cell_Breaker):
+                breaker.close()  # Stops the reconnect threads
+            if BMS_Archive_Log is not None:
+                BMS_Archive_Log.close()  # Writes the buffered BMS rows
+            SQL_Writer.join()  # Writes the remaining SQL data
+            SQL_Retention.join(timeout=1)
 
 
 
 
         except KeyboardInterrupt:
             try:
+                poller.shutdown(wait=False, cancel_futures=True)  # Does not wait for reads stuck on a device
+                for breaker in (XW_Breaker, MPPT_West_Breaker, MPPT_East_Breaker, Cell_Breaker):
+                    breaker.close()  # Stops the reconnect threads
                 Inv.write_Hysteresis(Default_battery_hysteresis)
                 Inv.write_Low_Battery_Cut_Out(Default_battery_low)
                 Inv.write_Load_Shave_Status('disable')
+                if BMS_Archive_Log is not None:
+                    BMS_Archive_Log.close()  # Writes the buffered BMS rows
+                SQL_Writer.join()  # Writes the remaining SQL data
+                SQL_Retention.join(timeout=1)
                 del PYLONTECH
                 del Inv
                 del MPPT_West
@@ -236,9 +278,15 @@ def control(Serial_Port, Modbus_Host, Modbus_Address_XW, Modbus_Address_MPPT_Wes
 
     except KeyboardInterrupt:
         try:
+            if poller is not None:
+                poller.shutdown(wait=False, cancel_futures=True)  # Does not wait for reads stuck on a device
             Inv.write_Hysteresis(Default_battery_hysteresis)
             Inv.write_Low_Battery_Cut_Out(Default_battery_low)
             Inv.write_Load_Shave_Status('disable')
+            if BMS_Archive_Log is not None:
+                BMS_Archive_Log.close()  # Writes the buffered BMS rows
+            SQL_Writer.join()  # Writes the remaining SQL data
+            SQL_Retention.join(timeout=1)
             del PYLONTECH
             del Inv
             del MPPT_West
@@ -248,9 +296,15 @@ def control(Serial_Port, Modbus_Host, Modbus_Address_XW, Modbus_Address_MPPT_Wes
             print('Control Stop!')
     except Exception as tmp_exeption:
         try:
+            if poller is not None:
+                poller.shutdown(wait=False, cancel_futures=True)  # Does not wait for reads stuck on a device
             Inv.write_Hysteresis(Default_battery_hysteresis)
             Inv.write_Low_Battery_Cut_Out(Default_battery_low)
             Inv.write_Load_Shave_Status('disable')
+            if BMS_Archive_Log is not None:
+                BMS_Archive_Log.close()  # Writes the buffered BMS rows
+            SQL_Writer.join()  # Writes the remaining SQL data
+            SQL_Retention.join(timeout=1)
             del PYLONTECH
             del Inv
             del MPPT_West
@@ -18,13 +18,23 @@ def main():
     Modbus_Address_XW = config.getint('COMMUNICATION SETTINGS','Modbus_Address_XW') # Modbus Address for XW+ 8548 Inverter
     Modbus_Address_MPPT_West = config.getint('COMMUNICATION SETTINGS','Modbus_Address_MPPT_West') # Modbus Address for MPPT 60 15 Charge Controller on West Roof
     Modbus_Address_MPPT_East = config.getint('COMMUNICATION SETTINGS','Modbus_Address_MPPT_East') # Modbus Address for MPPT 60 15 Charge Controller on East Roof
+    Modbus_Slow_Interval = config.getfloat('COMMUNICATION SETTINGS','Modbus_Slow_Interval', fallback=300.0) # Seconds between reads of slow values
+    Modbus_Tick_Interval = config.getfloat('COMMUNICATION SETTINGS','Modbus_Tick_Interval', fallback=0.0) # Seconds between reads of tick values, 0 = every tick
 
     # Location fo the .csv BMS logfile and the number of batteries installed (1-8).
     Log_File_Path = config.get('PYLONTECH BATTERY SPECIFIC SETTINGS','CSV_Log_File_Path')
+    CSV_Log_Fsync_Interval = config.getfloat('PYLONTECH BATTERY SPECIFIC SETTINGS','CSV_Log_Fsync_Interval', fallback=60.0)  # Seconds between syncs of the .csv log
+    CSV_Log_Format = config.get('PYLONTECH BATTERY SPECIFIC SETTINGS','CSV_Log_Format', fallback='csv')  # csv or npz
+    BMS_Archive_Path = config.get('PYLONTECH BATTERY SPECIFIC SETTINGS','BMS_Archive_Path', fallback='/usr/local/Solar-Control-Program/var/BMS_archive')
     Battery_Modules = config.getint('PYLONTECH BATTERY SPECIFIC SETTINGS','Battery_Modules')  # Number of Installed Modules
+    BMS_Cache_TTL = config.getfloat('PYLONTECH BATTERY SPECIFIC SETTINGS','BMS_Cache_TTL', fallback=5.0)  # Seconds a BMS reading is shared
+    Cell_Monitor = config.getboolean('PYLONTECH BATTERY SPECIFIC SETTINGS','Cell_Monitor', fallback=False)  # Read one module's cells per tick
+    Cell_Log_File_Path = config.get('PYLONTECH BATTERY SPECIFIC SETTINGS','Cell_Log_File_Path', fallback='/usr/local/Solar-Control-Program/var/Cell_log')
     
     # General control values for the solar-control-program 
     Cadance = config.getint('GENERAL CONTROL SETTINGS','Cadance')  # Control Loop refresh rate in seconds
+    Cadance_Skip_Overruns = config.getboolean('GENERAL CONTROL SETTINGS','Cadance_Skip_Overruns', fallback=True)  # Skip the ticks missed by a long tick
+    Acquisition_Budget = config.getfloat('GENERAL CONTROL SETTINGS','Acquisition_Budget', fallback=Cadance/2)  # Seconds a tick waits for the device readings
     Display = config.getboolean('GENERAL CONTROL SETTINGS','Display') # Enable Terminal SoC Print
     CSV_Log = config.getboolean('GENERAL CONTROL SETTINGS','CSV_Log') # Enable BMS logging into csv
     SQL_Log = config.getboolean('GENERAL CONTROL SETTINGS','SQL_Log') # Enable BMS logging into SQL
@@ -33,6 +43,7 @@ def main():
     # Specific values for the control loop that enables and disables the inverter.
     SoC_high = config.getint('CONTROL LOOP SPECIFIC SETTINGS','SoC_high')  # Percent
     SoC_low = config.getint('CONTROL LOOP SPECIFIC SETTINGS','SoC_low')  # Percent
+    SoC_Max_Age = config.getfloat('CONTROL LOOP SPECIFIC SETTINGS','SoC_Max_Age', fallback=120.0)  # Seconds, maximum age of the SoC used for the control
     Battery_low = config.getfloat('CONTROL LOOP SPECIFIC SETTINGS','Battery_low')  # Volt
     Battery_hysteresis = config.getfloat('CONTROL LOOP SPECIFIC SETTINGS','Battery_hysteresis')   # Volt
     Default_battery_low = config.getfloat('CONTROL LOOP SPECIFIC SETTINGS','Default_battery_low')  # Volt
@@ -45,6 +56,18 @@ def main():
     SQL_User = config.get('MySQL SPECIFIC SETTINGS','SQL_User')  # MySQl username
     SQL_Password = config.get('MySQL SPECIFIC SETTINGS','SQL_Password')  # MySQl user password
     SQL_Database = config.get('MySQL SPECIFIC SETTINGS','SQL_Database')  # MySQL database
+    SQL_Flush_Interval = config.getfloat('MySQL SPECIFIC SETTINGS','SQL_Flush_Interval', fallback=30.0)  # Seconds between batch writes
+    SQL_Flush_Rows = config.getint('MySQL SPECIFIC SETTINGS','SQL_Flush_Rows', fallback=500)  # Rows that start an early batch write
+    SQL_Buffer_Rows = config.getint('MySQL SPECIFIC SETTINGS','SQL_Buffer_Rows', fallback=20000)  # Maximum number of buffered rows
+    SQL_Spool_Path = config.get('MySQL SPECIFIC SETTINGS','SQL_Spool_Path', fallback='/usr/local/Solar-Control-Program/var/SQL_spool')  # Spool for undelivered rows
+    SQL_Rollup = config.getboolean('MySQL SPECIFIC SETTINGS','SQL_Rollup', fallback=True)  # Maintain the rollup tables
+    SQL_Deadband = config.getboolean('MySQL SPECIFIC SETTINGS','SQL_Deadband', fallback=False)  # Write only changed rows
+    SQL_Deadband_Max_Silence = config.getfloat('MySQL SPECIFIC SETTINGS','SQL_Deadband_Max_Silence', fallback=300.0)  # Seconds between heartbeat rows
+    SQL_Retention_Months = config.getint('MySQL SPECIFIC SETTINGS','SQL_Retention_Months', fallback=0)  # Months of data kept in the tables, 0 keeps all data
+    SQL_Retention_Archive = config.getboolean('MySQL SPECIFIC SETTINGS','SQL_Retention_Archive', fallback=True)  # Archive instead of drop
+    if SQL_Deadband and SQL_Rollup:  # The rollup averages are row averages, change-only rows would bias them
+        print('ERROR: SQL_Deadband and SQL_Rollup cannot be combined, disable one of them in scp.cfg')
+        exit()
 
 
     ################################################################################################################
@@ -69,11 +92,17 @@ def main():
 
 
     control(Serial_Port=Serial_Port, Modbus_Host=Modbus_Host, Modbus_Address_XW=Modbus_Address_XW, Modbus_Address_MPPT_West=Modbus_Address_MPPT_West,\
-         Modbus_Address_MPPT_East=Modbus_Address_MPPT_East, Battery_Modules=Battery_Modules, Cadance=Cadance,\
-         Display=Display, CSV_Log=CSV_Log,SQL_Log=SQL_Log, Control=Control, SoC_high=SoC_high, SoC_low=SoC_low,\
+         Modbus_Address_MPPT_East=Modbus_Address_MPPT_East, Modbus_Slow_Interval=Modbus_Slow_Interval, Modbus_Tick_Interval=Modbus_Tick_Interval,\
+         Battery_Modules=Battery_Modules, BMS_Cache_TTL=BMS_Cache_TTL, Cell_Monitor=Cell_Monitor, Cell_Log_File_Path=Cell_Log_File_Path, Cadance=Cadance, Cadance_Skip_Overruns=Cadance_Skip_Overruns,\
+         Acquisition_Budget=Acquisition_Budget, Display=Display, CSV_Log=CSV_Log,SQL_Log=SQL_Log, Control=Control, SoC_high=SoC_high, SoC_low=SoC_low, SoC_Max_Age=SoC_Max_Age,\
          Battery_low=Battery_low, Battery_hysteresis=Battery_hysteresis,Default_battery_low=Default_battery_low,\
          Default_battery_hysteresis=Default_battery_hysteresis, Log_file_path=Log_File_Path,\
-         SQL_Host=SQL_Host,SQL_Auth=SQL_Auth, SQL_User=SQL_User,SQL_Password=SQL_Password,SQL_Database=SQL_Database)
+         CSV_Log_Fsync_Interval=CSV_Log_Fsync_Interval, CSV_Log_Format=CSV_Log_Format, BMS_Archive_Path=BMS_Archive_Path,\
+         SQL_Host=SQL_Host,SQL_Auth=SQL_Auth, SQL_User=SQL_User,SQL_Password=SQL_Password,SQL_Database=SQL_Database,\
+         SQL_Flush_Interval=SQL_Flush_Interval, SQL_Flush_Rows=SQL_Flush_Rows, SQL_Buffer_Rows=SQL_Buffer_Rows,\
+         SQL_Spool_Path=SQL_Spool_Path, SQL_Rollup=SQL_Rollup,\
+         SQL_Deadband=SQL_Deadband, SQL_Deadband_Max_Silence=SQL_Deadband_Max_Silence,\
+         SQL_Retention_Months=SQL_Retention_Months, SQL_Retention_Archive=SQL_Retention_Archive)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,143 @@
+""" This module contains an asyncio Modbus TCP client to communicate with the Schneider Conext ComBox.
+
+**Description:**
+
+    The client holds one TCP connection to the ComBox and allows several requests to be
+    in flight at the same time. Every request gets its own Modbus transaction ID, which is
+    not used by another pending request, also after the 16bit ID wrapped around. A
+    background task matches the responses to the waiting requests by this ID and drops
+    responses whose unit ID is not the unit of the request. The Modbus unit ID is given per
+    request, so all Conext devices behind one ComBox can share one client. Every request has its own timeout. Like "pymodbusTCP" a failed request returns
+    None instead of raising an exception, so the block read functions in "conext_com" can
+    be used unchanged.
+
+"""
+import asyncio
+from struct import *
+
+
+MBAP_HEADER = Struct('>HHHB') # transaction ID, protocol ID, length, unit ID
+READ_HOLDING_REGISTERS = 0x03
+
+
+# EMBEDDING AsyncModbusClient CLASS ----------------------------------------------------
+
+class AsyncModbusClient(object):
+    """This class implements a pipelined asyncio modbusTCP client """
+
+    def __init__(self, SERVER_HOST="192.168.0.210", SERVER_PORT=502, TIMEOUT=2.0):
+        ''' Constructor for this class. '''
+        self._host = SERVER_HOST
+        self._server_port = SERVER_PORT
+        self._timeout = TIMEOUT
+        self._reader = None
+        self._writer = None
+        self._receiver = None
+        self._transaction_id = 0
+        self._pending = {}  # transaction ID -> (unit ID, future) of the requests in flight
+
+    async def open(self):
+        """Opens the TCP connection to the ComBox and starts the response receiver.
+
+        Returns: Boolean value True or False
+
+        """
+        if self.is_open():
+            return True
+        try:
+            self._reader, self._writer = await asyncio.wait_for(
+                asyncio.open_connection(self._host, self._server_port), self._timeout)
+        except (OSError, asyncio.TimeoutError):
+            print("unable to connect to " + self._host + ":" + str(self._server_port))
+            return False
+        self._receiver = asyncio.ensure_future(self._receive())
+        return True
+
+    async def close(self):
+        """Closes the TCP connection and cancels all pending requests.
+
+        Returns: Boolean value True or False
+
+        """
+        if self._receiver is not None:
+            self._receiver.cancel()
+            try:
+                await self._receiver
+            except asyncio.CancelledError:
+                pass
+            self._receiver = None
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except OSError:
+                pass
+            self._writer = None
+        return not self.is_open()
+
+    def is_open(self):
+        """Returns True if the TCP connection to the ComBox is open."""
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def _receive(self):
+        """Reads the responses from the socket and hands them to the waiting requests."""
+        try:
+            while True:
+                header = await self._reader.readexactly(MBAP_HEADER.size)
+                transaction_id, protocol_id, length, unit = MBAP_HEADER.unpack(header)
+                pdu = await self._reader.readexactly(length - 1)
+                request_unit, future = self._pending.get(transaction_id, (None, None))
+                if future is None or request_unit != unit:  # unknown ID or response of another unit
+                    continue
+                del self._pending[transaction_id]
+                if not future.done():
+                    future.set_result(pdu)
+        except (asyncio.IncompleteReadError, OSError):
+            print("connection to " + self._host + ":" + str(self._server_port) + " lost")
+        finally:
+            for request_unit, future in self._pending.values():  # Requests without response fail
+                if not future.done():
+                    future.set_result(None)
+            self._pending.clear()
+            if self._writer is not None:
+                self._writer.close()
+
+    def _next_transaction_id(self):
+        """Returns the next transaction ID which is not pending, or None if all 65536 IDs are in flight."""
+        for i in range(0x10000):
+            self._transaction_id = (self._transaction_id + 1) & 0xFFFF
+            if self._transaction_id not in self._pending:
+                return self._transaction_id
+        return None
+
+    async def read_holding_registers(self, UNIT, ADDRESS, COUNT=1, TIMEOUT=None):
+        """This function reads COUNT holding registers of a Modbus unit. Several calls can be
+        awaited concurrently, they are sent over the same connection without waiting for the
+        previous response.
+
+        Args:
+            UNIT: modbus address of the device.
+            ADDRESS: address of the first register.
+            COUNT: number of registers (1-125). Default=1
+            TIMEOUT: time to wait for the response in seconds. Default=timeout of the client
+
+        Returns: list of uint16 values or None if the request failed.
+
+        """
+        transaction_id = self._next_transaction_id()
+        if not self.is_open() or transaction_id is None:
+            return None
+        future = asyncio.get_running_loop().create_future()
+        self._pending[transaction_id] = (UNIT, future)
+        try:
+            self._writer.write(MBAP_HEADER.pack(transaction_id, 0, 6, UNIT) +
+                               pack('>BHH', READ_HOLDING_REGISTERS, ADDRESS, COUNT))
+            await self._writer.drain()
+            pdu = await asyncio.wait_for(future, TIMEOUT if TIMEOUT is not None else self._timeout)
+        except (OSError, asyncio.TimeoutError):
+            return None
+        finally:
+            self._pending.pop(transaction_id, None)
+        if not pdu or pdu[0] != READ_HOLDING_REGISTERS or len(pdu) != 2 + 2 * COUNT:  # Exception or malformed response
+            return None
+        return list(unpack('>%dH' % COUNT, pdu[2:]))
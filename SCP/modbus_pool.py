@@ -0,0 +1,245 @@
+""" This module contains a connection pool that shares a few Modbus TCP connections to the Schneider
+Conext ComBox between all device objects.
+
+**Description:**
+
+    All Conext devices are reached through the same ComBox, which should only hold one
+    TCP connection per client. The pool keeps MAX_CONNECTIONS "pymodbusTCP" clients per host
+    and port, by default one, and the device classes borrow a unit from it. A unit behaves like
+    a ModbusClient of one Modbus address. Every request takes an idle connection of the pool,
+    sets its unit ID, and returns it after the transaction, so the requests of all devices,
+    e.g. the XW and both MPPT60 of the control loop, are multiplexed by unit ID on one socket,
+    one transaction at a time. With MAX_CONNECTIONS > 1 a further connection is only opened
+    when all others are busy. A request that gets no connection within CHECKOUT_TIMEOUT
+    seconds, e.g. behind a hung transaction, raises an IOError, so the circuit breaker of
+    the device can open.
+    The pool checks a connection by reading the firmware version of the ComBox after a
+    reconnect, after a failed request, and when the connection was idle. If a connection
+    cannot be established, the next attempt is delayed with an exponential backoff and the
+    requests fail immediately in the meantime, instead of opening a new socket every time.
+
+"""
+import queue
+import threading
+import time
+from pyModbusTCP.client import ModbusClient
+
+
+_pools = {} # (host, port) -> ConnectionPool
+_pools_lock = threading.Lock()
+
+
+def get_pool(SERVER_HOST="192.168.0.210", SERVER_PORT=502):
+    """This function returns the connection pool of a ComBox and creates it on first use.
+
+    Args:
+        SERVER_HOST: network address of the ComBox. Default='192.168.0.210'
+        SERVER_PORT: modbus TCP port. Default='502'
+
+    Returns: ConnectionPool
+
+    """
+    with _pools_lock:
+        key = (SERVER_HOST, SERVER_PORT)
+        if key not in _pools:
+            _pools[key] = ConnectionPool(SERVER_HOST, SERVER_PORT)
+        return _pools[key]
+
+
+# EMBEDDING ConnectionPool CLASS ----------------------------------------------------
+
+class ConnectionPool(object):
+    """This class implements shared modbusTCP connections multiplexed by unit ID """
+
+    def __init__(self, SERVER_HOST="192.168.0.210", SERVER_PORT=502, HEALTH_UNIT=201,
+                 HEALTH_INTERVAL=60.0, BACKOFF_MIN=1.0, BACKOFF_MAX=300.0, MAX_CONNECTIONS=1, CHECKOUT_TIMEOUT=10.0):
+        ''' Constructor for this class. '''
+        self._host = SERVER_HOST
+        self._server_port = SERVER_PORT
+        self._health_unit = HEALTH_UNIT  # modbus address of the ComBox
+        self._health_interval = HEALTH_INTERVAL
+        self._backoff_min = BACKOFF_MIN
+        self._backoff_max = BACKOFF_MAX
+        self._max_connections = MAX_CONNECTIONS  # sockets the ComBox has to hold for this pool
+        self._checkout_timeout = CHECKOUT_TIMEOUT  # seconds a request waits for an idle connection
+        self._clients = []  # all ModbusClient of the pool
+        self._idle = queue.LifoQueue()  # ModbusClient which are not in a transaction, the most recent first
+        self._last_ok = {}  # ModbusClient -> time of the last successful request
+        self._lock = threading.RLock()  # protects the state of the pool, not the transactions
+        self._users = 0
+        self._backoff = 0.0
+        self._retry_at = 0.0
+
+    def unit(self, SERVER_UNIT):
+        """Borrows a unit of the shared connections.
+
+        Args:
+            SERVER_UNIT: modbus address of the device.
+
+        Returns: PooledUnit
+
+        """
+        with self._lock:
+            self._users += 1
+        return PooledUnit(self, SERVER_UNIT)
+
+    def release(self):
+        """Returns a unit to the pool, the connections are closed when no unit is left."""
+        with self._lock:
+            self._users -= 1
+            if self._users <= 0:
+                self._users = 0
+                for client in self._clients:
+                    client.close()
+
+    def is_open(self):
+        """Returns True if a shared connection is open."""
+        return any(client.is_open() for client in list(self._clients))
+
+    def _checkout(self):
+        """Returns an idle connection, a new one if all are busy and MAX_CONNECTIONS is not reached.
+        Raises IOError if no connection becomes idle within CHECKOUT_TIMEOUT seconds."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._clients) < self._max_connections:
+                client = ModbusClient(host=self._host, port=self._server_port)
+                self._clients.append(client)
+                return client
+        try:
+            return self._idle.get(timeout=self._checkout_timeout)  # waits for the end of a transaction
+        except queue.Empty:
+            raise IOError('no idle Modbus connection to ' + self._host + ' within ' + str(self._checkout_timeout) + ' s')
+
+    def _checkin(self, CLIENT):
+        """Returns a connection to the idle connections."""
+        self._idle.put(CLIENT)
+
+    def _connect(self, CLIENT):
+        """Makes sure that a connection is open and healthy, see connect."""
+        now = time.monotonic()
+        if CLIENT.is_open() and now - self._last_ok.get(CLIENT, 0.0) < self._health_interval:
+            return True
+        with self._lock:
+            if now < self._retry_at:
+                return False
+        if not CLIENT.is_open():
+            CLIENT.open()
+        if CLIENT.is_open() and self._health_check(CLIENT):
+            return True
+        CLIENT.close()
+        with self._lock:
+            self._backoff = min(max(2 * self._backoff, self._backoff_min), self._backoff_max)
+            self._retry_at = now + self._backoff
+            print("unable to connect to " + self._host + ":" + str(self._server_port) +
+                  ", next attempt in " + str(self._backoff) + " s")
+        return False
+
+    def connect(self):
+        """Makes sure that a shared connection is open and healthy. During the backoff
+        time after a failed connection attempt no new attempt is made.
+
+        Returns: Boolean value True or False
+
+        """
+        client = self._checkout()
+        try:
+            return self._connect(client)
+        finally:
+            self._checkin(client)
+
+    def reconnect(self):
+        """Closes a shared connection and opens it again, respecting the backoff time. The other
+        connections are checked by the health check after their next failed request.
+
+        Returns: Boolean value True or False
+
+        """
+        client = self._checkout()
+        try:
+            client.close()
+            return self._connect(client)
+        finally:
+            self._checkin(client)
+
+    def _health_check(self, CLIENT):
+        """Requests the firmware version of the ComBox and resets the backoff on success."""
+        CLIENT.unit_id(self._health_unit)
+        if not CLIENT.read_holding_registers(0x001E, 7):  # 0x001E Firmware Version str20 r
+            return False
+        with self._lock:
+            self._backoff = 0.0
+            self._retry_at = 0.0
+        self._last_ok[CLIENT] = time.monotonic()
+        return True
+
+    def request(self, SERVER_UNIT, FUNCTION, *ARGS):
+        """Sends one request of a ModbusClient function to a unit over an idle shared connection.
+        With one connection the requests of all units are sent one after the other.
+
+        Args:
+            SERVER_UNIT: modbus address of the device.
+            FUNCTION: name of the ModbusClient function, e.g. 'read_holding_registers'.
+            ARGS: arguments of the ModbusClient function.
+
+        Returns: result of the ModbusClient function or None if the connection is down.
+
+        """
+        client = self._checkout()
+        try:
+            if not self._connect(client):
+                return None
+            client.unit_id(SERVER_UNIT)
+            result = getattr(client, FUNCTION)(*ARGS)
+            if result is None or result is False:
+                self._last_ok[client] = 0.0  # verify the connection before the next request
+            else:
+                self._last_ok[client] = time.monotonic()
+            return result
+        finally:
+            self._checkin(client)
+
+
+# EMBEDDING PooledUnit CLASS ----------------------------------------------------
+
+class PooledUnit(object):
+    """This class implements the ModbusClient functions of one unit ID of a ConnectionPool """
+
+    def __init__(self, POOL, SERVER_UNIT):
+        ''' Constructor for this class. '''
+        self._pool = POOL
+        self._unit = SERVER_UNIT
+        self._released = False
+
+    def open(self):
+        """Opens a shared connection. Returns: Boolean value True or False"""
+        return not self._released and self._pool.connect()
+
+    def close(self):
+        """Returns the unit to the pool. Returns: Boolean value True"""
+        if not self._released:
+            self._released = True
+            self._pool.release()
+        return True
+
+    def is_open(self):
+        """Returns True if the unit is borrowed and the shared connection is open."""
+        return not self._released and self._pool.is_open()
+
+    def reconnect(self):
+        """Reconnects a shared connection. Returns: Boolean value True or False"""
+        return not self._released and self._pool.reconnect()
+
+    def read_holding_registers(self, ADDRESS, COUNT=1):
+        """Returns: list of uint16 values or None"""
+        return self._pool.request(self._unit, 'read_holding_registers', ADDRESS, COUNT)
+
+    def write_single_register(self, ADDRESS, VALUE):
+        """Returns: Boolean value True or None"""
+        return self._pool.request(self._unit, 'write_single_register', ADDRESS, VALUE)
+
+    def write_multiple_registers(self, ADDRESS, VALUES):
+        """Returns: Boolean value True or None"""
+        return self._pool.request(self._unit, 'write_multiple_registers', ADDRESS, VALUES)
@@ -0,0 +1,193 @@
+""" This module contains the retention manager of the mysql data base, which keeps the tables
+pylontech_bms, conext_xw, and conext_mppt partitioned by month.
+
+**Description:**
+
+    Every table is partitioned with RANGE COLUMNS(ts), one partition pYYYYMM per month and a
+    partition pmax for all later rows. Queries with a time range, e.g. from the Grafana
+    dashboard, only read the partitions of the range. Once a day the retention manager
+    creates the partitions of the next MONTHS_AHEAD months by splitting pmax, and removes the
+    partitions older than RETENTION_MONTHS. The default RETENTION_MONTHS=0 keeps all data,
+    removing data is opt-in. A partition is removed in constant time with DROP PARTITION
+    instead of a DELETE of millions of rows. With ARCHIVE (default) the partition is first
+    exchanged with the empty table <table>_YYYYMM, which then keeps the rows of that month
+    outside of the partitioned table; only ARCHIVE=False deletes the rows. An archive table
+    which already holds rows, e.g. after a run that failed between the exchange and the drop,
+    is never exchanged again: the partition is then only dropped if it is empty.
+    A table that is not yet partitioned is converted on the first run. This copies the
+    table once and can take a while for a large table. The ALTER TABLE holds the metadata
+    lock of the table, so the batch writes of the MySQL_write_Thread block until it is
+    done; meanwhile the rows queue up in its buffer, which moves them into the spool once it
+    is full. Convert a large table during a quiet period or with a large SQL_Buffer_Rows.
+    The manager uses its own MySQL_com connection, since a connection must not be shared
+    with the MySQL_write_Thread.
+
+"""
+import datetime
+import threading
+
+
+RETENTION_TABLES = ('pylontech_bms', 'conext_xw', 'conext_mppt')
+
+
+def add_months(DATE, MONTHS):
+    """Returns the first day of the month MONTHS months after the month of DATE."""
+    month = DATE.year * 12 + DATE.month - 1 + MONTHS
+    return datetime.date(month // 12, month % 12 + 1, 1)
+
+
+def partition_name(MONTH):
+    """Returns the name of the partition of a month, e.g. p202403."""
+    return 'p%04d%02d' % (MONTH.year, MONTH.month)
+
+
+def partition_month(NAME):
+    """Returns the first day of the month of a partition name, or None for pmax."""
+    if len(NAME) != 7 or not NAME[1:].isdigit():
+        return None
+    return datetime.date(int(NAME[1:5]), int(NAME[5:7]), 1)
+
+
+def partition_sql(MONTHS):
+    """Returns the partition definitions of the given months, followed by pmax."""
+    return ', '.join(["PARTITION %s VALUES LESS THAN ('%s')" % (partition_name(month), add_months(month, 1))
+                      for month in MONTHS] + ['PARTITION pmax VALUES LESS THAN (MAXVALUE)'])
+
+
+# EMBEDDING MySQL_Retention CLASS ----------------------------------------------------
+
+class MySQL_Retention(object):
+    """This class implements the monthly partitioning and the retention of the data tables"""
+
+    def __init__(self, SQL, RETENTION_MONTHS=0, MONTHS_AHEAD=3, ARCHIVE=True, TABLES=RETENTION_TABLES):
+        ''' Constructor for this class. '''
+        self.SQL = SQL
+        self.RETENTION_MONTHS = RETENTION_MONTHS  # 0 keeps all data
+        self.MONTHS_AHEAD = MONTHS_AHEAD
+        self.ARCHIVE = ARCHIVE
+        self.TABLES = TABLES
+
+    def partitions(self, TABLE):
+        """Returns the partition names of a table in order, or an empty list if it is not partitioned."""
+        rows = self.SQL.execute('SELECT PARTITION_NAME FROM information_schema.PARTITIONS'
+                                ' WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL'
+                                ' ORDER BY PARTITION_ORDINAL_POSITION', (TABLE,))
+        return [row[0].decode() if isinstance(row[0], (bytes, bytearray)) else row[0] for row in rows]
+
+    def create_partitions(self, TABLE, TODAY):
+        """This function partitions a table and creates the partitions up to MONTHS_AHEAD months after TODAY.
+
+        Args:
+            TABLE: table name.
+            TODAY: datetime.date of today.
+
+        Returns: list of the created partition names
+
+        """
+        names = self.partitions(TABLE)
+        if not names:
+            print('Partitioning table ' + TABLE + ', this may take a while')
+            self.SQL.execute('ALTER TABLE ' + TABLE + ' PARTITION BY RANGE COLUMNS(ts) (' + partition_sql([]) + ')')
+            names = ['pmax']
+        months = [partition_month(name) for name in names if partition_month(name) is not None]
+        if months:
+            month = add_months(months[-1], 1)
+        else:
+            first = self.SQL.execute('SELECT MIN(ts) FROM ' + TABLE)[0][0]  # rows in pmax before the new partitions
+            month = add_months(first.date() if first is not None else TODAY, 0)
+        new = []
+        while month <= add_months(TODAY, self.MONTHS_AHEAD):
+            new.append(month)
+            month = add_months(month, 1)
+        if new:
+            self.SQL.execute('ALTER TABLE ' + TABLE + ' REORGANIZE PARTITION pmax INTO (' + partition_sql(new) + ')')
+        return [partition_name(month) for month in new]
+
+    def is_empty(self, TABLE, PARTITION=None):
+        """Returns True if a table, or one partition of it, holds no rows."""
+        source = TABLE if PARTITION is None else TABLE + ' PARTITION (' + PARTITION + ')'
+        return not self.SQL.execute('SELECT 1 FROM ' + source + ' LIMIT 1')
+
+    def expire_partitions(self, TABLE, TODAY):
+        """This function drops, or with ARCHIVE archives, the partitions of a table which only contain
+        rows older than RETENTION_MONTHS months before TODAY.
+
+        Args:
+            TABLE: table name.
+            TODAY: datetime.date of today.
+
+        Returns: list of the removed partition names
+
+        """
+        if self.RETENTION_MONTHS <= 0:
+            return []
+        horizon = add_months(TODAY, -self.RETENTION_MONTHS)
+        expired = [name for name in self.partitions(TABLE)
+                   if partition_month(name) is not None and add_months(partition_month(name), 1) <= horizon]
+        removed = []
+        for name in expired:
+            if self.ARCHIVE:
+                archive = TABLE + '_' + name[1:]
+                self.SQL.execute('CREATE TABLE IF NOT EXISTS ' + archive + ' LIKE ' + TABLE)
+                if self.partitions(archive):
+                    self.SQL.execute('ALTER TABLE ' + archive + ' REMOVE PARTITIONING')
+                if self.is_empty(archive):
+                    self.SQL.execute('ALTER TABLE ' + TABLE + ' EXCHANGE PARTITION ' + name + ' WITH TABLE ' + archive)
+                elif not self.is_empty(TABLE, name):  # an exchange would swap the archived rows back
+                    print('Retention ' + TABLE + ': ' + archive + ' already holds rows, partition ' + name + ' kept')
+                    continue
+            self.SQL.execute('ALTER TABLE ' + TABLE + ' DROP PARTITION ' + name)
+            removed.append(name)
+        return removed
+
+    def run(self, TODAY=None):
+        """This function maintains the partitions of all tables.
+
+        Args:
+            TODAY: datetime.date of today. Default=today
+
+        Returns: Boolean value True or False
+
+        """
+        if TODAY is None:
+            TODAY = datetime.date.today()
+        try:
+            for table in self.TABLES:
+                created = self.create_partitions(table, TODAY)
+                expired = self.expire_partitions(table, TODAY)
+                if created or expired:
+                    print('Retention ' + table + ': created ' + str(created) + ', ' +
+                          ('archived ' if self.ARCHIVE else 'dropped ') + str(expired))
+            return True
+        except Exception as error:
+            print('Retention failed:', error)
+            return False
+
+
+# EMBEDDING MySQL_Retention_Thread CLASS ----------------------------------------------------
+
+class MySQL_Retention_Thread(threading.Thread):
+    """This class runs the MySQL_Retention once after the start and then every INTERVAL seconds.
+    A failed run is repeated after RETRY seconds."""
+
+    def __init__(self, RETENTION, INTERVAL=86400.0, RETRY=3600.0, group=None, name=None):
+
+        threading.Thread.__init__(self, group=group, name=name)
+        self.daemon = True
+
+        self._stopevent = threading.Event()  # used to stop the thread.
+
+        self.RETENTION = RETENTION
+        self.INTERVAL = INTERVAL
+        self.RETRY = RETRY
+
+    def run(self):
+        """Main retention loop"""
+        while not self._stopevent.is_set():
+            delay = self.INTERVAL if self.RETENTION.run() else self.RETRY
+            self._stopevent.wait(delay)
+
+    def join(self, timeout=None):
+        """Stop the thread"""
+        self._stopevent.set()
+        threading.Thread.join(self, timeout)
@@ -0,0 +1,149 @@
+""" This module contains the definitions of the pre-aggregated rollup tables of the mysql data base.
+
+**Description:**
+
+    Every numeric column of the tables pylontech_bms, conext_xw, and conext_mppt is aggregated
+    into 1 minute, 15 minute, 1 hour, and 1 day buckets. For every bucket and device the rollup
+    tables hold the number of samples n and the minimum, average, and maximum of each column,
+    e.g. pylontech_bms_15m.soc_min, soc_avg, soc_max. The time stamp of a row is the start of
+    its bucket.
+    The rollups are maintained incrementally by MySQL_com, in the same transaction as the raw
+    rows: after a write, the buckets touched by the written rows are recomputed, the 1 minute
+    buckets from the raw table and every coarser level from the level below. Recomputing a
+    whole bucket instead of adding to it keeps the rollups correct when rows are replayed
+    from the spool or written twice.
+    The Grafana dashboard uses dashboard_sql() queries, which read the coarsest table whose
+    bucket is not longer than the interval of one pixel of the panel ($__interval_ms). The
+    dashboard variable $rollup = off reads the raw table for every time range, e.g. with
+    SQL_Rollup = False, where the rollup tables are created but stay empty.
+    The averages are averages of the rows, so the rollups require that every row is written,
+    i.e. they cannot be combined with the change-only writes of SQL_Deadband.
+
+"""
+import datetime
+
+
+# ROLLUP DEFINITIONS ----------------------------------------------------
+
+ROLLUP_COLUMNS = {
+    'pylontech_bms': ('soc', 'voltage', 'current', 'temperature'),
+    'conext_xw': ('grid_voltage', 'grid_current', 'grid_power', 'grid_frequency', 'load_voltage', 'load_current',
+                  'load_power', 'load_frequency', 'inverter_dc_current', 'inverter_dc_power', 'energy_grid_month',
+                  'energy_load_month', 'energy_battery_month', 'battery_low_voltage', 'battery_low_voltage_delay',
+                  'battery_hysteresis'),
+    'conext_mppt': ('dc_input_voltage', 'dc_input_current', 'dc_input_power', 'dc_output_voltage', 'dc_output_current',
+                    'dc_output_power', 'dc_output_power_percentage', 'energy_pv_day', 'energy_pv_week',
+                    'energy_pv_month', 'energy_pv_year'),
+}
+
+ROLLUP_LEVELS = (
+    # suffix  bucket [s]  source level
+    ('1m',    60,         None),
+    ('15m',   900,        '1m'),
+    ('1h',    3600,       '15m'),
+    ('1d',    86400,      '1h'),
+)
+
+
+def rollup_table(TABLE, LEVEL=None):
+    """Returns the name of the rollup table of a level, or of the raw table for LEVEL=None."""
+    return TABLE if LEVEL is None else TABLE + '_' + LEVEL
+
+
+def create_sql(TABLE, LEVEL):
+    """Returns the CREATE TABLE statement of a rollup table."""
+    columns = ''.join(['  `%s_%s` float DEFAULT (NULL),\n' % (column, aggregate)
+                       for column in ROLLUP_COLUMNS[TABLE] for aggregate in ('min', 'avg', 'max')])
+    return ('CREATE TABLE IF NOT EXISTS `' + rollup_table(TABLE, LEVEL) + '` (\n'
+            '  `ts` datetime NOT NULL,\n'
+            '  `device_name` varchar(32) NOT NULL,\n'
+            '  `n` int NOT NULL,\n' + columns +
+            '  PRIMARY KEY (`ts`,`device_name`),\n'
+            '  KEY `idx` (`device_name`,`ts`)\n'
+            ') ENGINE=InnoDB DEFAULT CHARSET=latin1')
+
+
+def bucket_sql(SECONDS):
+    """Returns the SQL expression of the bucket start of ts."""
+    if SECONDS >= 86400:
+        return 'TIMESTAMP(DATE(ts))'
+    return 'ts - INTERVAL (TIME_TO_SEC(ts) MOD %d) SECOND' % SECONDS
+
+
+def rollup_sql(TABLE, LEVEL):
+    """Returns the statement that recomputes the buckets of a rollup level between two time stamps
+    (parameters: start, end) from the level below and overwrites the existing rows."""
+    seconds, source = [(level[1], level[2]) for level in ROLLUP_LEVELS if level[0] == LEVEL][0]
+    values = ['device_name']
+    if source is None:
+        values.append('COUNT(*)')
+        for column in ROLLUP_COLUMNS[TABLE]:
+            values += ['MIN(%s)' % column, 'AVG(%s)' % column, 'MAX(%s)' % column]
+    else:
+        values.append('SUM(n)')
+        for column in ROLLUP_COLUMNS[TABLE]:
+            values += ['MIN(%s_min)' % column,
+                       'SUM(%s_avg * n) / SUM(IF(%s_avg IS NULL, 0, n))' % (column, column),
+                       'MAX(%s_max)' % column]
+    columns = ['ts', 'device_name', 'n'] + ['%s_%s' % (column, aggregate)
+                                           for column in ROLLUP_COLUMNS[TABLE] for aggregate in ('min', 'avg', 'max')]
+    return ('INSERT INTO ' + rollup_table(TABLE, LEVEL) + ' (' + ','.join(columns) + ')'
+            ' SELECT ' + bucket_sql(seconds) + ' AS bucket, ' + ','.join(values) +
+            ' FROM ' + rollup_table(TABLE, source) + ' WHERE ts >= %s AND ts < %s'
+            ' GROUP BY bucket, device_name'
+            ' ON DUPLICATE KEY UPDATE ' + ','.join([column + '=VALUES(' + column + ')' for column in columns[2:]]))
+
+
+def rollup_range(START, END, SECONDS):
+    """Returns the [start, end) time stamps of all buckets of SECONDS length touched by rows from START to END.
+
+    Args:
+        START: time stamp of the first row, mysql datetime string or datetime.
+        END: time stamp of the last row, mysql datetime string or datetime.
+        SECONDS: length of a bucket in seconds.
+
+    Returns: tuple of two mysql datetime strings
+
+    """
+    bounds = []
+    for ts in (START, END):
+        if not isinstance(ts, datetime.datetime):
+            ts = datetime.datetime.strptime(str(ts), '%Y-%m-%d %H:%M:%S')
+        ts = ts.replace(microsecond=0)
+        seconds_of_day = ts.hour * 3600 + ts.minute * 60 + ts.second
+        bounds.append(ts - datetime.timedelta(seconds=seconds_of_day % min(SECONDS, 86400)))
+    bounds[1] += datetime.timedelta(seconds=SECONDS)
+    return tuple(bound.strftime('%Y-%m-%d %H:%M:%S') for bound in bounds)
+
+
+def dashboard_sql(TABLE, COLUMNS, METRIC=True, WHERE=''):
+    """This function returns a Grafana time series query of a table. The query is a UNION ALL of the
+    raw table and all rollup tables, every part is only read for a range of $__interval_ms. The
+    other parts have a constant false condition and are skipped by the mysql optimizer, so
+    the query reads the coarsest table with a bucket not longer than one pixel of the panel.
+    With the dashboard variable $rollup = off only the raw table is read.
+
+    Args:
+        COLUMNS: list of (column, alias), a column can have a leading '-' to invert the sign.
+        METRIC: add device_name as metric. Default=True
+        WHERE: additional condition, e.g. "device_name IN ('MPPT: West')". Default=''
+
+    Returns: String of the query
+
+    """
+    levels = [(None, 0)] + [(level[0], level[1] * 1000) for level in ROLLUP_LEVELS]
+    parts = []
+    for i, (level, low) in enumerate(levels):
+        select = ['ts AS "time"'] + (['device_name AS metric'] if METRIC else [])
+        for column, alias in COLUMNS:
+            select.append(column + ('' if level is None else '_avg') + ' AS "' + alias + '"')
+        condition = ['$__timeFilter(ts)'] + ([WHERE] if WHERE else [])
+        if level is None:  # the raw table is read for every range with $rollup = off
+            condition.append("('$rollup' = 'off' OR $__interval_ms < %d)" % levels[i + 1][1])
+        else:
+            condition += ["'$rollup' = 'on'", '$__interval_ms >= %d' % low]
+            if i + 1 < len(levels):
+                condition.append('$__interval_ms < %d' % levels[i + 1][1])
+        parts.append('SELECT ' + ', '.join(select) + '\nFROM ' + rollup_table(TABLE, level) +
+                     '\nWHERE ' + ' AND '.join(condition))
+    return '\nUNION ALL\n'.join(parts) + '\nORDER BY 1'
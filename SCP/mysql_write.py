@@ -13,22 +13,211 @@ Schneider XW+ 8548E, and Schneider MPPT60 150 data into a mysql data base.
 The class in this module ("mysql_com") allows the user to
 communicate with the mysql database. Each device then
 has its own function which allows to populate the device specific table.
+The class "MySQL_write_Thread" buffers the rows and writes them in
+batches from a background thread, so the control loop never waits
+for the database. Rows that could not be written are kept on disk
+by the class "MySQL_Spool" until the database is reachable again.
+With ROLLUP, MySQL_com also maintains the rollup tables of the module
+"mysql_rollup", which are used by the Grafana dashboard.
 
 """
 import numpy as np
 import datetime
+import queue
+import json
+import os
+import threading
 from struct import *
 import mysql.connector
+from conext_map import XW_SNAPSHOT, MPPT_SNAPSHOT, STATUS_COLUMNS
+from snapshot import record_time
+from mysql_rollup import ROLLUP_COLUMNS, ROLLUP_LEVELS, create_sql, rollup_sql, rollup_range
 #import logging
 
 
+# TABLE DEFINITIONS ----------------------------------------------------
+
+BMS_COLUMNS = ('ts', 'device_name', 'soc', 'voltage', 'current', 'temperature', 'b_status', 'v_status', 'c_status', 't_status')
+XW_COLUMNS = ('ts',) + XW_SNAPSHOT
+MPPT_COLUMNS = ('ts',) + MPPT_SNAPSHOT
+TABLE_COLUMNS = {'pylontech_bms': BMS_COLUMNS, 'conext_xw': XW_COLUMNS, 'conext_mppt': MPPT_COLUMNS}
+
+
+def sql_time(TIME=None):
+    """Returns a datetime, default the current time, as mysql datetime string."""
+    return (datetime.datetime.now() if TIME is None else TIME).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def row_ts(RECORD, TS=None):
+    """Returns the time stamp TS of a row, or if TS is None the acquisition time of the snapshot record (default now)."""
+    return sql_time(record_time(RECORD)) if TS is None else TS
+
+
+def rows_BMS(BMS_LIST, TS=None):
+    """Converts the list of BMS_Snapshot returned by US2000B.read_BMS (or plain lists) into rows of the table pylontech_bms."""
+    return [(row_ts(module, TS), 'Battery: ' + str(i + 1)) + tuple(module) for i, module in enumerate(BMS_LIST)]
+
+
+def rows_device(DEVICE_LIST, TS=None):
+    """Converts the list of XW_Snapshot or MPPT_Snapshot returned by read_Inverter_All or read_MPPT_All (or plain lists) into rows of the tables conext_xw or conext_mppt."""
+    return [(row_ts(device, TS),) + tuple(device) for device in DEVICE_LIST]
+
+
+def rows_snapshot(BMS_LIST, XW_LIST, MPPT_LIST, TS=None):
+    """Converts the data of one control loop tick into rows of all tables, dict {table name: list of rows}."""
+    return {'pylontech_bms': rows_BMS(BMS_LIST, TS),
+            'conext_xw': rows_device(XW_LIST, TS),
+            'conext_mppt': rows_device(MPPT_LIST, TS)}
+
+
+STATUS_TABLE = 'conext_status'  # lookup table of the status codes: column_name, code, name
+
+
+def status_table_sql():
+    """Returns the CREATE TABLE statement of the lookup table of the status codes."""
+    return ('CREATE TABLE IF NOT EXISTS `' + STATUS_TABLE + '` (\n'
+            '  `column_name` varchar(64) NOT NULL,\n'
+            '  `code` smallint unsigned NOT NULL,\n'
+            '  `name` varchar(32) NOT NULL,\n'
+            '  PRIMARY KEY (`column_name`,`code`)\n'
+            ') ENGINE=InnoDB DEFAULT CHARSET=latin1')
+
+
+_STATUS_CODES = {column: {name: code for code, name in enum.items()} for column, enum in STATUS_COLUMNS.items()}
+
+def status_codes(TABLE, ROW):
+    """Returns a row as tuple with the status names replaced by their codes, e.g. for rows spooled
+    before the status columns were stored as codes. Unknown names become NULL."""
+    return tuple(_STATUS_CODES[column].get(value) if isinstance(value, str) and column in _STATUS_CODES else value
+                 for column, value in zip(TABLE_COLUMNS[TABLE], ROW))
+
+
+def insert_sql(TABLE, N_ROWS, UPSERT=False):
+    """Returns a multi-row INSERT statement for N_ROWS rows of a table. With UPSERT an existing row
+    with the same primary key (ts, device_name) is overwritten, so the statement can be repeated."""
+    columns = TABLE_COLUMNS[TABLE]
+    row = '(' + ','.join(['%s'] * len(columns)) + ')'
+    sql = 'INSERT INTO ' + TABLE + ' (' + ','.join(columns) + ') VALUES ' + ','.join([row] * N_ROWS)
+    if UPSERT:
+        sql += ' ON DUPLICATE KEY UPDATE ' + ','.join([column + '=VALUES(' + column + ')' for column in columns[2:]])
+    return sql
+
+
+def chunk_sizes(N_ROWS, MAX_ROWS=128):
+    """Splits N_ROWS rows into chunks of powers of two up to MAX_ROWS rows, so that a few prepared
+    statements per table cover every batch size."""
+    sizes = []
+    while N_ROWS > 0:
+        size = min(MAX_ROWS, 1 << (N_ROWS.bit_length() - 1))
+        sizes.append(size)
+        N_ROWS -= size
+    return sizes
+
+
+# DEADBAND DEFINITIONS ----------------------------------------------------
+
+# (absolute, relative) change of a numeric column which causes a new row. A change of a column that
+# is not listed, e.g. a status string, always causes a new row.
+DEADBAND_COLUMNS = {
+    'pylontech_bms': {'soc': (1.0, 0.0), 'voltage': (0.05, 0.0), 'current': (0.1, 0.05), 'temperature': (1.0, 0.0)},
+    'conext_xw': {'grid_voltage': (1.0, 0.0), 'grid_current': (0.2, 0.05), 'grid_power': (20.0, 0.05),
+                  'grid_frequency': (0.05, 0.0), 'load_voltage': (1.0, 0.0), 'load_current': (0.2, 0.05),
+                  'load_power': (20.0, 0.05), 'load_frequency': (0.05, 0.0), 'inverter_dc_current': (0.5, 0.05),
+                  'inverter_dc_power': (20.0, 0.05), 'energy_grid_month': (0.1, 0.0), 'energy_load_month': (0.1, 0.0),
+                  'energy_battery_month': (0.1, 0.0)},
+    'conext_mppt': {'dc_input_voltage': (1.0, 0.0), 'dc_input_current': (0.1, 0.05), 'dc_input_power': (10.0, 0.05),
+                    'dc_output_voltage': (0.1, 0.0), 'dc_output_current': (0.2, 0.05), 'dc_output_power': (10.0, 0.05),
+                    'dc_output_power_percentage': (1.0, 0.0), 'energy_pv_day': (0.01, 0.0), 'energy_pv_week': (0.1, 0.0),
+                    'energy_pv_month': (0.1, 0.0), 'energy_pv_year': (0.1, 0.0)},
+}
+
+
+# EMBEDDING MySQL_Deadband CLASS ----------------------------------------------------
+
+class MySQL_Deadband(object):
+    """This class implements change-only writes. A row of a device is only written if a column moved
+    more than its deadband since the last written row of the device, or if no row was written for
+    MAX_SILENCE seconds (heartbeat). Readers get the value of any time from the view <table>_locf."""
+
+    def __init__(self, COLUMNS=DEADBAND_COLUMNS, MAX_SILENCE=300.0):
+        ''' Constructor for this class. '''
+        self.MAX_SILENCE = MAX_SILENCE
+        self._thresholds = {}  # table -> list of (column index, absolute, relative), (0, 0) for any change
+        for table, columns in TABLE_COLUMNS.items():
+            self._thresholds[table] = [(i,) + tuple(COLUMNS.get(table, {}).get(column, (0.0, 0.0)))
+                                       for i, column in enumerate(columns) if i >= 2]
+        self._last = {}  # (table, device_name) -> (datetime, row) of the last written row
+        self.passed_rows = 0
+        self.suppressed_rows = 0
+
+    def changed(self, TABLE, LAST, ROW):
+        """Returns True if a column of ROW moved more than its deadband since LAST."""
+        for i, absolute, relative in self._thresholds[TABLE]:
+            old = LAST[i]
+            new = ROW[i]
+            if old == new:
+                continue
+            if isinstance(old, float) and isinstance(new, float):
+                if abs(new - old) > max(absolute, relative * abs(old)):
+                    return True
+            else:
+                return True  # string, or a value appeared or disappeared
+        return False
+
+    def filter(self, TABLE_ROWS):
+        """This function removes the rows which did not change and remembers the remaining rows as
+        the last written rows.
+
+        Args:
+            TABLE_ROWS: dict {table name: list of rows}.
+
+        Returns: dict {table name: list of rows} with the rows to write
+
+        """
+        result = {}
+        for table, rows in TABLE_ROWS.items():
+            passed = []
+            for row in rows:
+                ts = row[0] if isinstance(row[0], datetime.datetime) else datetime.datetime.strptime(str(row[0]), '%Y-%m-%d %H:%M:%S')
+                key = (table, row[1])
+                last = self._last.get(key)
+                if (last is None or (ts - last[0]).total_seconds() >= self.MAX_SILENCE or ts < last[0]
+                        or self.changed(table, last[1], row)):
+                    self._last[key] = (ts, row)
+                    passed.append(row)
+            self.passed_rows += len(passed)
+            self.suppressed_rows += len(rows) - len(passed)
+            result[table] = passed
+        return result
+
+    def state(self):
+        """Returns the last written rows, to restore them with restore() if the write failed."""
+        return dict(self._last)
+
+    def restore(self, STATE):
+        """Restores the last written rows returned by state()."""
+        self._last = STATE
+
+
+def locf_sql(TABLE):
+    """Returns the statement of the view <table>_locf. Every row of the view is valid from its ts until
+    the next row of the same device (valid_to), so the value at a time X is the row with
+    ts <= X < valid_to (last observation carried forward)."""
+    return ('CREATE OR REPLACE VIEW ' + TABLE + '_locf AS SELECT ' + TABLE + '.*, '
+            "LEAD(ts, 1, TIMESTAMP('9999-12-31 23:59:59')) OVER (PARTITION BY device_name ORDER BY ts) AS valid_to "
+            'FROM ' + TABLE)
+
+
 # EMBEDDING Pylontech CLASS ----------------------------------------------------
 
 class MySQL_com():
     """This class implements functions specific to the Pylontech US2000B Battery"""
-    def __init__(self):
+    def __init__(self, ROLLUP=False, DEADBAND=None):
         ''' Constructor for this class. '''
         self._port = 0
+        self.ROLLUP = ROLLUP  # maintain the 1m, 15m, 1h, and 1d rollup tables
+        self.DEADBAND = DEADBAND  # MySQL_Deadband for change-only writes, None writes every row
+        self._statements = {}  # (table, rows, upsert) -> (prepared cursor, statement)
 
 
     def __del__(self):
@@ -52,6 +241,11 @@ class MySQL_com():
         self._port = mysql.connector.connect(user=USER, password=PASSWORD, host=HOST, database=DATABASE, auth_plugin=AUTH_PLUGIN)
         if not self._port.is_connected():
             print("Unable to connect to " + str(HOST))
+        else:
+            self.create_status_table()
+            self.create_rollups()  # also without ROLLUP, the dashboard queries refer to the tables
+            if self.DEADBAND is not None:
+                self.create_locf_views()
 
         return self._port.is_connected()
 
@@ -61,6 +255,7 @@ class MySQL_com():
         Returns: Boolean value True or False
 
         """
+        self._drop_statements()
         self._port.close()
         return not self._port.is_connected()
 
@@ -73,122 +268,237 @@ class MySQL_com():
         """
         return self._port.is_connected()
 
+    def execute(self, STATEMENT, PARAMS=()):
+        """This function executes one statement, e.g. a query or a table definition, and commits it.
+
+        Args:
+            STATEMENT: SQL statement with %s placeholders.
+            PARAMS: values of the placeholders. Default=()
+
+        Returns: list of the result rows
+
+        """
+        if not self._port.is_connected():
+            self._drop_statements()
+            self._port.reconnect(attempts=1, delay=0)
+        cursor = self._port.cursor()
+        try:
+            cursor.execute(STATEMENT, PARAMS)
+            rows = cursor.fetchall() if cursor.with_rows else []
+            self._port.commit()
+            return rows
+        finally:
+            cursor.close()
+
+    def _statement(self, TABLE, N_ROWS, UPSERT=False):
+        """Returns the prepared cursor and the INSERT statement for N_ROWS rows of a table. The
+        statement is prepared on the server with the first execute and reused afterwards."""
+        key = (TABLE, N_ROWS, UPSERT)
+        if key not in self._statements:
+            self._statements[key] = (self._port.cursor(prepared=True), insert_sql(TABLE, N_ROWS, UPSERT))
+        return self._statements[key]
+
+    def _drop_statements(self):
+        """Closes the prepared cursors, they are invalid after a reconnect."""
+        for cursor, sql in self._statements.values():
+            try:
+                cursor.close()
+            except Exception:
+                pass
+        self._statements = {}
+
+    def write_rows(self, TABLE_ROWS, UPSERT=False):
+        """This function writes rows into several tables with cached prepared multi-row INSERT
+        statements and commits them in a single transaction. A lost connection is reestablished first.
+
+        With a DEADBAND only the changed rows are written, rows replayed with UPSERT are all written.
+
+        Args:
+            TABLE_ROWS: dict {table name: list of rows}, each row is a tuple in the column order of TABLE_COLUMNS.
+            UPSERT: overwrite rows with the same primary key instead of failing. Default=False
+
+        Returns: Boolean value True or False
+
+        """
+        deadband_state = None
+        if self.DEADBAND is not None and not UPSERT:
+            deadband_state = self.DEADBAND.state()
+            TABLE_ROWS = self.DEADBAND.filter(TABLE_ROWS)
+        try:
+            if not self._port.is_connected():
+                self._drop_statements()
+                self._port.reconnect(attempts=1, delay=0)
+            for table, rows in TABLE_ROWS.items():
+                start = 0
+                for size in chunk_sizes(len(rows)):
+                    cursor, sql = self._statement(table, size, UPSERT)
+                    cursor.execute(sql, [value for row in rows[start:start + size] for value in row])
+                    start += size
+                if rows and self.ROLLUP and table in ROLLUP_COLUMNS:
+                    timestamps = [row[0] for row in rows]
+                    self._rollup(table, min(timestamps), max(timestamps))
+            self._port.commit()
+            return True
+        except Exception as error:
+            # Rolling back in case of error
+            try:
+                self._port.rollback()
+            except Exception:
+                pass
+            self._drop_statements()
+            if deadband_state is not None:
+                self.DEADBAND.restore(deadband_state)  # the rows were not written
+            print("Failed to send data to database:", error)
+            return False
+
+    def create_status_table(self):
+        """This function creates and fills the lookup table of the status codes and converts status
+        columns of older tables, which hold the status names as varchar, into SMALLINT codes.
+
+        Returns: NONE
+
+        """
+        self.execute(status_table_sql())
+        cursor = self._port.cursor()
+        cursor.executemany('INSERT INTO ' + STATUS_TABLE + ' (column_name, code, name) VALUES (%s, %s, %s)'
+                           ' ON DUPLICATE KEY UPDATE name=VALUES(name)',
+                           [(column, code, name) for column, enum in sorted(STATUS_COLUMNS.items())
+                            for code, name in sorted(enum.items())])
+        cursor.close()
+        self._port.commit()
+        for table, columns in TABLE_COLUMNS.items():
+            for column in columns:
+                if column not in STATUS_COLUMNS:
+                    continue
+                rows = self.execute('SELECT DATA_TYPE FROM information_schema.COLUMNS'
+                                    ' WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s',
+                                    (table, column))
+                data_type = rows[0][0] if rows else None
+                if isinstance(data_type, (bytes, bytearray)):
+                    data_type = data_type.decode()
+                if data_type is None or data_type.lower() != 'varchar':
+                    continue
+                print('Converting ' + table + '.' + column + ' into status codes, this may take a while')
+                self.execute('ALTER TABLE ' + table + ' ADD COLUMN ' + column + '_code smallint unsigned DEFAULT (NULL) AFTER ' + column)
+                self.execute('UPDATE ' + table + ' JOIN ' + STATUS_TABLE + ' ON ' + STATUS_TABLE + '.column_name = %s AND ' +
+                             STATUS_TABLE + '.name = ' + table + '.' + column + ' SET ' + table + '.' + column + '_code = ' +
+                             STATUS_TABLE + '.code', (column,))
+                self.execute('ALTER TABLE ' + table + ' DROP COLUMN ' + column + ', RENAME COLUMN ' + column + '_code TO ' + column)
+
+    def create_locf_views(self):
+        """This function creates the views <table>_locf of the tables written with a deadband.
+
+        Returns: NONE
+
+        """
+        cursor = self._port.cursor()
+        for table in TABLE_COLUMNS:
+            cursor.execute(locf_sql(table))
+        cursor.close()
+
+    def create_rollups(self):
+        """This function creates the rollup tables of all levels, if they do not exist.
+
+        Returns: NONE
+
+        """
+        cursor = self._port.cursor()
+        for table in ROLLUP_COLUMNS:
+            for level in ROLLUP_LEVELS:
+                cursor.execute(create_sql(table, level[0]))
+        cursor.close()
+
+    def _rollup(self, TABLE, START, END):
+        """Recomputes the buckets of all rollup levels touched by rows from START to END, without commit."""
+        for level, seconds, source in ROLLUP_LEVELS:
+            key = (TABLE, level)
+            if key not in self._statements:
+                self._statements[key] = (self._port.cursor(prepared=True), rollup_sql(TABLE, level))
+            cursor, sql = self._statements[key]
+            cursor.execute(sql, rollup_range(START, END, seconds))
+
+    def rebuild_rollups(self, START, END):
+        """This function recomputes the rollup tables from the raw tables, e.g. to fill them once with
+        the data written before the rollups were enabled. Every day is committed separately.
+
+        Args:
+            START: first day, mysql datetime string or datetime.
+            END: last day, mysql datetime string or datetime.
+
+        Returns: Boolean value True or False
+
+        """
+        day, last = rollup_range(START, END, 86400)
+        day = datetime.datetime.strptime(day, '%Y-%m-%d %H:%M:%S')
+        last = datetime.datetime.strptime(last, '%Y-%m-%d %H:%M:%S')
+        try:
+            while day < last:
+                for table in ROLLUP_COLUMNS:
+                    self._rollup(table, day, day + datetime.timedelta(seconds=86399))
+                self._port.commit()
+                day += datetime.timedelta(days=1)
+            return True
+        except Exception as error:
+            try:
+                self._port.rollback()
+            except Exception:
+                pass
+            self._drop_statements()
+            print("Failed to rebuild rollups:", error)
+            return False
+
+    def write_snapshot(self, BMS_LIST=(), XW_LIST=(), MPPT_LIST=(), TIME=None):
+        """This function writes the data of one control loop tick into the tables pylontech_bms,
+        conext_xw and conext_mppt with one time stamp and commits them in a single transaction.
 
+        Args:
+            BMS_LIST: list returned by US2000B.read_BMS, see write_BMS.
+            XW_LIST: list returned by XW.read_Inverter_All, see write_XW.
+            MPPT_LIST: list returned by MPPT60.read_MPPT_All, see write_MPPT.
+            TIME: datetime of the tick, e.g. returned by Tick_Scheduler.wait. Default=time of the acquisition
 
+        Returns: Boolean value True or False
+
+        """
+        return self.write_rows(rows_snapshot(BMS_LIST, XW_LIST, MPPT_LIST, None if TIME is None else sql_time(TIME)))
 
     def write_BMS(self,BMS_LIST):
         """This function writes the parsed data into the mysql database table for pylontech_bms and returns a boolean value
         if the write process was sucessful.
 
         Args:
-            BMS_LIST: list of length [n_modules] containing:
+            BMS_LIST: list of length [n_modules] of BMS_Snapshot returned by US2000B.read_BMS:
             [SoC, Voltage, Current, Temperature, Battery Status, Voltage Status, Current Status, Temperature Status] dtype=float64 and dtype=str.
 
 
         DROP TABLE IF EXISTS `pylontech_bms`;
         CREATE TABLE `pylontech_bms` (
             `ts` datetime NOT NULL,
-            `device_name` varchar(16) DEFAULT (NULL),
+            `device_name` varchar(32) DEFAULT (NULL),
             `soc` float DEFAULT (NULL),
             `voltage` float DEFAULT (NULL),
             `current` float DEFAULT (NULL),
             `temperature` float DEFAULT (NULL),
-            `b_status` varchar(16) DEFAULT (NULL),
-            `v_status` varchar(16) DEFAULT (NULL),
-            `c_status` varchar(16) DEFAULT (NULL),
-            `t_status` varchar(16) DEFAULT (NULL),
-            PRIMARY KEY (`ts`,`battery`),
-            KEY `idx` (`battery`,`ts`)
-        ) ENGINE=InnoDB DEFAULT CHARSET=latin1;
-    
+            `b_status` varchar(32) DEFAULT (NULL),
+            `v_status` varchar(32) DEFAULT (NULL),
+            `c_status` varchar(32) DEFAULT (NULL),
+            `t_status` varchar(32) DEFAULT (NULL),
+            PRIMARY KEY (`ts`,`device_name`),
+            KEY `idx` (`device_name`,`ts`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=latin1
+        PARTITION BY RANGE COLUMNS(ts) (PARTITION pmax VALUES LESS THAN (MAXVALUE));
+
+        The device_name of a module is 'Battery: <n>', n=1-8.
+
 
         Returns: Boolean value True or False
 
         """
         tmp_n_modules = len(BMS_LIST)
-        tmp_time ="{:04d}-{:02d}-{:02d} {:02d}:{:02d}:{:02d}".format(datetime.datetime.now().year,datetime.datetime.now().month,datetime.datetime.now().day,datetime.datetime.now().hour,datetime.datetime.now().minute,datetime.datetime.now().second)
-
-        cursor = self._port.cursor()
-        
-        tmp_BMS = BMS_LIST
-
-        # Preparing SQL query to INSERT a record into the database.
-        if tmp_n_modules == 1:
-            tmp_sql = "INSERT INTO pylontech_bms (ts,device_name,soc,voltage,current,temperature,b_status,v_status,c_status,t_status) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
-            tmp_val = [(tmp_time,'Battery: 1',tmp_BMS[0][0],tmp_BMS[0][1],tmp_BMS[0][2],tmp_BMS[0][3],tmp_BMS[0][4],tmp_BMS[0][5],tmp_BMS[0][6],tmp_BMS[0][7])]
-
-        elif tmp_n_modules == 2:
-            tmp_sql = "INSERT INTO pylontech_bms (ts,device_name,soc,voltage,current,temperature,b_status,v_status,c_status,t_status) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
-            tmp_val = [ (tmp_time,'Battery: 1',tmp_BMS[0][0],tmp_BMS[0][1],tmp_BMS[0][2],tmp_BMS[0][3],tmp_BMS[0][4],tmp_BMS[0][5],tmp_BMS[0][6],tmp_BMS[0][7]),\
-                        (tmp_time,'Battery: 2',tmp_BMS[1][0],tmp_BMS[1][1],tmp_BMS[1][2],tmp_BMS[1][3],tmp_BMS[1][4],tmp_BMS[1][5],tmp_BMS[1][6],tmp_BMS[1][7])]
-        
-        elif tmp_n_modules == 3:
-            tmp_sql = "INSERT INTO pylontech_bms (ts,device_name,soc,voltage,current,temperature,b_status,v_status,c_status,t_status) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
-            tmp_val = [ (tmp_time,'Battery: 1',tmp_BMS[0][0],tmp_BMS[0][1],tmp_BMS[0][2],tmp_BMS[0][3],tmp_BMS[0][4],tmp_BMS[0][5],tmp_BMS[0][6],tmp_BMS[0][7]),\
-                        (tmp_time,'Battery: 2',tmp_BMS[1][0],tmp_BMS[1][1],tmp_BMS[1][2],tmp_BMS[1][3],tmp_BMS[1][4],tmp_BMS[1][5],tmp_BMS[1][6],tmp_BMS[1][7]),\
-                        (tmp_time,'Battery: 3',tmp_BMS[2][0],tmp_BMS[2][1],tmp_BMS[2][2],tmp_BMS[2][3],tmp_BMS[2][4],tmp_BMS[2][5],tmp_BMS[2][6],tmp_BMS[2][7])]
-
-        elif tmp_n_modules == 4:
-            tmp_sql = "INSERT INTO pylontech_bms (ts,device_name,soc,voltage,current,temperature,b_status,v_status,c_status,t_status) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
-            tmp_val = [ (tmp_time,'Battery: 1',tmp_BMS[0][0],tmp_BMS[0][1],tmp_BMS[0][2],tmp_BMS[0][3],tmp_BMS[0][4],tmp_BMS[0][5],tmp_BMS[0][6],tmp_BMS[0][7]),\
-                        (tmp_time,'Battery: 2',tmp_BMS[1][0],tmp_BMS[1][1],tmp_BMS[1][2],tmp_BMS[1][3],tmp_BMS[1][4],tmp_BMS[1][5],tmp_BMS[1][6],tmp_BMS[1][7]),\
-                        (tmp_time,'Battery: 3',tmp_BMS[2][0],tmp_BMS[2][1],tmp_BMS[2][2],tmp_BMS[2][3],tmp_BMS[2][4],tmp_BMS[2][5],tmp_BMS[2][6],tmp_BMS[2][7]),\
-                        (tmp_time,'Battery: 4',tmp_BMS[3][0],tmp_BMS[3][1],tmp_BMS[3][2],tmp_BMS[3][3],tmp_BMS[3][4],tmp_BMS[3][5],tmp_BMS[3][6],tmp_BMS[3][7])]
-
-        elif tmp_n_modules == 5:
-            tmp_sql = "INSERT INTO pylontech_bms (ts,device_name,soc,voltage,current,temperature,b_status,v_status,c_status,t_status) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
-            tmp_val = [ (tmp_time,'Battery: 1',tmp_BMS[0][0],tmp_BMS[0][1],tmp_BMS[0][2],tmp_BMS[0][3],tmp_BMS[0][4],tmp_BMS[0][5],tmp_BMS[0][6],tmp_BMS[0][7]),\
-                        (tmp_time,'Battery: 2',tmp_BMS[1][0],tmp_BMS[1][1],tmp_BMS[1][2],tmp_BMS[1][3],tmp_BMS[1][4],tmp_BMS[1][5],tmp_BMS[1][6],tmp_BMS[1][7]),\
-                        (tmp_time,'Battery: 3',tmp_BMS[2][0],tmp_BMS[2][1],tmp_BMS[2][2],tmp_BMS[2][3],tmp_BMS[2][4],tmp_BMS[2][5],tmp_BMS[2][6],tmp_BMS[2][7]),\
-                        (tmp_time,'Battery: 4',tmp_BMS[3][0],tmp_BMS[3][1],tmp_BMS[3][2],tmp_BMS[3][3],tmp_BMS[3][4],tmp_BMS[3][5],tmp_BMS[3][6],tmp_BMS[3][7]),\
-                        (tmp_time,'Battery: 5',tmp_BMS[4][0],tmp_BMS[4][1],tmp_BMS[4][2],tmp_BMS[4][3],tmp_BMS[4][4],tmp_BMS[4][5],tmp_BMS[4][6],tmp_BMS[4][7])]
-
-        elif tmp_n_modules == 6:
-            tmp_sql = "INSERT INTO pylontech_bms (ts,device_name,soc,voltage,current,temperature,b_status,v_status,c_status,t_status) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
-            tmp_val = [ (tmp_time,'Battery: 1',tmp_BMS[0][0],tmp_BMS[0][1],tmp_BMS[0][2],tmp_BMS[0][3],tmp_BMS[0][4],tmp_BMS[0][5],tmp_BMS[0][6],tmp_BMS[0][7]),\
-                        (tmp_time,'Battery: 2',tmp_BMS[1][0],tmp_BMS[1][1],tmp_BMS[1][2],tmp_BMS[1][3],tmp_BMS[1][4],tmp_BMS[1][5],tmp_BMS[1][6],tmp_BMS[1][7]),\
-                        (tmp_time,'Battery: 3',tmp_BMS[2][0],tmp_BMS[2][1],tmp_BMS[2][2],tmp_BMS[2][3],tmp_BMS[2][4],tmp_BMS[2][5],tmp_BMS[2][6],tmp_BMS[2][7]),\
-                        (tmp_time,'Battery: 4',tmp_BMS[3][0],tmp_BMS[3][1],tmp_BMS[3][2],tmp_BMS[3][3],tmp_BMS[3][4],tmp_BMS[3][5],tmp_BMS[3][6],tmp_BMS[3][7]),\
-                        (tmp_time,'Battery: 5',tmp_BMS[4][0],tmp_BMS[4][1],tmp_BMS[4][2],tmp_BMS[4][3],tmp_BMS[4][4],tmp_BMS[4][5],tmp_BMS[4][6],tmp_BMS[4][7]),\
-                        (tmp_time,'Battery: 6',tmp_BMS[5][0],tmp_BMS[5][1],tmp_BMS[5][2],tmp_BMS[5][3],tmp_BMS[5][4],tmp_BMS[5][5],tmp_BMS[5][6],tmp_BMS[5][7])]
-
-        elif tmp_n_modules == 7:
-            tmp_sql = "INSERT INTO pylontech_bms (ts,device_name,soc,voltage,current,temperature,b_status,v_status,c_status,t_status) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
-            tmp_val = [ (tmp_time,'Battery: 1',tmp_BMS[0][0],tmp_BMS[0][1],tmp_BMS[0][2],tmp_BMS[0][3],tmp_BMS[0][4],tmp_BMS[0][5],tmp_BMS[0][6],tmp_BMS[0][7]),\
-                        (tmp_time,'Battery: 2',tmp_BMS[1][0],tmp_BMS[1][1],tmp_BMS[1][2],tmp_BMS[1][3],tmp_BMS[1][4],tmp_BMS[1][5],tmp_BMS[1][6],tmp_BMS[1][7]),\
-                        (tmp_time,'Battery: 3',tmp_BMS[2][0],tmp_BMS[2][1],tmp_BMS[2][2],tmp_BMS[2][3],tmp_BMS[2][4],tmp_BMS[2][5],tmp_BMS[2][6],tmp_BMS[2][7]),\
-                        (tmp_time,'Battery: 4',tmp_BMS[3][0],tmp_BMS[3][1],tmp_BMS[3][2],tmp_BMS[3][3],tmp_BMS[3][4],tmp_BMS[3][5],tmp_BMS[3][6],tmp_BMS[3][7]),\
-                        (tmp_time,'Battery: 5',tmp_BMS[4][0],tmp_BMS[4][1],tmp_BMS[4][2],tmp_BMS[4][3],tmp_BMS[4][4],tmp_BMS[4][5],tmp_BMS[4][6],tmp_BMS[4][7]),\
-                        (tmp_time,'Battery: 6',tmp_BMS[5][0],tmp_BMS[5][1],tmp_BMS[5][2],tmp_BMS[5][3],tmp_BMS[5][4],tmp_BMS[5][5],tmp_BMS[5][6],tmp_BMS[5][7]),\
-                        (tmp_time,'Battery: 7',tmp_BMS[6][0],tmp_BMS[6][1],tmp_BMS[6][2],tmp_BMS[6][3],tmp_BMS[6][4],tmp_BMS[6][5],tmp_BMS[6][6],tmp_BMS[6][7])]
-
-        elif tmp_n_modules == 8:
-            tmp_sql = "INSERT INTO pylontech_bms (ts,device_name,soc,voltage,current,temperature,b_status,v_status,c_status,t_status) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
-            tmp_val = [ (tmp_time,'Battery: 1',tmp_BMS[0][0],tmp_BMS[0][1],tmp_BMS[0][2],tmp_BMS[0][3],tmp_BMS[0][4],tmp_BMS[0][5],tmp_BMS[0][6],tmp_BMS[0][7]),\
-                        (tmp_time,'Battery: 2',tmp_BMS[1][0],tmp_BMS[1][1],tmp_BMS[1][2],tmp_BMS[1][3],tmp_BMS[1][4],tmp_BMS[1][5],tmp_BMS[1][6],tmp_BMS[1][7]),\
-                        (tmp_time,'Battery: 3',tmp_BMS[2][0],tmp_BMS[2][1],tmp_BMS[2][2],tmp_BMS[2][3],tmp_BMS[2][4],tmp_BMS[2][5],tmp_BMS[2][6],tmp_BMS[2][7]),\
-                        (tmp_time,'Battery: 4',tmp_BMS[3][0],tmp_BMS[3][1],tmp_BMS[3][2],tmp_BMS[3][3],tmp_BMS[3][4],tmp_BMS[3][5],tmp_BMS[3][6],tmp_BMS[3][7]),\
-                        (tmp_time,'Battery: 5',tmp_BMS[4][0],tmp_BMS[4][1],tmp_BMS[4][2],tmp_BMS[4][3],tmp_BMS[4][4],tmp_BMS[4][5],tmp_BMS[4][6],tmp_BMS[4][7]),\
-                        (tmp_time,'Battery: 6',tmp_BMS[5][0],tmp_BMS[5][1],tmp_BMS[5][2],tmp_BMS[5][3],tmp_BMS[5][4],tmp_BMS[5][5],tmp_BMS[5][6],tmp_BMS[5][7]),\
-                        (tmp_time,'Battery: 7',tmp_BMS[6][0],tmp_BMS[6][1],tmp_BMS[6][2],tmp_BMS[6][3],tmp_BMS[6][4],tmp_BMS[6][5],tmp_BMS[6][6],tmp_BMS[6][7]),\
-                        (tmp_time,'Battery: 8',tmp_BMS[7][0],tmp_BMS[7][1],tmp_BMS[7][2],tmp_BMS[7][3],tmp_BMS[7][4],tmp_BMS[7][5],tmp_BMS[7][6],tmp_BMS[7][7])]
-
-        else:
+        if not 1 <= tmp_n_modules <= 8:
             print("Unsuported number of battery modules. Only 1-8 modules are supported. The module number parsed is:" + str(tmp_n_modules))
             return False
-        try:
-            # Executing the SQL command
-            cursor.executemany(tmp_sql, tmp_val)
-            #print(cursor.rowcount, "records inserted.")
-            # Commit your changes in the database
-            self._port.commit()
-            #print("successfully send data to database")
-            return True
-        except:
-            # Rolling back in case of error
-            self._port.rollback()
-            print("Failed to send data to database")
-            return False
+        return self.write_rows({'pylontech_bms': rows_BMS(BMS_LIST)})
 
 
     def write_XW(self,XW_LIST):
@@ -196,18 +506,18 @@ class MySQL_com():
         if the write process was sucessful.
 
         Args:
-            XW_list: list of length [1-8] containing:
-            [inverter, grid_voltage, grid_current, grid_power, grid_frequency, load_voltage, load_current, load_power, load_frequency,
+            XW_list: list of length [1-8] of XW_Snapshot returned by XW.read_Inverter_All:
+            [device_name, grid_voltage, grid_current, grid_power, grid_frequency, load_voltage, load_current, load_power, load_frequency,
             inverter_dc_current, inverter_dc_power, energy_grid_month, energy_load_month, energy_battery_month, battery_low_voltage,
             battery_low_voltage_delay, battery_hysteresis, inverter_status, inverter_active_warnings_status, inverter_active_faults_status,
             inverter_grid_support_status, inverter_load_shave_status]
-            dtype=float and dtype=str.
+            dtype=float, dtype=int {status codes}, and dtype=str {device_name}.
 
 
         DROP TABLE IF EXISTS `conext_xw`;
         CREATE TABLE `conext_xw` (
             `ts` datetime NOT NULL,
-            `device_name` varchar(16) DEFAULT (NULL),
+            `device_name` varchar(32) DEFAULT (NULL),
             `grid_voltage` float DEFAULT (NULL),
             `grid_current` float DEFAULT (NULL),
             `grid_power` float DEFAULT (NULL),
@@ -224,103 +534,27 @@ class MySQL_com():
             `battery_low_voltage` float DEFAULT (NULL),
             `battery_low_voltage_delay` float DEFAULT (NULL),
             `battery_hysteresis` float DEFAULT (NULL),
-            `inverter_status` varchar(16) DEFAULT (NULL),
-            `inverter_active_warnings_status` varchar(16) DEFAULT (NULL),
-            `inverter_active_faults_status` varchar(16) DEFAULT (NULL),
-            `inverter_grid_support_status` varchar(16) DEFAULT (NULL),
-            `inverter_load_shave_status` varchar(16) DEFAULT (NULL),
-            PRIMARY KEY (`ts`,`inverter`),
-            KEY `idx` (`inverter`,`ts`)
-        ) ENGINE=InnoDB DEFAULT CHARSET=latin1;
+            `inverter_status` smallint unsigned DEFAULT (NULL),
+            `inverter_active_warnings_status` smallint unsigned DEFAULT (NULL),
+            `inverter_active_faults_status` smallint unsigned DEFAULT (NULL),
+            `inverter_grid_support_status` smallint unsigned DEFAULT (NULL),
+            `inverter_load_shave_status` smallint unsigned DEFAULT (NULL),
+            PRIMARY KEY (`ts`,`device_name`),
+            KEY `idx` (`device_name`,`ts`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=latin1
+        PARTITION BY RANGE COLUMNS(ts) (PARTITION pmax VALUES LESS THAN (MAXVALUE));
+
+        The status columns hold the codes, their names are in the table conext_status, see create_status_table.
 
 
         Returns: Boolean value True or False
 
         """
         tmp_n_xw = len(XW_LIST)
-        tmp_time ="{:04d}-{:02d}-{:02d} {:02d}:{:02d}:{:02d}".format(datetime.datetime.now().year,datetime.datetime.now().month,datetime.datetime.now().day,datetime.datetime.now().hour,datetime.datetime.now().minute,datetime.datetime.now().second)
-        cursor = self._port.cursor()
-        
-        tmp_list = XW_LIST
-
-        # Preparing SQL query to INSERT a record into the database.
-        if tmp_n_xw == 1:
-            tmp_sql = "INSERT INTO conext_xw (ts,device_name,grid_voltage,grid_current,grid_power,grid_frequency,load_voltage,load_current,load_power,load_frequency,inverter_dc_current,inverter_dc_power,energy_grid_month,energy_load_month,energy_battery_month,battery_low_voltage,battery_low_voltage_delay,battery_hysteresis,inverter_status,inverter_active_warnings_status,inverter_active_faults_status,inverter_grid_support_status,inverter_load_shave_status) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
-            tmp_val = [(tmp_time,tmp_list[0][0],tmp_list[0][1],tmp_list[0][2],tmp_list[0][3],tmp_list[0][4],tmp_list[0][5],tmp_list[0][6],tmp_list[0][7],tmp_list[0][8],tmp_list[0][9],tmp_list[0][10],tmp_list[0][11],tmp_list[0][12],tmp_list[0][13],tmp_list[0][14],tmp_list[0][15],tmp_list[0][16],tmp_list[0][17],tmp_list[0][18],tmp_list[0][19],tmp_list[0][20],tmp_list[0][21])]
-
-        elif tmp_n_xw == 2:
-            tmp_sql = "INSERT INTO conext_xw (ts,device_name,grid_voltage,grid_current,grid_power,grid_frequency,load_voltage,load_current,load_power,load_frequency,inverter_dc_current,inverter_dc_power,energy_grid_month,energy_load_month,energy_battery_month,battery_low_voltage,battery_low_voltage_delay,battery_hysteresis,inverter_status,inverter_active_warnings_status,inverter_active_faults_status,inverter_grid_support_status,inverter_load_shave_status) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
-            tmp_val = [ (tmp_time,tmp_list[0][0],tmp_list[0][1],tmp_list[0][2],tmp_list[0][3],tmp_list[0][4],tmp_list[0][5],tmp_list[0][6],tmp_list[0][7],tmp_list[0][8],tmp_list[0][9],tmp_list[0][10],tmp_list[0][11],tmp_list[0][12],tmp_list[0][13],tmp_list[0][14],tmp_list[0][15],tmp_list[0][16],tmp_list[0][17],tmp_list[0][18],tmp_list[0][19],tmp_list[0][20],tmp_list[0][21]),
-                        (tmp_time,tmp_list[1][0],tmp_list[1][1],tmp_list[1][2],tmp_list[1][3],tmp_list[1][4],tmp_list[1][5],tmp_list[1][6],tmp_list[1][7],tmp_list[1][8],tmp_list[1][9],tmp_list[1][10],tmp_list[1][11],tmp_list[1][12],tmp_list[1][13],tmp_list[1][14],tmp_list[1][15],tmp_list[1][16],tmp_list[1][17],tmp_list[1][18],tmp_list[1][19],tmp_list[1][20],tmp_list[1][21])]
-
-        elif tmp_n_xw == 3:
-            tmp_sql = "INSERT INTO conext_xw (ts,device_name,grid_voltage,grid_current,grid_power,grid_frequency,load_voltage,load_current,load_power,load_frequency,inverter_dc_current,inverter_dc_power,energy_grid_month,energy_load_month,energy_battery_month,battery_low_voltage,battery_low_voltage_delay,battery_hysteresis,inverter_status,inverter_active_warnings_status,inverter_active_faults_status,inverter_grid_support_status,inverter_load_shave_status) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
-            tmp_val = [ (tmp_time,tmp_list[0][0],tmp_list[0][1],tmp_list[0][2],tmp_list[0][3],tmp_list[0][4],tmp_list[0][5],tmp_list[0][6],tmp_list[0][7],tmp_list[0][8],tmp_list[0][9],tmp_list[0][10],tmp_list[0][11],tmp_list[0][12],tmp_list[0][13],tmp_list[0][14],tmp_list[0][15],tmp_list[0][16],tmp_list[0][17],tmp_list[0][18],tmp_list[0][19],tmp_list[0][20],tmp_list[0][21]),
-                        (tmp_time,tmp_list[1][0],tmp_list[1][1],tmp_list[1][2],tmp_list[1][3],tmp_list[1][4],tmp_list[1][5],tmp_list[1][6],tmp_list[1][7],tmp_list[1][8],tmp_list[1][9],tmp_list[1][10],tmp_list[1][11],tmp_list[1][12],tmp_list[1][13],tmp_list[1][14],tmp_list[1][15],tmp_list[1][16],tmp_list[1][17],tmp_list[1][18],tmp_list[1][19],tmp_list[1][20],tmp_list[1][21]),
-                        (tmp_time,tmp_list[2][0],tmp_list[2][1],tmp_list[2][2],tmp_list[2][3],tmp_list[2][4],tmp_list[2][5],tmp_list[2][6],tmp_list[2][7],tmp_list[2][8],tmp_list[2][9],tmp_list[2][10],tmp_list[2][11],tmp_list[2][12],tmp_list[2][13],tmp_list[2][14],tmp_list[2][15],tmp_list[2][16],tmp_list[2][17],tmp_list[2][18],tmp_list[2][19],tmp_list[2][20],tmp_list[2][21])]
-
-        elif tmp_n_xw == 4:
-            tmp_sql = "INSERT INTO conext_xw (ts,device_name,grid_voltage,grid_current,grid_power,grid_frequency,load_voltage,load_current,load_power,load_frequency,inverter_dc_current,inverter_dc_power,energy_grid_month,energy_load_month,energy_battery_month,battery_low_voltage,battery_low_voltage_delay,battery_hysteresis,inverter_status,inverter_active_warnings_status,inverter_active_faults_status,inverter_grid_support_status,inverter_load_shave_status) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
-            tmp_val = [ (tmp_time,tmp_list[0][0],tmp_list[0][1],tmp_list[0][2],tmp_list[0][3],tmp_list[0][4],tmp_list[0][5],tmp_list[0][6],tmp_list[0][7],tmp_list[0][8],tmp_list[0][9],tmp_list[0][10],tmp_list[0][11],tmp_list[0][12],tmp_list[0][13],tmp_list[0][14],tmp_list[0][15],tmp_list[0][16],tmp_list[0][17],tmp_list[0][18],tmp_list[0][19],tmp_list[0][20],tmp_list[0][21]),
-                        (tmp_time,tmp_list[1][0],tmp_list[1][1],tmp_list[1][2],tmp_list[1][3],tmp_list[1][4],tmp_list[1][5],tmp_list[1][6],tmp_list[1][7],tmp_list[1][8],tmp_list[1][9],tmp_list[1][10],tmp_list[1][11],tmp_list[1][12],tmp_list[1][13],tmp_list[1][14],tmp_list[1][15],tmp_list[1][16],tmp_list[1][17],tmp_list[1][18],tmp_list[1][19],tmp_list[1][20],tmp_list[1][21]),
-                        (tmp_time,tmp_list[2][0],tmp_list[2][1],tmp_list[2][2],tmp_list[2][3],tmp_list[2][4],tmp_list[2][5],tmp_list[2][6],tmp_list[2][7],tmp_list[2][8],tmp_list[2][9],tmp_list[2][10],tmp_list[2][11],tmp_list[2][12],tmp_list[2][13],tmp_list[2][14],tmp_list[2][15],tmp_list[2][16],tmp_list[2][17],tmp_list[2][18],tmp_list[2][19],tmp_list[2][20],tmp_list[2][21]),
-                        (tmp_time,tmp_list[3][0],tmp_list[3][1],tmp_list[3][2],tmp_list[3][3],tmp_list[3][4],tmp_list[3][5],tmp_list[3][6],tmp_list[3][7],tmp_list[3][8],tmp_list[3][9],tmp_list[3][10],tmp_list[3][11],tmp_list[3][12],tmp_list[3][13],tmp_list[3][14],tmp_list[3][15],tmp_list[3][16],tmp_list[3][17],tmp_list[3][18],tmp_list[3][19],tmp_list[3][20],tmp_list[3][21])]
-
-        elif tmp_n_xw == 5:
-            tmp_sql = "INSERT INTO conext_xw (ts,device_name,grid_voltage,grid_current,grid_power,grid_frequency,load_voltage,load_current,load_power,load_frequency,inverter_dc_current,inverter_dc_power,energy_grid_month,energy_load_month,energy_battery_month,battery_low_voltage,battery_low_voltage_delay,battery_hysteresis,inverter_status,inverter_active_warnings_status,inverter_active_faults_status,inverter_grid_support_status,inverter_load_shave_status) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
-            tmp_val = [ (tmp_time,tmp_list[0][0],tmp_list[0][1],tmp_list[0][2],tmp_list[0][3],tmp_list[0][4],tmp_list[0][5],tmp_list[0][6],tmp_list[0][7],tmp_list[0][8],tmp_list[0][9],tmp_list[0][10],tmp_list[0][11],tmp_list[0][12],tmp_list[0][13],tmp_list[0][14],tmp_list[0][15],tmp_list[0][16],tmp_list[0][17],tmp_list[0][18],tmp_list[0][19],tmp_list[0][20],tmp_list[0][21]),
-                        (tmp_time,tmp_list[1][0],tmp_list[1][1],tmp_list[1][2],tmp_list[1][3],tmp_list[1][4],tmp_list[1][5],tmp_list[1][6],tmp_list[1][7],tmp_list[1][8],tmp_list[1][9],tmp_list[1][10],tmp_list[1][11],tmp_list[1][12],tmp_list[1][13],tmp_list[1][14],tmp_list[1][15],tmp_list[1][16],tmp_list[1][17],tmp_list[1][18],tmp_list[1][19],tmp_list[1][20],tmp_list[1][21]),
-                        (tmp_time,tmp_list[2][0],tmp_list[2][1],tmp_list[2][2],tmp_list[2][3],tmp_list[2][4],tmp_list[2][5],tmp_list[2][6],tmp_list[2][7],tmp_list[2][8],tmp_list[2][9],tmp_list[2][10],tmp_list[2][11],tmp_list[2][12],tmp_list[2][13],tmp_list[2][14],tmp_list[2][15],tmp_list[2][16],tmp_list[2][17],tmp_list[2][18],tmp_list[2][19],tmp_list[2][20],tmp_list[2][21]),
-                        (tmp_time,tmp_list[3][0],tmp_list[3][1],tmp_list[3][2],tmp_list[3][3],tmp_list[3][4],tmp_list[3][5],tmp_list[3][6],tmp_list[3][7],tmp_list[3][8],tmp_list[3][9],tmp_list[3][10],tmp_list[3][11],tmp_list[3][12],tmp_list[3][13],tmp_list[3][14],tmp_list[3][15],tmp_list[3][16],tmp_list[3][17],tmp_list[3][18],tmp_list[3][19],tmp_list[3][20],tmp_list[3][21]),
-                        (tmp_time,tmp_list[4][0],tmp_list[4][1],tmp_list[4][2],tmp_list[4][3],tmp_list[4][4],tmp_list[4][5],tmp_list[4][6],tmp_list[4][7],tmp_list[4][8],tmp_list[4][9],tmp_list[4][10],tmp_list[4][11],tmp_list[4][12],tmp_list[4][13],tmp_list[4][14],tmp_list[4][15],tmp_list[4][16],tmp_list[4][17],tmp_list[4][18],tmp_list[4][19],tmp_list[4][20],tmp_list[4][21])]
-
-        elif tmp_n_xw == 6:
-            tmp_sql = "INSERT INTO conext_xw (ts,device_name,grid_voltage,grid_current,grid_power,grid_frequency,load_voltage,load_current,load_power,load_frequency,inverter_dc_current,inverter_dc_power,energy_grid_month,energy_load_month,energy_battery_month,battery_low_voltage,battery_low_voltage_delay,battery_hysteresis,inverter_status,inverter_active_warnings_status,inverter_active_faults_status,inverter_grid_support_status,inverter_load_shave_status) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
-            tmp_val = [ (tmp_time,tmp_list[0][0],tmp_list[0][1],tmp_list[0][2],tmp_list[0][3],tmp_list[0][4],tmp_list[0][5],tmp_list[0][6],tmp_list[0][7],tmp_list[0][8],tmp_list[0][9],tmp_list[0][10],tmp_list[0][11],tmp_list[0][12],tmp_list[0][13],tmp_list[0][14],tmp_list[0][15],tmp_list[0][16],tmp_list[0][17],tmp_list[0][18],tmp_list[0][19],tmp_list[0][20],tmp_list[0][21]),
-                        (tmp_time,tmp_list[1][0],tmp_list[1][1],tmp_list[1][2],tmp_list[1][3],tmp_list[1][4],tmp_list[1][5],tmp_list[1][6],tmp_list[1][7],tmp_list[1][8],tmp_list[1][9],tmp_list[1][10],tmp_list[1][11],tmp_list[1][12],tmp_list[1][13],tmp_list[1][14],tmp_list[1][15],tmp_list[1][16],tmp_list[1][17],tmp_list[1][18],tmp_list[1][19],tmp_list[1][20],tmp_list[1][21]),
-                        (tmp_time,tmp_list[2][0],tmp_list[2][1],tmp_list[2][2],tmp_list[2][3],tmp_list[2][4],tmp_list[2][5],tmp_list[2][6],tmp_list[2][7],tmp_list[2][8],tmp_list[2][9],tmp_list[2][10],tmp_list[2][11],tmp_list[2][12],tmp_list[2][13],tmp_list[2][14],tmp_list[2][15],tmp_list[2][16],tmp_list[2][17],tmp_list[2][18],tmp_list[2][19],tmp_list[2][20],tmp_list[2][21]),
-                        (tmp_time,tmp_list[3][0],tmp_list[3][1],tmp_list[3][2],tmp_list[3][3],tmp_list[3][4],tmp_list[3][5],tmp_list[3][6],tmp_list[3][7],tmp_list[3][8],tmp_list[3][9],tmp_list[3][10],tmp_list[3][11],tmp_list[3][12],tmp_list[3][13],tmp_list[3][14],tmp_list[3][15],tmp_list[3][16],tmp_list[3][17],tmp_list[3][18],tmp_list[3][19],tmp_list[3][20],tmp_list[3][21]),
-                        (tmp_time,tmp_list[4][0],tmp_list[4][1],tmp_list[4][2],tmp_list[4][3],tmp_list[4][4],tmp_list[4][5],tmp_list[4][6],tmp_list[4][7],tmp_list[4][8],tmp_list[4][9],tmp_list[4][10],tmp_list[4][11],tmp_list[4][12],tmp_list[4][13],tmp_list[4][14],tmp_list[4][15],tmp_list[4][16],tmp_list[4][17],tmp_list[4][18],tmp_list[4][19],tmp_list[4][20],tmp_list[4][21]),
-                        (tmp_time,tmp_list[5][0],tmp_list[5][1],tmp_list[5][2],tmp_list[5][3],tmp_list[5][4],tmp_list[5][5],tmp_list[5][6],tmp_list[5][7],tmp_list[5][8],tmp_list[5][9],tmp_list[5][10],tmp_list[5][11],tmp_list[5][12],tmp_list[5][13],tmp_list[5][14],tmp_list[5][15],tmp_list[5][16],tmp_list[5][17],tmp_list[5][18],tmp_list[5][19],tmp_list[5][20],tmp_list[5][21])]
-
-        elif tmp_n_xw == 7:
-            tmp_sql = "INSERT INTO conext_xw (ts,device_name,grid_voltage,grid_current,grid_power,grid_frequency,load_voltage,load_current,load_power,load_frequency,inverter_dc_current,inverter_dc_power,energy_grid_month,energy_load_month,energy_battery_month,battery_low_voltage,battery_low_voltage_delay,battery_hysteresis,inverter_status,inverter_active_warnings_status,inverter_active_faults_status,inverter_grid_support_status,inverter_load_shave_status) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
-            tmp_val = [ (tmp_time,tmp_list[0][0],tmp_list[0][1],tmp_list[0][2],tmp_list[0][3],tmp_list[0][4],tmp_list[0][5],tmp_list[0][6],tmp_list[0][7],tmp_list[0][8],tmp_list[0][9],tmp_list[0][10],tmp_list[0][11],tmp_list[0][12],tmp_list[0][13],tmp_list[0][14],tmp_list[0][15],tmp_list[0][16],tmp_list[0][17],tmp_list[0][18],tmp_list[0][19],tmp_list[0][20],tmp_list[0][21]),
-                        (tmp_time,tmp_list[1][0],tmp_list[1][1],tmp_list[1][2],tmp_list[1][3],tmp_list[1][4],tmp_list[1][5],tmp_list[1][6],tmp_list[1][7],tmp_list[1][8],tmp_list[1][9],tmp_list[1][10],tmp_list[1][11],tmp_list[1][12],tmp_list[1][13],tmp_list[1][14],tmp_list[1][15],tmp_list[1][16],tmp_list[1][17],tmp_list[1][18],tmp_list[1][19],tmp_list[1][20],tmp_list[1][21]),
-                        (tmp_time,tmp_list[2][0],tmp_list[2][1],tmp_list[2][2],tmp_list[2][3],tmp_list[2][4],tmp_list[2][5],tmp_list[2][6],tmp_list[2][7],tmp_list[2][8],tmp_list[2][9],tmp_list[2][10],tmp_list[2][11],tmp_list[2][12],tmp_list[2][13],tmp_list[2][14],tmp_list[2][15],tmp_list[2][16],tmp_list[2][17],tmp_list[2][18],tmp_list[2][19],tmp_list[2][20],tmp_list[2][21]),
-                        (tmp_time,tmp_list[3][0],tmp_list[3][1],tmp_list[3][2],tmp_list[3][3],tmp_list[3][4],tmp_list[3][5],tmp_list[3][6],tmp_list[3][7],tmp_list[3][8],tmp_list[3][9],tmp_list[3][10],tmp_list[3][11],tmp_list[3][12],tmp_list[3][13],tmp_list[3][14],tmp_list[3][15],tmp_list[3][16],tmp_list[3][17],tmp_list[3][18],tmp_list[3][19],tmp_list[3][20],tmp_list[3][21]),
-                        (tmp_time,tmp_list[4][0],tmp_list[4][1],tmp_list[4][2],tmp_list[4][3],tmp_list[4][4],tmp_list[4][5],tmp_list[4][6],tmp_list[4][7],tmp_list[4][8],tmp_list[4][9],tmp_list[4][10],tmp_list[4][11],tmp_list[4][12],tmp_list[4][13],tmp_list[4][14],tmp_list[4][15],tmp_list[4][16],tmp_list[4][17],tmp_list[4][18],tmp_list[4][19],tmp_list[4][20],tmp_list[4][21]),
-                        (tmp_time,tmp_list[5][0],tmp_list[5][1],tmp_list[5][2],tmp_list[5][3],tmp_list[5][4],tmp_list[5][5],tmp_list[5][6],tmp_list[5][7],tmp_list[5][8],tmp_list[5][9],tmp_list[5][10],tmp_list[5][11],tmp_list[5][12],tmp_list[5][13],tmp_list[5][14],tmp_list[5][15],tmp_list[5][16],tmp_list[5][17],tmp_list[5][18],tmp_list[5][19],tmp_list[5][20],tmp_list[5][21]),
-                        (tmp_time,tmp_list[6][0],tmp_list[6][1],tmp_list[6][2],tmp_list[6][3],tmp_list[6][4],tmp_list[6][5],tmp_list[6][6],tmp_list[6][7],tmp_list[6][8],tmp_list[6][9],tmp_list[6][10],tmp_list[6][11],tmp_list[6][12],tmp_list[6][13],tmp_list[6][14],tmp_list[6][15],tmp_list[6][16],tmp_list[6][17],tmp_list[6][18],tmp_list[6][19],tmp_list[6][20],tmp_list[6][21])]
-
-        elif tmp_n_xw == 8:
-            tmp_sql = "INSERT INTO conext_xw (ts,device_name,grid_voltage,grid_current,grid_power,grid_frequency,load_voltage,load_current,load_power,load_frequency,inverter_dc_current,inverter_dc_power,energy_grid_month,energy_load_month,energy_battery_month,battery_low_voltage,battery_low_voltage_delay,battery_hysteresis,inverter_status,inverter_active_warnings_status,inverter_active_faults_status,inverter_grid_support_status,inverter_load_shave_status) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
-            tmp_val = [ (tmp_time,tmp_list[0][0],tmp_list[0][1],tmp_list[0][2],tmp_list[0][3],tmp_list[0][4],tmp_list[0][5],tmp_list[0][6],tmp_list[0][7],tmp_list[0][8],tmp_list[0][9],tmp_list[0][10],tmp_list[0][11],tmp_list[0][12],tmp_list[0][13],tmp_list[0][14],tmp_list[0][15],tmp_list[0][16],tmp_list[0][17],tmp_list[0][18],tmp_list[0][19],tmp_list[0][20],tmp_list[0][21]),
-                        (tmp_time,tmp_list[1][0],tmp_list[1][1],tmp_list[1][2],tmp_list[1][3],tmp_list[1][4],tmp_list[1][5],tmp_list[1][6],tmp_list[1][7],tmp_list[1][8],tmp_list[1][9],tmp_list[1][10],tmp_list[1][11],tmp_list[1][12],tmp_list[1][13],tmp_list[1][14],tmp_list[1][15],tmp_list[1][16],tmp_list[1][17],tmp_list[1][18],tmp_list[1][19],tmp_list[1][20],tmp_list[1][21]),
-                        (tmp_time,tmp_list[2][0],tmp_list[2][1],tmp_list[2][2],tmp_list[2][3],tmp_list[2][4],tmp_list[2][5],tmp_list[2][6],tmp_list[2][7],tmp_list[2][8],tmp_list[2][9],tmp_list[2][10],tmp_list[2][11],tmp_list[2][12],tmp_list[2][13],tmp_list[2][14],tmp_list[2][15],tmp_list[2][16],tmp_list[2][17],tmp_list[2][18],tmp_list[2][19],tmp_list[2][20],tmp_list[2][21]),
-                        (tmp_time,tmp_list[3][0],tmp_list[3][1],tmp_list[3][2],tmp_list[3][3],tmp_list[3][4],tmp_list[3][5],tmp_list[3][6],tmp_list[3][7],tmp_list[3][8],tmp_list[3][9],tmp_list[3][10],tmp_list[3][11],tmp_list[3][12],tmp_list[3][13],tmp_list[3][14],tmp_list[3][15],tmp_list[3][16],tmp_list[3][17],tmp_list[3][18],tmp_list[3][19],tmp_list[3][20],tmp_list[3][21]),
-                        (tmp_time,tmp_list[4][0],tmp_list[4][1],tmp_list[4][2],tmp_list[4][3],tmp_list[4][4],tmp_list[4][5],tmp_list[4][6],tmp_list[4][7],tmp_list[4][8],tmp_list[4][9],tmp_list[4][10],tmp_list[4][11],tmp_list[4][12],tmp_list[4][13],tmp_list[4][14],tmp_list[4][15],tmp_list[4][16],tmp_list[4][17],tmp_list[4][18],tmp_list[4][19],tmp_list[4][20],tmp_list[4][21]),
-                        (tmp_time,tmp_list[5][0],tmp_list[5][1],tmp_list[5][2],tmp_list[5][3],tmp_list[5][4],tmp_list[5][5],tmp_list[5][6],tmp_list[5][7],tmp_list[5][8],tmp_list[5][9],tmp_list[5][10],tmp_list[5][11],tmp_list[5][12],tmp_list[5][13],tmp_list[5][14],tmp_list[5][15],tmp_list[5][16],tmp_list[5][17],tmp_list[5][18],tmp_list[5][19],tmp_list[5][20],tmp_list[5][21]),
-                        (tmp_time,tmp_list[6][0],tmp_list[6][1],tmp_list[6][2],tmp_list[6][3],tmp_list[6][4],tmp_list[6][5],tmp_list[6][6],tmp_list[6][7],tmp_list[6][8],tmp_list[6][9],tmp_list[6][10],tmp_list[6][11],tmp_list[6][12],tmp_list[6][13],tmp_list[6][14],tmp_list[6][15],tmp_list[6][16],tmp_list[6][17],tmp_list[6][18],tmp_list[6][19],tmp_list[6][20],tmp_list[6][21]),
-                        (tmp_time,tmp_list[7][0],tmp_list[7][1],tmp_list[7][2],tmp_list[7][3],tmp_list[7][4],tmp_list[7][5],tmp_list[7][6],tmp_list[7][7],tmp_list[7][8],tmp_list[7][9],tmp_list[7][10],tmp_list[7][11],tmp_list[7][12],tmp_list[7][13],tmp_list[7][14],tmp_list[7][15],tmp_list[7][16],tmp_list[7][17],tmp_list[7][18],tmp_list[7][19],tmp_list[7][20],tmp_list[7][21])]
-
-        else:
+        if not 1 <= tmp_n_xw <= 8:
             print("Unsuported number of XW devices. Only 1-8 devices are supported. The device number parsed is:" + str(tmp_n_xw))
             return False
-       
-        try:
-            # Executing the SQL command
-            cursor.executemany(tmp_sql, tmp_val)
-            #print(cursor.rowcount, "records inserted.")
-            # Commit your changes in the database
-            self._port.commit()
-            #print("successfully send data to database")
-            return True
-        except:
-            # Rolling back in case of error
-            self._port.rollback()
-            print("Failed to send data to database")
-            return False
+        return self.write_rows({'conext_xw': rows_device(XW_LIST)})
 
 
     def write_MPPT(self,MPPT_LIST):
@@ -328,11 +562,11 @@ class MySQL_com():
         if the write process was sucessful.
 
         Args:
-            MPPT_list: list of length [1-8] containing:
+            MPPT_list: list of length [1-8] of MPPT_Snapshot returned by MPPT60.read_MPPT_All:
             [device_name,dc_input_voltage,dc_input_current,dc_input_power,dc_output_voltage,dc_output_current,dc_output_power,
             dc_output_power_percentage,energy_pv_day,energy_pv_week,energy_pv_month,energy_pv_year,mppt_status,
             mppt_charger_status,mppt_active_warnings_status,mppt_active_faults_status]
-            dtype=float and dtype=str.
+            dtype=float, dtype=int {status codes}, and dtype=str {device_name}.
 
 
         DROP TABLE IF EXISTS `conext_mppt`;
@@ -350,102 +584,273 @@ class MySQL_com():
             `energy_pv_week` float DEFAULT (NULL),
             `energy_pv_month` float DEFAULT (NULL),
             `energy_pv_year` float DEFAULT (NULL),
-            `mppt_status` varchar(32) DEFAULT (NULL),
-            `mppt_charger_status` varchar(32) DEFAULT (NULL),
-            `mppt_active_warnings_status` varchar(32) DEFAULT (NULL),
-            `mppt_active_faults_status` varchar(32) DEFAULT (NULL),
-        PRIMARY KEY (`ts`,`device_name`),
-        KEY `idx` (`device_name`,`ts`)
-        ) ENGINE=InnoDB DEFAULT CHARSET=latin1;
+            `mppt_status` smallint unsigned DEFAULT (NULL),
+            `mppt_charger_status` smallint unsigned DEFAULT (NULL),
+            `mppt_active_warnings_status` smallint unsigned DEFAULT (NULL),
+            `mppt_active_faults_status` smallint unsigned DEFAULT (NULL),
+            PRIMARY KEY (`ts`,`device_name`),
+            KEY `idx` (`device_name`,`ts`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=latin1
+        PARTITION BY RANGE COLUMNS(ts) (PARTITION pmax VALUES LESS THAN (MAXVALUE));
+
+        The status columns hold the codes, their names are in the table conext_status, see create_status_table.
 
 
         Returns: Boolean value True or False
 
         """
         tmp_n_mppt = len(MPPT_LIST)
-        tmp_time ="{:04d}-{:02d}-{:02d} {:02d}:{:02d}:{:02d}".format(datetime.datetime.now().year,datetime.datetime.now().month,datetime.datetime.now().day,datetime.datetime.now().hour,datetime.datetime.now().minute,datetime.datetime.now().second)
-        cursor = self._port.cursor()
-        
-        tmp_list = MPPT_LIST
-
-        # Preparing SQL query to INSERT a record into the database.
-        if tmp_n_mppt == 1:
-            tmp_sql = "INSERT INTO conext_mppt (ts,device_name,dc_input_voltage,dc_input_current,dc_input_power,dc_output_voltage,dc_output_current,dc_output_power,dc_output_power_percentage,energy_pv_day,energy_pv_week,energy_pv_month,energy_pv_year,mppt_status,mppt_charger_status,mppt_active_warnings_status,mppt_active_faults_status) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
-            tmp_val = [(tmp_time,tmp_list[0][0],tmp_list[0][1],tmp_list[0][2],tmp_list[0][3],tmp_list[0][4],tmp_list[0][5],tmp_list[0][6],tmp_list[0][7],tmp_list[0][8],tmp_list[0][9],tmp_list[0][10],tmp_list[0][11],tmp_list[0][12],tmp_list[0][13],tmp_list[0][14],tmp_list[0][15])]
-
-        elif tmp_n_mppt == 2:
-            tmp_sql = "INSERT INTO conext_mppt (ts,device_name,dc_input_voltage,dc_input_current,dc_input_power,dc_output_voltage,dc_output_current,dc_output_power,dc_output_power_percentage,energy_pv_day,energy_pv_week,energy_pv_month,energy_pv_year,mppt_status,mppt_charger_status,mppt_active_warnings_status,mppt_active_faults_status) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
-            tmp_val = [ (tmp_time,tmp_list[0][0],tmp_list[0][1],tmp_list[0][2],tmp_list[0][3],tmp_list[0][4],tmp_list[0][5],tmp_list[0][6],tmp_list[0][7],tmp_list[0][8],tmp_list[0][9],tmp_list[0][10],tmp_list[0][11],tmp_list[0][12],tmp_list[0][13],tmp_list[0][14],tmp_list[0][15]),
-                        (tmp_time,tmp_list[1][0],tmp_list[1][1],tmp_list[1][2],tmp_list[1][3],tmp_list[1][4],tmp_list[1][5],tmp_list[1][6],tmp_list[1][7],tmp_list[1][8],tmp_list[1][9],tmp_list[1][10],tmp_list[1][11],tmp_list[1][12],tmp_list[1][13],tmp_list[1][14],tmp_list[1][15])]
-
-        elif tmp_n_mppt == 3:
-            tmp_sql = "INSERT INTO conext_mppt (ts,device_name,dc_input_voltage,dc_input_current,dc_input_power,dc_output_voltage,dc_output_current,dc_output_power,dc_output_power_percentage,energy_pv_day,energy_pv_week,energy_pv_month,energy_pv_year,mppt_status,mppt_charger_status,mppt_active_warnings_status,mppt_active_faults_status) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
-            tmp_val = [ (tmp_time,tmp_list[0][0],tmp_list[0][1],tmp_list[0][2],tmp_list[0][3],tmp_list[0][4],tmp_list[0][5],tmp_list[0][6],tmp_list[0][7],tmp_list[0][8],tmp_list[0][9],tmp_list[0][10],tmp_list[0][11],tmp_list[0][12],tmp_list[0][13],tmp_list[0][14],tmp_list[0][15]),
-                        (tmp_time,tmp_list[1][0],tmp_list[1][1],tmp_list[1][2],tmp_list[1][3],tmp_list[1][4],tmp_list[1][5],tmp_list[1][6],tmp_list[1][7],tmp_list[1][8],tmp_list[1][9],tmp_list[1][10],tmp_list[1][11],tmp_list[1][12],tmp_list[1][13],tmp_list[1][14],tmp_list[1][15]),
-                        (tmp_time,tmp_list[2][0],tmp_list[2][1],tmp_list[2][2],tmp_list[2][3],tmp_list[2][4],tmp_list[2][5],tmp_list[2][6],tmp_list[2][7],tmp_list[2][8],tmp_list[2][9],tmp_list[2][10],tmp_list[2][11],tmp_list[2][12],tmp_list[2][13],tmp_list[2][14],tmp_list[2][15])]
-
-        elif tmp_n_mppt == 4:
-            tmp_sql = "INSERT INTO conext_mppt (ts,device_name,dc_input_voltage,dc_input_current,dc_input_power,dc_output_voltage,dc_output_current,dc_output_power,dc_output_power_percentage,energy_pv_day,energy_pv_week,energy_pv_month,energy_pv_year,mppt_status,mppt_charger_status,mppt_active_warnings_status,mppt_active_faults_status) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
-            tmp_val = [ (tmp_time,tmp_list[0][0],tmp_list[0][1],tmp_list[0][2],tmp_list[0][3],tmp_list[0][4],tmp_list[0][5],tmp_list[0][6],tmp_list[0][7],tmp_list[0][8],tmp_list[0][9],tmp_list[0][10],tmp_list[0][11],tmp_list[0][12],tmp_list[0][13],tmp_list[0][14],tmp_list[0][15]),
-                        (tmp_time,tmp_list[1][0],tmp_list[1][1],tmp_list[1][2],tmp_list[1][3],tmp_list[1][4],tmp_list[1][5],tmp_list[1][6],tmp_list[1][7],tmp_list[1][8],tmp_list[1][9],tmp_list[1][10],tmp_list[1][11],tmp_list[1][12],tmp_list[1][13],tmp_list[1][14],tmp_list[1][15]),
-                        (tmp_time,tmp_list[2][0],tmp_list[2][1],tmp_list[2][2],tmp_list[2][3],tmp_list[2][4],tmp_list[2][5],tmp_list[2][6],tmp_list[2][7],tmp_list[2][8],tmp_list[2][9],tmp_list[2][10],tmp_list[2][11],tmp_list[2][12],tmp_list[2][13],tmp_list[2][14],tmp_list[2][15]),
-                        (tmp_time,tmp_list[3][0],tmp_list[3][1],tmp_list[3][2],tmp_list[3][3],tmp_list[3][4],tmp_list[3][5],tmp_list[3][6],tmp_list[3][7],tmp_list[3][8],tmp_list[3][9],tmp_list[3][10],tmp_list[3][11],tmp_list[3][12],tmp_list[3][13],tmp_list[3][14],tmp_list[3][15])]
-
-        elif tmp_n_mppt == 5:
-            tmp_sql = "INSERT INTO conext_mppt (ts,device_name,dc_input_voltage,dc_input_current,dc_input_power,dc_output_voltage,dc_output_current,dc_output_power,dc_output_power_percentage,energy_pv_day,energy_pv_week,energy_pv_month,energy_pv_year,mppt_status,mppt_charger_status,mppt_active_warnings_status,mppt_active_faults_status) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
-            tmp_val = [ (tmp_time,tmp_list[0][0],tmp_list[0][1],tmp_list[0][2],tmp_list[0][3],tmp_list[0][4],tmp_list[0][5],tmp_list[0][6],tmp_list[0][7],tmp_list[0][8],tmp_list[0][9],tmp_list[0][10],tmp_list[0][11],tmp_list[0][12],tmp_list[0][13],tmp_list[0][14],tmp_list[0][15]),
-                        (tmp_time,tmp_list[1][0],tmp_list[1][1],tmp_list[1][2],tmp_list[1][3],tmp_list[1][4],tmp_list[1][5],tmp_list[1][6],tmp_list[1][7],tmp_list[1][8],tmp_list[1][9],tmp_list[1][10],tmp_list[1][11],tmp_list[1][12],tmp_list[1][13],tmp_list[1][14],tmp_list[1][15]),
-                        (tmp_time,tmp_list[2][0],tmp_list[2][1],tmp_list[2][2],tmp_list[2][3],tmp_list[2][4],tmp_list[2][5],tmp_list[2][6],tmp_list[2][7],tmp_list[2][8],tmp_list[2][9],tmp_list[2][10],tmp_list[2][11],tmp_list[2][12],tmp_list[2][13],tmp_list[2][14],tmp_list[2][15]),
-                        (tmp_time,tmp_list[3][0],tmp_list[3][1],tmp_list[3][2],tmp_list[3][3],tmp_list[3][4],tmp_list[3][5],tmp_list[3][6],tmp_list[3][7],tmp_list[3][8],tmp_list[3][9],tmp_list[3][10],tmp_list[3][11],tmp_list[3][12],tmp_list[3][13],tmp_list[3][14],tmp_list[3][15]),
-                        (tmp_time,tmp_list[4][0],tmp_list[4][1],tmp_list[4][2],tmp_list[4][3],tmp_list[4][4],tmp_list[4][5],tmp_list[4][6],tmp_list[4][7],tmp_list[4][8],tmp_list[4][9],tmp_list[4][10],tmp_list[4][11],tmp_list[4][12],tmp_list[4][13],tmp_list[4][14],tmp_list[4][15])]
-
-        elif tmp_n_mppt == 6:
-            tmp_sql = "INSERT INTO conext_mppt (ts,device_name,dc_input_voltage,dc_input_current,dc_input_power,dc_output_voltage,dc_output_current,dc_output_power,dc_output_power_percentage,energy_pv_day,energy_pv_week,energy_pv_month,energy_pv_year,mppt_status,mppt_charger_status,mppt_active_warnings_status,mppt_active_faults_status) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
-            tmp_val = [ (tmp_time,tmp_list[0][0],tmp_list[0][1],tmp_list[0][2],tmp_list[0][3],tmp_list[0][4],tmp_list[0][5],tmp_list[0][6],tmp_list[0][7],tmp_list[0][8],tmp_list[0][9],tmp_list[0][10],tmp_list[0][11],tmp_list[0][12],tmp_list[0][13],tmp_list[0][14],tmp_list[0][15]),
-                        (tmp_time,tmp_list[1][0],tmp_list[1][1],tmp_list[1][2],tmp_list[1][3],tmp_list[1][4],tmp_list[1][5],tmp_list[1][6],tmp_list[1][7],tmp_list[1][8],tmp_list[1][9],tmp_list[1][10],tmp_list[1][11],tmp_list[1][12],tmp_list[1][13],tmp_list[1][14],tmp_list[1][15]),
-                        (tmp_time,tmp_list[2][0],tmp_list[2][1],tmp_list[2][2],tmp_list[2][3],tmp_list[2][4],tmp_list[2][5],tmp_list[2][6],tmp_list[2][7],tmp_list[2][8],tmp_list[2][9],tmp_list[2][10],tmp_list[2][11],tmp_list[2][12],tmp_list[2][13],tmp_list[2][14],tmp_list[2][15]),
-                        (tmp_time,tmp_list[3][0],tmp_list[3][1],tmp_list[3][2],tmp_list[3][3],tmp_list[3][4],tmp_list[3][5],tmp_list[3][6],tmp_list[3][7],tmp_list[3][8],tmp_list[3][9],tmp_list[3][10],tmp_list[3][11],tmp_list[3][12],tmp_list[3][13],tmp_list[3][14],tmp_list[3][15]),
-                        (tmp_time,tmp_list[4][0],tmp_list[4][1],tmp_list[4][2],tmp_list[4][3],tmp_list[4][4],tmp_list[4][5],tmp_list[4][6],tmp_list[4][7],tmp_list[4][8],tmp_list[4][9],tmp_list[4][10],tmp_list[4][11],tmp_list[4][12],tmp_list[4][13],tmp_list[4][14],tmp_list[4][15]),
-                        (tmp_time,tmp_list[5][0],tmp_list[5][1],tmp_list[5][2],tmp_list[5][3],tmp_list[5][4],tmp_list[5][5],tmp_list[5][6],tmp_list[5][7],tmp_list[5][8],tmp_list[5][9],tmp_list[5][10],tmp_list[5][11],tmp_list[5][12],tmp_list[5][13],tmp_list[5][14],tmp_list[5][15])]
-
-        elif tmp_n_mppt == 7:
-            tmp_sql = "INSERT INTO conext_mppt (ts,device_name,dc_input_voltage,dc_input_current,dc_input_power,dc_output_voltage,dc_output_current,dc_output_power,dc_output_power_percentage,energy_pv_day,energy_pv_week,energy_pv_month,energy_pv_year,mppt_status,mppt_charger_status,mppt_active_warnings_status,mppt_active_faults_status) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
-            tmp_val = [ (tmp_time,tmp_list[0][0],tmp_list[0][1],tmp_list[0][2],tmp_list[0][3],tmp_list[0][4],tmp_list[0][5],tmp_list[0][6],tmp_list[0][7],tmp_list[0][8],tmp_list[0][9],tmp_list[0][10],tmp_list[0][11],tmp_list[0][12],tmp_list[0][13],tmp_list[0][14],tmp_list[0][15]),
-                        (tmp_time,tmp_list[1][0],tmp_list[1][1],tmp_list[1][2],tmp_list[1][3],tmp_list[1][4],tmp_list[1][5],tmp_list[1][6],tmp_list[1][7],tmp_list[1][8],tmp_list[1][9],tmp_list[1][10],tmp_list[1][11],tmp_list[1][12],tmp_list[1][13],tmp_list[1][14],tmp_list[1][15]),
-                        (tmp_time,tmp_list[2][0],tmp_list[2][1],tmp_list[2][2],tmp_list[2][3],tmp_list[2][4],tmp_list[2][5],tmp_list[2][6],tmp_list[2][7],tmp_list[2][8],tmp_list[2][9],tmp_list[2][10],tmp_list[2][11],tmp_list[2][12],tmp_list[2][13],tmp_list[2][14],tmp_list[2][15]),
-                        (tmp_time,tmp_list[3][0],tmp_list[3][1],tmp_list[3][2],tmp_list[3][3],tmp_list[3][4],tmp_list[3][5],tmp_list[3][6],tmp_list[3][7],tmp_list[3][8],tmp_list[3][9],tmp_list[3][10],tmp_list[3][11],tmp_list[3][12],tmp_list[3][13],tmp_list[3][14],tmp_list[3][15]),
-                        (tmp_time,tmp_list[4][0],tmp_list[4][1],tmp_list[4][2],tmp_list[4][3],tmp_list[4][4],tmp_list[4][5],tmp_list[4][6],tmp_list[4][7],tmp_list[4][8],tmp_list[4][9],tmp_list[4][10],tmp_list[4][11],tmp_list[4][12],tmp_list[4][13],tmp_list[4][14],tmp_list[4][15]),
-                        (tmp_time,tmp_list[5][0],tmp_list[5][1],tmp_list[5][2],tmp_list[5][3],tmp_list[5][4],tmp_list[5][5],tmp_list[5][6],tmp_list[5][7],tmp_list[5][8],tmp_list[5][9],tmp_list[5][10],tmp_list[5][11],tmp_list[5][12],tmp_list[5][13],tmp_list[5][14],tmp_list[5][15]),
-                        (tmp_time,tmp_list[6][0],tmp_list[6][1],tmp_list[6][2],tmp_list[6][3],tmp_list[6][4],tmp_list[6][5],tmp_list[6][6],tmp_list[6][7],tmp_list[6][8],tmp_list[6][9],tmp_list[6][10],tmp_list[6][11],tmp_list[6][12],tmp_list[6][13],tmp_list[6][14],tmp_list[6][15])]
-
-        elif tmp_n_mppt == 8:
-            tmp_sql = "INSERT INTO conext_mppt (ts,device_name,dc_input_voltage,dc_input_current,dc_input_power,dc_output_voltage,dc_output_current,dc_output_power,dc_output_power_percentage,energy_pv_day,energy_pv_week,energy_pv_month,energy_pv_year,mppt_status,mppt_charger_status,mppt_active_warnings_status,mppt_active_faults_status) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
-            tmp_val = [ (tmp_time,tmp_list[0][0],tmp_list[0][1],tmp_list[0][2],tmp_list[0][3],tmp_list[0][4],tmp_list[0][5],tmp_list[0][6],tmp_list[0][7],tmp_list[0][8],tmp_list[0][9],tmp_list[0][10],tmp_list[0][11],tmp_list[0][12],tmp_list[0][13],tmp_list[0][14],tmp_list[0][15]),
-                        (tmp_time,tmp_list[1][0],tmp_list[1][1],tmp_list[1][2],tmp_list[1][3],tmp_list[1][4],tmp_list[1][5],tmp_list[1][6],tmp_list[1][7],tmp_list[1][8],tmp_list[1][9],tmp_list[1][10],tmp_list[1][11],tmp_list[1][12],tmp_list[1][13],tmp_list[1][14],tmp_list[1][15]),
-                        (tmp_time,tmp_list[2][0],tmp_list[2][1],tmp_list[2][2],tmp_list[2][3],tmp_list[2][4],tmp_list[2][5],tmp_list[2][6],tmp_list[2][7],tmp_list[2][8],tmp_list[2][9],tmp_list[2][10],tmp_list[2][11],tmp_list[2][12],tmp_list[2][13],tmp_list[2][14],tmp_list[2][15]),
-                        (tmp_time,tmp_list[3][0],tmp_list[3][1],tmp_list[3][2],tmp_list[3][3],tmp_list[3][4],tmp_list[3][5],tmp_list[3][6],tmp_list[3][7],tmp_list[3][8],tmp_list[3][9],tmp_list[3][10],tmp_list[3][11],tmp_list[3][12],tmp_list[3][13],tmp_list[3][14],tmp_list[3][15]),
-                        (tmp_time,tmp_list[4][0],tmp_list[4][1],tmp_list[4][2],tmp_list[4][3],tmp_list[4][4],tmp_list[4][5],tmp_list[4][6],tmp_list[4][7],tmp_list[4][8],tmp_list[4][9],tmp_list[4][10],tmp_list[4][11],tmp_list[4][12],tmp_list[4][13],tmp_list[4][14],tmp_list[4][15]),
-                        (tmp_time,tmp_list[5][0],tmp_list[5][1],tmp_list[5][2],tmp_list[5][3],tmp_list[5][4],tmp_list[5][5],tmp_list[5][6],tmp_list[5][7],tmp_list[5][8],tmp_list[5][9],tmp_list[5][10],tmp_list[5][11],tmp_list[5][12],tmp_list[5][13],tmp_list[5][14],tmp_list[5][15]),
-                        (tmp_time,tmp_list[6][0],tmp_list[6][1],tmp_list[6][2],tmp_list[6][3],tmp_list[6][4],tmp_list[6][5],tmp_list[6][6],tmp_list[6][7],tmp_list[6][8],tmp_list[6][9],tmp_list[6][10],tmp_list[6][11],tmp_list[6][12],tmp_list[6][13],tmp_list[6][14],tmp_list[6][15]),
-                        (tmp_time,tmp_list[7][0],tmp_list[7][1],tmp_list[7][2],tmp_list[7][3],tmp_list[7][4],tmp_list[7][5],tmp_list[7][6],tmp_list[7][7],tmp_list[7][8],tmp_list[7][9],tmp_list[7][10],tmp_list[7][11],tmp_list[7][12],tmp_list[7][13],tmp_list[7][14],tmp_list[7][15])]
-
-        else:
+        if not 1 <= tmp_n_mppt <= 8:
             print("Unsuported number of MPPT devices. Only 1-8 devices are supported. The device number parsed is:" + str(tmp_n_mppt))
             return False
+        return self.write_rows({'conext_mppt': rows_device(MPPT_LIST)})
 
 
-        try:
-            # Executing the SQL command
-            cursor.executemany(tmp_sql, tmp_val)
-            #print(cursor.rowcount, "records inserted.")
-            # Commit your changes in the database
-            self._port.commit()
-            #print("successfully send data to database")
+
+# EMBEDDING MySQL_Spool CLASS ----------------------------------------------------
+
+class MySQL_Spool(object):
+    """This class implements an append-only spool on disk for rows that could not be written into
+    the database. The rows are stored as json lines in numbered segment files. After the database
+    is reachable again, the segments are replayed in order, oldest first, with upserts on the
+    primary key (ts, device_name). A segment is deleted once all of its rows are committed.
+    A segment that fails MAX_ATTEMPTS times while the database is connected, e.g. because of a
+    schema mismatch, is renamed to '<segment>.bad' and skipped, so it does not block the
+    segments after it."""
+
+    def __init__(self, PATH='../var/SQL_spool', SEGMENT_ROWS=10000, MAX_ATTEMPTS=5):
+        ''' Constructor for this class. '''
+        self.PATH = PATH
+        self.SEGMENT_ROWS = SEGMENT_ROWS
+        self.MAX_ATTEMPTS = MAX_ATTEMPTS
+        os.makedirs(PATH, exist_ok=True)
+        self._file = None
+        self._file_rows = 0
+        self._failures = {}  # segment -> failed replays while the database was connected
+        self._lock = threading.Lock()  # append is called by the writer thread and by put on a full buffer
+
+    def segments(self):
+        """Returns the list of segment files, oldest first."""
+        names = [name for name in os.listdir(self.PATH) if name.startswith('segment-') and name.endswith('.jsonl')]
+        return [os.path.join(self.PATH, name) for name in sorted(names)]
+
+    def is_empty(self):
+        """Returns True if no spooled rows are waiting."""
+        return self._file is None and not self.segments()
+
+    def append(self, TABLE_ROWS):
+        """This function appends rows to the current segment and syncs it to the disk.
+
+        Args:
+            TABLE_ROWS: dict {table name: list of rows}.
+
+        Returns: NONE
+
+        """
+        with self._lock:
+            for table, rows in TABLE_ROWS.items():
+                for row in rows:
+                    if self._file is None:
+                        segments = self.segments()
+                        number = int(os.path.basename(segments[-1])[8:-6]) + 1 if segments else 1
+                        self._file = open(os.path.join(self.PATH, 'segment-%08d.jsonl' % number), mode='a')
+                        self._file_rows = 0
+                    self._file.write(json.dumps([table, list(row)]) + '\n')
+                    self._file_rows += 1
+                    if self._file_rows >= self.SEGMENT_ROWS:
+                        self._close_segment()
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+
+    def _close_segment(self):
+        """Closes the current segment, the next append starts a new one."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._file = None
+
+    def replay(self, SQL, BATCH_ROWS=5000):
+        """This function writes the spooled rows into the database in batches of BATCH_ROWS rows.
+        It stops at the first failed batch, the remaining rows stay in the spool. A segment which
+        failed MAX_ATTEMPTS times is moved aside and the next segment is replayed.
+
+        Args:
+            SQL: open MySQL_com.
+            BATCH_ROWS: number of rows per transaction. Default=5000
+
+        Returns: Boolean value True if the spool is empty.
+
+        """
+        with self._lock:  # rows appended during the replay go into a new segment
+            if self._file is not None:
+                self._close_segment()
+            segments = self.segments()
+        for segment in segments:
+            rows = []
+            with open(segment) as segment_file:
+                for line in segment_file:
+                    try:
+                        rows.append(json.loads(line))
+                    except ValueError:
+                        pass  # incomplete last line after a power loss
+            for start in range(0, len(rows), BATCH_ROWS):
+                table_rows = {}
+                for table, row in rows[start:start + BATCH_ROWS]:
+                    table_rows.setdefault(table, []).append(status_codes(table, row))
+                if not SQL.write_rows(table_rows, UPSERT=True):
+                    break
+            else:
+                os.remove(segment)
+                self._failures.pop(segment, None)
+                print("Replayed spooled SQL rows:", len(rows))
+                continue
+            if not SQL.is_connected():  # the database is down again, not a problem of the segment
+                return False
+            self._failures[segment] = self._failures.get(segment, 0) + 1
+            if self._failures[segment] < self.MAX_ATTEMPTS:
+                return False
+            os.replace(segment, segment + '.bad')
+            self._failures.pop(segment)
+            print("Spooled SQL segment failed " + str(self.MAX_ATTEMPTS) + " times, moved to:", segment + '.bad')
+        return True
+
+
+# EMBEDDING MySQL_write_Thread CLASS ----------------------------------------------------
+
+class MySQL_write_Thread(threading.Thread):
+    """This class implements a write-behind buffer for MySQL_com. The control loop puts rows into a
+    bounded queue and returns immediately, the thread writes them in batches. A batch is written
+    every FLUSH_INTERVAL seconds or as soon as FLUSH_ROWS rows are waiting, all tables in one
+    transaction. Rows of a failed batch are moved into the SPOOL on disk and replayed once the
+    database is reachable again. Without a SPOOL they are retried with the next batch.
+    If the queue is full, write_* returns at once, so a slow database never delays the control
+    loop: the rows that do not fit are appended to the SPOOL, without a SPOOL the oldest rows
+    are dropped."""
+
+    def __init__(self, SQL, FLUSH_INTERVAL=30.0, FLUSH_ROWS=500, MAX_ROWS=20000, SPOOL=None, group=None, name=None):
+
+        threading.Thread.__init__(self, group=group, name=name)
+        self.daemon = True  # does not keep the program alive, join() writes the remaining rows
+
+        self._stopevent = threading.Event()  # used to stop the flush loop.
+        self._flushevent = threading.Event()  # used to start a flush before FLUSH_INTERVAL has passed.
+
+        self.SQL = SQL
+        self.FLUSH_INTERVAL = FLUSH_INTERVAL
+        self.FLUSH_ROWS = FLUSH_ROWS
+        self.MAX_ROWS = MAX_ROWS
+        self.SPOOL = SPOOL
+        self._queue = queue.Queue(maxsize=MAX_ROWS)  # (table, row) tuples
+        self._batch = []  # (table, row) tuples of a failed batch
+        self.dropped_rows = 0
+
+    def write_BMS(self, BMS_LIST):
+        """Queues the data of US2000B.read_BMS for the table pylontech_bms. Returns: Boolean value True"""
+        return self.put('pylontech_bms', rows_BMS(BMS_LIST))
+
+    def write_XW(self, XW_LIST):
+        """Queues the data of XW.read_Inverter_All for the table conext_xw. Returns: Boolean value True"""
+        return self.put('conext_xw', rows_device(XW_LIST))
+
+    def write_MPPT(self, MPPT_LIST):
+        """Queues the data of MPPT60.read_MPPT_All for the table conext_mppt. Returns: Boolean value True"""
+        return self.put('conext_mppt', rows_device(MPPT_LIST))
+
+    def write_snapshot(self, BMS_LIST=(), XW_LIST=(), MPPT_LIST=(), TIME=None):
+        """Queues the data of one control loop tick for all tables with the time stamp TIME (default the time of the acquisition). Returns: Boolean value True"""
+        for table, rows in rows_snapshot(BMS_LIST, XW_LIST, MPPT_LIST, None if TIME is None else sql_time(TIME)).items():
+            self.put(table, rows)
+        return True
+
+    def put(self, TABLE, ROWS):
+        """This function queues rows of a table. The rows keep the time stamp of the acquisition.
+        Rows that do not fit into the full queue are appended to the SPOOL, without a SPOOL
+        the oldest queued rows are dropped.
+
+        Args:
+            TABLE: table name, see TABLE_COLUMNS.
+            ROWS: list of rows in the column order of the table.
+
+        Returns: Boolean value True, False if rows were dropped
+
+        """
+        overflow = []
+        for row in ROWS:
+            try:
+                self._queue.put_nowait((TABLE, row))
+            except queue.Full:
+                overflow.append(row)
+        if self._queue.qsize() >= self.FLUSH_ROWS:
+            self._flushevent.set()
+        if not overflow:
             return True
-        except:
-            # Rolling back in case of error
-            self._port.rollback()
-            print("Failed to send data to database")
-            return False
+        if self.SPOOL is not None:
+            try:
+                self.SPOOL.append({TABLE: overflow})
+                return True
+            except OSError as error:
+                print("Failed to spool SQL rows:", error)
+                self.dropped_rows += len(overflow)
+                print("SQL buffer full, dropped rows:", self.dropped_rows)
+                return False
+        for row in overflow:
+            try:
+                self._queue.get_nowait()  # drops the oldest row
+                self.dropped_rows += 1
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait((TABLE, row))
+            except queue.Full:
+                self.dropped_rows += 1
+        print("SQL buffer full, dropped rows:", self.dropped_rows)
+        return False
+
+    def flush(self):
+        """This function writes all queued rows and the rows of a failed batch in one transaction.
 
+        Returns: Boolean value True or False
+
+        """
+        while len(self._batch) < self.MAX_ROWS:
+            try:
+                self._batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if not self._batch:
+            return True
+        table_rows = {}
+        for table, row in self._batch:
+            table_rows.setdefault(table, []).append(row)
+        if self.SQL.write_rows(table_rows):
+            self._batch = []  # cleared first, a failed replay must not write the batch again
+            if self.SPOOL is not None and not self.SPOOL.is_empty():
+                self.SPOOL.replay(self.SQL)  # The database is reachable again
+            return True
+        if self.SPOOL is not None:
+            self.SPOOL.append(table_rows)  # if this raises, the batch is kept in _batch
+            self._batch = []
+        return False
+
+    def _flush_safe(self):
+        """Runs flush and logs any error, the rows of the batch stay in _batch and are retried with the next flush."""
+        try:
+            return self.flush()
+        except Exception as error:
+            print("SQL writer failed to flush, rows kept for the next flush:", len(self._batch), error)
+            return False
 
+    def run(self):
+        """Main flush loop"""
+        while not self._stopevent.is_set():
+            self._flushevent.wait(self.FLUSH_INTERVAL)
+            self._flushevent.clear()
+            self._flush_safe()
+        self._flush_safe()
+
+    def join(self, timeout=None):
+        """Stop the thread, the remaining rows are written before the thread ends"""
+        self._stopevent.set()
+        self._flushevent.set()
+        threading.Thread.join(self, timeout)
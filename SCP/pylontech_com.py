@@ -26,17 +26,251 @@ communicate with the Pylontech US2000B Plus BMS.
 import serial,time,re,datetime,csv,os
 import numpy as np
 import socket,threading
+from snapshot import Snapshot, record_time
+
+
+PROMPT = b'pylon>' # console prompt, which terminates every response
+
+
+# CONSOLE TABLE PARSER ----------------------------------------------------
+
+def _to_int(text):
+    """Converts a table field like '49614', '-1240', or '91%  45000 mAH' into int, '-' becomes None."""
+    fields = text.split()
+    if not fields or fields[0] == '-':
+        return None
+    return int(fields[0].rstrip('%'))
+
+PWR_COLUMN_TYPES = {'Power': _to_int, 'Volt': _to_int, 'Curr': _to_int, 'Tempr': _to_int, 'Tlow': _to_int,
+                    'Thigh': _to_int, 'Vlow': _to_int, 'Vhigh': _to_int, 'Coulomb': _to_int} # all other columns are str
+BAT_COLUMN_TYPES = {'Battery': _to_int, 'Volt': _to_int, 'Curr': _to_int, 'Tempr': _to_int, 'Coulomb': _to_int}
+_PWR_COLUMN = re.compile(r'\S+') # 'pwr' column names contain no spaces, e.g. 'Base.St'
+_BAT_COLUMN = re.compile(r'\S+(?: \S+)*') # 'bat' column names contain single spaces, e.g. 'Base State'
+_table_layouts = {} # header line -> list of (column name, start, stop, type)
+
+
+def _table_layout(HEADER, COLUMN, COLUMN_TYPES):
+    """Returns the column layout of a console table header. The layout of each header is computed once."""
+    layout = _table_layouts.get(HEADER)
+    if layout is None:
+        columns = [(match.group(), match.start()) for match in COLUMN.finditer(HEADER)]
+        stops = [start for name, start in columns[1:]] + [None]
+        layout = [(name, start, stop, COLUMN_TYPES.get(name, str))
+                  for (name, start), stop in zip(columns, stops)]
+        _table_layouts[HEADER] = layout
+    return layout
+
+
+def parse_table(REC_CONTENT, FIRST_COLUMN, COLUMN, COLUMN_TYPES):
+    """This function parses a table of the console. The columns are located by their name in the
+    header line, so the parser does not depend on the number of rows or on the order of the
+    columns. Values are sliced at the column positions of the header, which keeps values
+    containing spaces (Time) and signs (Curr) intact.
+
+    Args:
+        REC_CONTENT: console response.
+        FIRST_COLUMN: name of the first column, which identifies the header line and numbers the rows.
+        COLUMN: compiled regular expression matching one column name of the header.
+        COLUMN_TYPES: dict {column name: conversion function}, other columns are str.
+
+    Returns: dict {row number: dict {column name: value}} dtype=int, dtype=str, and None for '-'.
+
+    """
+    rows = {}
+    layout = None
+    for line in REC_CONTENT.splitlines():
+        line = line.rstrip()
+        if line.startswith(FIRST_COLUMN):
+            layout = _table_layout(line, COLUMN, COLUMN_TYPES)
+        elif layout is not None and line[:1].isdigit():
+            row = {name: type(line[start:stop].strip()) for name, start, stop, type in layout}
+            rows[row[FIRST_COLUMN]] = row
+    if layout is None:
+        raise ValueError('No ' + FIRST_COLUMN + ' table header found in console response')
+    return rows
+
+
+def parse_pwr(REC_CONTENT):
+    """This function parses the table of the console command 'pwr'.
+
+    Args:
+        REC_CONTENT: console response of the command 'pwr'.
+
+    Returns: dict {module number: dict {column name: value}}, see parse_table.
+
+    """
+    return parse_table(REC_CONTENT, 'Power', _PWR_COLUMN, PWR_COLUMN_TYPES)
+
+
+def parse_bat(REC_CONTENT):
+    """This function parses the table of the console command 'bat N'.
+
+    Args:
+        REC_CONTENT: console response of the command 'bat N'.
+
+    Returns: dict {cell number: dict {column name: value}}, see parse_table.
+
+    """
+    return parse_table(REC_CONTENT, 'Battery', _BAT_COLUMN, BAT_COLUMN_TYPES)
+
+
+MODULE_LETTERS = 'ABCDEFGH' # names of the modules 1-8 in the UDP messages
+
+
+def soc_message(MODULES, N_MODULES=1):
+    """This function builds the UDP message of the SoC values, e.g. 'SoC\tN=2\tA=91\tB=90'.
+
+    Args:
+        MODULES: parsed 'pwr' table, see parse_pwr.
+        N_MODULES: number of modules to be sent (1-8). Default=1
+
+    Returns: str {message} or None if N_MODULES is not supported
+
+    """
+    if not 1 <= N_MODULES <= 8:
+        return None
+    return 'SoC' + '\t' + 'N=' + str(N_MODULES) + \
+           ''.join('\t' + MODULE_LETTERS[x] + '=' + str(MODULES[x + 1]['Coulomb']) for x in range(N_MODULES))
+
+
+def bms_message(MODULES, N_MODULES=1):
+    """This function builds the UDP message of the SoC, Voltage [mV], Current [mA], and Temperature [mC]
+    values, e.g. 'BMS\tN=1\tA=91\t49614\t-1240\t21000'.
+
+    Args:
+        MODULES: parsed 'pwr' table, see parse_pwr.
+        N_MODULES: number of modules to be sent (1-8). Default=1
+
+    Returns: str {message} or None if N_MODULES is not supported
+
+    """
+    if not 1 <= N_MODULES <= 8:
+        return None
+    message = 'BMS' + '\t' + 'N=' + str(N_MODULES)
+    for x in range(N_MODULES):
+        row = MODULES[x + 1]
+        message += '\t' + MODULE_LETTERS[x] + '=' + str(row['Coulomb']) + '\t' + str(row['Volt']) + \
+                   '\t' + str(row['Curr']) + '\t' + str(row['Tempr'])
+    return message
+
+
+# CSV LOG SINK ----------------------------------------------------
+
+LOG_FIELDS = ('SoC', 'Voltage', 'Current', 'Temperature', 'B_Status', 'V_Status', 'C_Status', 'T_Status')
+LOG_HEADER = ['Time'] + [field + '_' + str(module) for module in range(1, 9) for field in LOG_FIELDS]
+CELL_FIELDS = ('Voltage', 'Temperature', 'Balancing')
+CELL_HEADER = ['Time', 'Module'] + [field + '_' + str(cell) for field in CELL_FIELDS for cell in range(1, 16)]
+
+
+class CSV_Sink(object):
+    """This class implements a '.csv' log file per day, PATH/YYYY-MM-DD.csv, which is kept open.
+    The file is switched at midnight and the rows are written through a preallocated row, so a
+    row costs one buffered write. The file is flushed and synced to the disk every
+    FSYNC_INTERVAL seconds, with FSYNC_INTERVAL=0 after every row."""
+
+    def __init__(self, PATH='../var/BMS_log', HEADER=LOG_HEADER, FSYNC_INTERVAL=60.0):
+        ''' Constructor for this class. '''
+        self.PATH = PATH
+        self.HEADER = HEADER
+        self.FSYNC_INTERVAL = FSYNC_INTERVAL
+        self._file = None
+        self._writer = None
+        self._day = None
+        self._synced = 0.0
+        self._blank = [''] * len(HEADER)
+        self._row = list(self._blank)
+
+    def __del__(self):
+        ''' Destructor for this class. '''
+        self.close()
+
+    def _rotate(self, DAY):
+        """Closes the current file and opens the file of DAY, a new file starts with the header."""
+        self.close()
+        self._file = open(str(self.PATH) + '/' + str(DAY) + '.csv', mode='a')
+        self._writer = csv.writer(self._file)
+        if self._file.tell() == 0:
+            self._writer.writerow(self.HEADER)
+        self._day = DAY
+
+    def write(self, VALUES, NOW=None):
+        """This function writes one row with the current time in the first column.
+
+        Args:
+            VALUES: values of the columns after 'Time', missing columns at the end stay empty.
+            NOW: datetime of the row. Default=now
+
+        Returns: Boolean value True
+
+        """
+        if NOW is None:
+            NOW = datetime.datetime.now()
+        if NOW.date() != self._day:
+            self._rotate(NOW.date())
+        row = self._row
+        n_values = len(VALUES)
+        row[0] = '%02d:%02d:%02d' % (NOW.hour, NOW.minute, NOW.second)
+        row[1:1 + n_values] = VALUES
+        row[1 + n_values:] = self._blank[1 + n_values:]
+        self._writer.writerow(row)
+        if time.monotonic() - self._synced >= self.FSYNC_INTERVAL:
+            self.sync()
+        return True
+
+    def sync(self):
+        """Flushes the file and syncs it to the disk."""
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._synced = time.monotonic()
+
+    def close(self):
+        """Syncs and closes the current file."""
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+            self._day = None
+
+
+# EMBEDDING BMS_Snapshot CLASS ----------------------------------------------------
+
+class BMS_Snapshot(Snapshot):
+    """This class holds the values of one battery module returned by US2000B.read_BMS"""
+
+    FIELDS = ('soc', 'voltage', 'current', 'temperature', 'b_status', 'v_status', 'c_status', 't_status')
+    __slots__ = FIELDS
 
 
 # EMBEDDING US2000B CLASS ----------------------------------------------------
 
 class US2000B(object):
     """This class implements the serial connection functions """
-    def __init__(self):
-        ''' Constructor for this class. '''
+    def __init__(self, CACHE_TTL=0.0, LOG_FSYNC_INTERVAL=60.0):
+        ''' Constructor for this class.
+
+        Args:
+            CACHE_TTL: time in seconds for which a 'pwr' reading is shared by read_SoC and read_BMS. Default=0.0 (no cache)
+            LOG_FSYNC_INTERVAL: time in seconds between two syncs of the '.csv' log to the disk. Default=60.0
+        '''
         self._port = 0
+        self._log_fsync_interval = LOG_FSYNC_INTERVAL
+        self._log_sinks = {}  # PATH -> CSV_Sink
+        self._cache_ttl = CACHE_TTL
+        self._pwr_cache = None
+        self._pwr_time = 0.0
+        self._pwr_acquired = 0.0  # unix time of the cached 'pwr' reading
+        self._pwr_lock = threading.Lock()
+        self._query_lock = threading.Lock()
+        self._cell_module = 0
+        self._cell_voltage = None
+        self._cell_temperature = None
+        self._cell_balancing = None
+        self._cell_time = None
     def __del__(self):
         ''' Destructor for this class. '''
+        for sink in self._log_sinks.values():
+            sink.close()
         if self._port !=0:
             self.close()
 
@@ -90,6 +324,81 @@ class US2000B(object):
         temp_receive = repr(self._port.read(1000))
         return temp_receive== str("b'\\n\\rpylon>\\n\\rpylon>'")
 
+    def query(self, COMMAND, TIMEOUT=3.0):
+        """This function sends a command to the console and reads the response until the console
+        prompt 'pylon>' appears. It returns as soon as the console has finished, independent of
+        the length of the response, e.g. the number of modules.
+
+        Args:
+            COMMAND: console command, e.g. 'pwr'.
+            TIMEOUT: maximum time in seconds to wait for the prompt. Default=3.0
+
+        Returns: string {console response}
+
+        """
+        with self._query_lock:  # one command at a time on the console
+            deadline = time.monotonic() + TIMEOUT
+            self._port.reset_input_buffer()  # discards old prompts and partial responses
+            self._port.write(str.encode(COMMAND + '\r'))
+            rec_bytes = bytearray()
+            while not rec_bytes.rstrip().endswith(PROMPT):
+                if time.monotonic() > deadline:
+                    raise IOError('No console prompt received within ' + str(TIMEOUT) + ' s for command: ' + COMMAND)
+                rec_bytes += self._port.read(self._port.in_waiting or 1)
+        return str(bytes(rec_bytes), 'utf-8')
+
+    def read_pwr(self):
+        """This function returns the parsed 'pwr' table of the BMS. A reading that is younger than
+        CACHE_TTL is returned from the cache, so all consumers of one control loop tick share the
+        same reading and the command is only sent once per tick.
+
+        Returns: dict {module number: dict {column name: value}}, see parse_pwr.
+
+        """
+        with self._pwr_lock:
+            if self._pwr_cache is None or time.monotonic() - self._pwr_time >= self._cache_ttl:
+                self._pwr_cache = parse_pwr(self.query('pwr'))
+                self._pwr_time = time.monotonic()
+                self._pwr_acquired = time.time()
+            return self._pwr_cache
+
+    def read_cells(self, N_MODULES=1, N_CELLS=15):
+        """This function reads the cell voltages, temperatures, and balancing states of one module
+        with the console command 'bat N'. Every call reads the next module (round robin), so one
+        call per control loop tick refreshes all modules every N_MODULES ticks without blocking
+        the serial link. The values of all modules are kept in arrays [n_modules x n_cells].
+
+        Args:
+            N_MODULES: number of installed modules. Default=1
+            N_CELLS: number of cells per module. Default=15
+
+        Returns: (Module, Cell_Voltage, Cell_Temperature, Cell_Balancing, Cell_Time):
+            Module: number of the module read by this call.
+            Cell_Voltage: numpy array [n_modules x n_cells] in Volt dtype=float, NaN if not read yet.
+            Cell_Temperature: numpy array [n_modules x n_cells] in degree Celsius dtype=float, NaN if not read yet.
+            Cell_Balancing: numpy array [n_modules x n_cells] dtype=bool, True if the cell is balancing.
+            Cell_Time: numpy array [n_modules] unix time of the last read of each module dtype=float, 0 if not read yet.
+
+        """
+        if self._cell_voltage is None or self._cell_voltage.shape != (N_MODULES, N_CELLS):
+            self._cell_module = 0
+            self._cell_voltage = np.full((N_MODULES, N_CELLS), np.nan)
+            self._cell_temperature = np.full((N_MODULES, N_CELLS), np.nan)
+            self._cell_balancing = np.zeros((N_MODULES, N_CELLS), dtype=bool)
+            self._cell_time = np.zeros(N_MODULES)
+        module = self._cell_module % N_MODULES + 1
+        self._cell_module = module
+        cells = parse_bat(self.query('bat ' + str(module)))
+        rows = [cells[cell] for cell in sorted(cells) if cell < N_CELLS]
+        index = [row['Battery'] for row in rows]
+        balancing = [name for name in (rows[0] if rows else ()) if name.upper().startswith('BAL')]  # only reported by newer firmware
+        self._cell_voltage[module - 1, index] = np.array([row['Volt'] for row in rows], dtype=float) / 1000.0
+        self._cell_temperature[module - 1, index] = np.array([row['Tempr'] for row in rows], dtype=float) / 1000.0
+        if balancing:
+            self._cell_balancing[module - 1, index] = [row[balancing[0]].upper() in ('Y', 'YES', 'ON') for row in rows]
+        self._cell_time[module - 1] = time.time()
+        return module, self._cell_voltage, self._cell_temperature, self._cell_balancing, self._cell_time
+
 
 
     def read_SoC(self, N_MODULES=1):
@@ -103,14 +412,11 @@ class US2000B(object):
         """
         try:
             SoC_list = [[0 for i in range(1)] for j in range(N_MODULES)]
-            self._port.write(str.encode('pwr\r'))
-            time.sleep(0.5)
-            rec_content = str(self._port.read(2200), 'utf-8')
-            rec_int = re.findall(r'\d+',rec_content)
+            modules = self.read_pwr()
             #Writes values into SOC_array and returns it.
             if 1 <= N_MODULES <= 8:
                 for x in range(N_MODULES):
-                    SoC_list[x][0] = float(rec_int[(8+(x*15))])#SOC
+                    SoC_list[x][0] = float(modules[x + 1]['Coulomb'])#SOC
                 return SoC_list
             else:
                 print("ERROR: Number of modules must be 1-8. Number parsed:"+ str(N_MODULES))
@@ -125,34 +431,33 @@ class US2000B(object):
         Args:
             N_MODULES: number of modules to be read. Default=1
 
-        Returns: BMS_list: list of length [n_modules] containing:
-            [SoC, Voltage, Current, Temperature, Battery Status, Voltage Status, Current Status, Temperature Status]
-            dtype=float and dtype=str.
+        Returns: BMS_list: list of length [n_modules] of BMS_Snapshot with the values:
+            soc, voltage, current, temperature, b_status, v_status, c_status, t_status
+            dtype=float and dtype=str, and the unix time of the 'pwr' reading (time), which all modules share.
 
 
         """
         try:
-            BMS_list = [[0 for i in range(8)] for j in range(N_MODULES)]
-            self._port.write(str.encode('pwr\r'))
-            time.sleep(0.5)
-            rec_content = str(self._port.read(2200), 'utf-8')
-            rec_str = re.findall(r'\w+', rec_content)
+            modules = self.read_pwr()
+            acquired = self._pwr_acquired
             #Writes values into BMS_list and returns it.
-            #Note that 21 is the offset between each value index for the individual batteries.
             if 1 <= N_MODULES <= 8:
+                BMS_list = []
                 for x in range(N_MODULES):
-                    BMS_list[x][0] = float(rec_str[(37+(x*21))])#SOC
-                    BMS_list[x][1] = float(rec_str[(26+(x*21))])/1000.0 #Voltage
-                    BMS_list[x][2] = float(rec_str[(27+(x*21))])/1000.0 #Current
-                    BMS_list[x][3] = float(rec_str[(28+(x*21))])/1000.0 #Temperature
-                    BMS_list[x][4] = str(rec_str[(33+(x*21))])#Battery Status
-                    BMS_list[x][5] = str(rec_str[(34+(x*21))])#Voltage Status
-                    BMS_list[x][6] = str(rec_str[(35+(x*21))])#Current Status
-                    BMS_list[x][7] = str(rec_str[(36+(x*21))])#Temperature Status
+                    row = modules[x + 1]
+                    BMS_list.append(BMS_Snapshot((float(row['Coulomb']),  #SOC
+                                                  row['Volt']/1000.0,  #Voltage
+                                                  row['Curr']/1000.0,  #Current
+                                                  row['Tempr']/1000.0,  #Temperature
+                                                  row['Base.St'],  #Battery Status
+                                                  row['Volt.St'],  #Voltage Status
+                                                  row['Curr.St'],  #Current Status
+                                                  row['Temp.St']),  #Temperature Status
+                                                 TIME=acquired))
                 return BMS_list
             else:
                 print("ERROR: Number of modules must be 1-8. Number parsed:"+ str(N_MODULES))
-                return BMS_list
+                return [BMS_Snapshot([0] * 8, TIME=acquired) for j in range(N_MODULES)]
         except:
             print("ERROR: no communication possible, check if the connection has been opened with open()")
 
@@ -167,145 +472,55 @@ class US2000B(object):
         Returns: Boolean value True or False
 
         """
-        filename = str(PATH) + '/' + str(datetime.date.today()) + '.csv'
-        tmp_check_file = os.path.isfile(filename)
-        csvfile = open(filename, mode='a')
-        name = ['Time','SoC_1', 'Voltage_1', 'Current_1','Temperature_1', 'B_Status_1', 'V_Status_1', 'C_Status_1', 'T_Status_1',
-                'SoC_2', 'Voltage_2', 'Current_2', 'Temperature_2', 'B_Status_2', 'V_Status_2', 'C_Status_2', 'T_Status_2',
-                'SoC_3', 'Voltage_3', 'Current_3', 'Temperature_3', 'B_Status_3', 'V_Status_3', 'C_Status_3', 'T_Status_3',
-                'SoC_4', 'Voltage_4', 'Current_4', 'Temperature_4', 'B_Status_4', 'V_Status_4', 'C_Status_4', 'T_Status_4',
-                'SoC_5', 'Voltage_5', 'Current_5', 'Temperature_5', 'B_Status_5', 'V_Status_5', 'C_Status_5', 'T_Status_5',
-                'SoC_6', 'Voltage_6', 'Current_6', 'Temperature_6', 'B_Status_6', 'V_Status_6', 'C_Status_6', 'T_Status_6',
-                'SoC_7', 'Voltage_7', 'Current_7', 'Temperature_7', 'B_Status_7', 'V_Status_7', 'C_Status_7', 'T_Status_7',
-                'SoC_8', 'Voltage_8', 'Current_8', 'Temperature_8', 'B_Status_8', 'V_Status_8', 'C_Status_8', 'T_Status_8'
-                ]
-        data_writer = csv.DictWriter(csvfile, fieldnames=name)
-        if not tmp_check_file:
-            data_writer.writeheader()
-
-        tmp_time = "{:02d}:{:02d}:{:02d}".format(datetime.datetime.now().hour,datetime.datetime.now().minute,datetime.datetime.now().second)
         tmp_n_modules = len(SOC_LIST)
-        tmp_SoC = SOC_LIST
-
-        if tmp_n_modules == 1:
-            data_writer.writerow({'Time':tmp_time,'SoC_1':tmp_SoC[0][0]})
-        elif tmp_n_modules == 2:
-            data_writer.writerow({'Time':tmp_time,'SoC_1':tmp_SoC[0][0],'SoC_2':tmp_SoC[1][0]})
-        elif tmp_n_modules == 3:
-            data_writer.writerow({'Time':tmp_time,'SoC_1':tmp_SoC[0][0],'SoC_2':tmp_SoC[1][0],'SoC_3':tmp_SoC[2][0]})
-        elif tmp_n_modules == 4:
-            data_writer.writerow({'Time':tmp_time,'SoC_1':tmp_SoC[0][0],'SoC_2':tmp_SoC[1][0],'SoC_3':tmp_SoC[2][0],'SoC_4':tmp_SoC[3][0]})
-        elif tmp_n_modules == 5:
-            data_writer.writerow({'Time':tmp_time,'SoC_1':tmp_SoC[0][0],'SoC_2':tmp_SoC[1][0],'SoC_3':tmp_SoC[2][0],'SoC_4':tmp_SoC[3][0],'SoC_5':tmp_SoC[4][0]})
-        elif tmp_n_modules == 6:
-            data_writer.writerow({'Time':tmp_time,'SoC_1':tmp_SoC[0][0],'SoC_2':tmp_SoC[1][0],'SoC_3':tmp_SoC[2][0],'SoC_4':tmp_SoC[3][0],'SoC_5':tmp_SoC[4][0],'SoC_6':tmp_SoC[5][0]})
-        elif tmp_n_modules == 7:
-            data_writer.writerow({'Time':tmp_time,'SoC_1':tmp_SoC[0][0],'SoC_2':tmp_SoC[1][0],'SoC_3':tmp_SoC[2][0],'SoC_4':tmp_SoC[3][0],'SoC_5':tmp_SoC[4][0],'SoC_6':tmp_SoC[5][0],'SoC_7':tmp_SoC[6][0]})
-        elif tmp_n_modules == 8:
-            data_writer.writerow({'Time':tmp_time,'SoC_1':tmp_SoC[0][0],'SoC_2':tmp_SoC[1][0],'SoC_3':tmp_SoC[2][0],'SoC_4':tmp_SoC[3][0],'SoC_5':tmp_SoC[4][0],'SoC_6':tmp_SoC[5][0],'SoC_7':tmp_SoC[6][0],'SoC_8':tmp_SoC[7][0]})
-        else:
+        if not 1 <= tmp_n_modules <= 8:
             print("Unsuported number of battery modules. Only 1-8 modules are supported. The module number parsed is:" + str(tmp_n_modules))
-            csvfile.flush()
-            csvfile.close()
             return False
-
-        csvfile.flush()
-        csvfile.close()
-        return True
+        values = []
+        for module in SOC_LIST:
+            values += [module[0], '', '', '', '', '', '', '']
+        return self.log_sink(PATH).write(values)
 
     def log_BMS(self, BMS_LIST, PATH='../var/BMS_log'):
         """This function writes the BMS information into a '.csv' file.
         
         Args:
             PATH: path to the directory where the .csv file will be saved.
-            SOC_LIST: list of length [n_modules] containing:
-            [SoC, Voltage, Current, Temperature, Battery Status, Voltage Status, Current Status, Temperature Status]
-            dtype=float and dtype=str.
+            BMS_LIST: list of length [n_modules] of BMS_Snapshot returned by read_BMS.
 
         Returns: Boolean value True or False
 
         """
-        filename = str(PATH) + '/' + str(datetime.date.today()) + '.csv'
-        tmp_check_file = os.path.isfile(filename)
-        csvfile = open(filename, mode='a')
-        name = ['Time','SoC_1', 'Voltage_1', 'Current_1','Temperature_1', 'B_Status_1', 'V_Status_1', 'C_Status_1', 'T_Status_1',
-                'SoC_2', 'Voltage_2', 'Current_2', 'Temperature_2', 'B_Status_2', 'V_Status_2', 'C_Status_2', 'T_Status_2',
-                'SoC_3', 'Voltage_3', 'Current_3', 'Temperature_3', 'B_Status_3', 'V_Status_3', 'C_Status_3', 'T_Status_3',
-                'SoC_4', 'Voltage_4', 'Current_4', 'Temperature_4', 'B_Status_4', 'V_Status_4', 'C_Status_4', 'T_Status_4',
-                'SoC_5', 'Voltage_5', 'Current_5', 'Temperature_5', 'B_Status_5', 'V_Status_5', 'C_Status_5', 'T_Status_5',
-                'SoC_6', 'Voltage_6', 'Current_6', 'Temperature_6', 'B_Status_6', 'V_Status_6', 'C_Status_6', 'T_Status_6',
-                'SoC_7', 'Voltage_7', 'Current_7', 'Temperature_7', 'B_Status_7', 'V_Status_7', 'C_Status_7', 'T_Status_7',
-                'SoC_8', 'Voltage_8', 'Current_8', 'Temperature_8', 'B_Status_8', 'V_Status_8', 'C_Status_8', 'T_Status_8'
-                ]
-        data_writer = csv.DictWriter(csvfile, fieldnames=name)
-        if not tmp_check_file:
-            data_writer.writeheader()
-
-        tmp_time = "{:02d}:{:02d}:{:02d}".format(datetime.datetime.now().hour,datetime.datetime.now().minute,datetime.datetime.now().second)
         tmp_n_modules = len(BMS_LIST)
-        tmp_BMS = BMS_LIST
-
-        if tmp_n_modules == 1:
-            data_writer.writerow({'Time':tmp_time,
-                                  'SoC_1':tmp_BMS[0][0],'Voltage_1':tmp_BMS[0][1],'Current_1':tmp_BMS[0][2],'Temperature_1':tmp_BMS[0][3],'B_Status_1':tmp_BMS[0][4],'V_Status_1':tmp_BMS[0][5],'C_Status_1':tmp_BMS[0][6],'T_Status_1':tmp_BMS[0][7]})
-        elif tmp_n_modules == 2:
-            data_writer.writerow({'Time':tmp_time,
-                                  'SoC_1':tmp_BMS[0][0],'Voltage_1':tmp_BMS[0][1],'Current_1':tmp_BMS[0][2],'Temperature_1':tmp_BMS[0][3],'B_Status_1':tmp_BMS[0][4],'V_Status_1':tmp_BMS[0][5],'C_Status_1':tmp_BMS[0][6],'T_Status_1':tmp_BMS[0][7],
-                                  'SoC_2':tmp_BMS[1][0],'Voltage_2':tmp_BMS[1][1],'Current_2':tmp_BMS[1][2],'Temperature_2':tmp_BMS[1][3],'B_Status_2':tmp_BMS[1][4],'V_Status_2':tmp_BMS[1][5],'C_Status_2':tmp_BMS[1][6],'T_Status_2':tmp_BMS[1][7]})
-        elif tmp_n_modules == 3:
-            data_writer.writerow({'Time':tmp_time,
-                                  'SoC_1':tmp_BMS[0][0],'Voltage_1':tmp_BMS[0][1],'Current_1':tmp_BMS[0][2],'Temperature_1':tmp_BMS[0][3],'B_Status_1':tmp_BMS[0][4],'V_Status_1':tmp_BMS[0][5],'C_Status_1':tmp_BMS[0][6],'T_Status_1':tmp_BMS[0][7],
-                                  'SoC_2':tmp_BMS[1][0],'Voltage_2':tmp_BMS[1][1],'Current_2':tmp_BMS[1][2],'Temperature_2':tmp_BMS[1][3],'B_Status_2':tmp_BMS[1][4],'V_Status_2':tmp_BMS[1][5],'C_Status_2':tmp_BMS[1][6],'T_Status_2':tmp_BMS[1][7],
-                                  'SoC_3':tmp_BMS[2][0],'Voltage_3':tmp_BMS[2][1],'Current_3':tmp_BMS[2][2],'Temperature_3':tmp_BMS[2][3],'B_Status_3':tmp_BMS[2][4],'V_Status_3':tmp_BMS[2][5],'C_Status_3':tmp_BMS[2][6],'T_Status_3':tmp_BMS[2][7]})
-        elif tmp_n_modules == 4:
-            data_writer.writerow({'Time':tmp_time,
-                                  'SoC_1':tmp_BMS[0][0],'Voltage_1':tmp_BMS[0][1],'Current_1':tmp_BMS[0][2],'Temperature_1':tmp_BMS[0][3],'B_Status_1':tmp_BMS[0][4],'V_Status_1':tmp_BMS[0][5],'C_Status_1':tmp_BMS[0][6],'T_Status_1':tmp_BMS[0][7],
-                                  'SoC_2':tmp_BMS[1][0],'Voltage_2':tmp_BMS[1][1],'Current_2':tmp_BMS[1][2],'Temperature_2':tmp_BMS[1][3],'B_Status_2':tmp_BMS[1][4],'V_Status_2':tmp_BMS[1][5],'C_Status_2':tmp_BMS[1][6],'T_Status_2':tmp_BMS[1][7],
-                                  'SoC_3':tmp_BMS[2][0],'Voltage_3':tmp_BMS[2][1],'Current_3':tmp_BMS[2][2],'Temperature_3':tmp_BMS[2][3],'B_Status_3':tmp_BMS[2][4],'V_Status_3':tmp_BMS[2][5],'C_Status_3':tmp_BMS[2][6],'T_Status_3':tmp_BMS[2][7],
-                                  'SoC_4':tmp_BMS[3][0],'Voltage_4':tmp_BMS[3][1],'Current_4':tmp_BMS[3][2],'Temperature_4':tmp_BMS[3][3],'B_Status_4':tmp_BMS[3][4],'V_Status_4':tmp_BMS[3][5],'C_Status_4':tmp_BMS[3][6],'T_Status_4':tmp_BMS[3][7]})
-        elif tmp_n_modules == 5:
-            data_writer.writerow({'Time':tmp_time,
-                                  'SoC_1':tmp_BMS[0][0],'Voltage_1':tmp_BMS[0][1],'Current_1':tmp_BMS[0][2],'Temperature_1':tmp_BMS[0][3],'B_Status_1':tmp_BMS[0][4],'V_Status_1':tmp_BMS[0][5],'C_Status_1':tmp_BMS[0][6],'T_Status_1':tmp_BMS[0][7],
-                                  'SoC_2':tmp_BMS[1][0],'Voltage_2':tmp_BMS[1][1],'Current_2':tmp_BMS[1][2],'Temperature_2':tmp_BMS[1][3],'B_Status_2':tmp_BMS[1][4],'V_Status_2':tmp_BMS[1][5],'C_Status_2':tmp_BMS[1][6],'T_Status_2':tmp_BMS[1][7],
-                                  'SoC_3':tmp_BMS[2][0],'Voltage_3':tmp_BMS[2][1],'Current_3':tmp_BMS[2][2],'Temperature_3':tmp_BMS[2][3],'B_Status_3':tmp_BMS[2][4],'V_Status_3':tmp_BMS[2][5],'C_Status_3':tmp_BMS[2][6],'T_Status_3':tmp_BMS[2][7],
-                                  'SoC_4':tmp_BMS[3][0],'Voltage_4':tmp_BMS[3][1],'Current_4':tmp_BMS[3][2],'Temperature_4':tmp_BMS[3][3],'B_Status_4':tmp_BMS[3][4],'V_Status_4':tmp_BMS[3][5],'C_Status_4':tmp_BMS[3][6],'T_Status_4':tmp_BMS[3][7],
-                                  'SoC_5':tmp_BMS[4][0],'Voltage_5':tmp_BMS[4][1],'Current_5':tmp_BMS[4][2],'Temperature_5':tmp_BMS[4][3],'B_Status_5':tmp_BMS[4][4],'V_Status_5':tmp_BMS[4][5],'C_Status_5':tmp_BMS[4][6],'T_Status_5':tmp_BMS[4][7]})
-        elif tmp_n_modules == 6:
-            data_writer.writerow({'Time':tmp_time,
-                                  'SoC_1':tmp_BMS[0][0],'Voltage_1':tmp_BMS[0][1],'Current_1':tmp_BMS[0][2],'Temperature_1':tmp_BMS[0][3],'B_Status_1':tmp_BMS[0][4],'V_Status_1':tmp_BMS[0][5],'C_Status_1':tmp_BMS[0][6],'T_Status_1':tmp_BMS[0][7],
-                                  'SoC_2':tmp_BMS[1][0],'Voltage_2':tmp_BMS[1][1],'Current_2':tmp_BMS[1][2],'Temperature_2':tmp_BMS[1][3],'B_Status_2':tmp_BMS[1][4],'V_Status_2':tmp_BMS[1][5],'C_Status_2':tmp_BMS[1][6],'T_Status_2':tmp_BMS[1][7],
-                                  'SoC_3':tmp_BMS[2][0],'Voltage_3':tmp_BMS[2][1],'Current_3':tmp_BMS[2][2],'Temperature_3':tmp_BMS[2][3],'B_Status_3':tmp_BMS[2][4],'V_Status_3':tmp_BMS[2][5],'C_Status_3':tmp_BMS[2][6],'T_Status_3':tmp_BMS[2][7],
-                                  'SoC_4':tmp_BMS[3][0],'Voltage_4':tmp_BMS[3][1],'Current_4':tmp_BMS[3][2],'Temperature_4':tmp_BMS[3][3],'B_Status_4':tmp_BMS[3][4],'V_Status_4':tmp_BMS[3][5],'C_Status_4':tmp_BMS[3][6],'T_Status_4':tmp_BMS[3][7],
-                                  'SoC_5':tmp_BMS[4][0],'Voltage_5':tmp_BMS[4][1],'Current_5':tmp_BMS[4][2],'Temperature_5':tmp_BMS[4][3],'B_Status_5':tmp_BMS[4][4],'V_Status_5':tmp_BMS[4][5],'C_Status_5':tmp_BMS[4][6],'T_Status_5':tmp_BMS[4][7],
-                                  'SoC_6':tmp_BMS[5][0],'Voltage_6':tmp_BMS[5][1],'Current_6':tmp_BMS[5][2],'Temperature_6':tmp_BMS[5][3],'B_Status_6':tmp_BMS[5][4],'V_Status_6':tmp_BMS[5][5],'C_Status_6':tmp_BMS[5][6],'T_Status_6':tmp_BMS[5][7]})
-        elif tmp_n_modules == 7:
-            data_writer.writerow({'Time':tmp_time,
-                                  'SoC_1':tmp_BMS[0][0],'Voltage_1':tmp_BMS[0][1],'Current_1':tmp_BMS[0][2],'Temperature_1':tmp_BMS[0][3],'B_Status_1':tmp_BMS[0][4],'V_Status_1':tmp_BMS[0][5],'C_Status_1':tmp_BMS[0][6],'T_Status_1':tmp_BMS[0][7],
-                                  'SoC_2':tmp_BMS[1][0],'Voltage_2':tmp_BMS[1][1],'Current_2':tmp_BMS[1][2],'Temperature_2':tmp_BMS[1][3],'B_Status_2':tmp_BMS[1][4],'V_Status_2':tmp_BMS[1][5],'C_Status_2':tmp_BMS[1][6],'T_Status_2':tmp_BMS[1][7],
-                                  'SoC_3':tmp_BMS[2][0],'Voltage_3':tmp_BMS[2][1],'Current_3':tmp_BMS[2][2],'Temperature_3':tmp_BMS[2][3],'B_Status_3':tmp_BMS[2][4],'V_Status_3':tmp_BMS[2][5],'C_Status_3':tmp_BMS[2][6],'T_Status_3':tmp_BMS[2][7],
-                                  'SoC_4':tmp_BMS[3][0],'Voltage_4':tmp_BMS[3][1],'Current_4':tmp_BMS[3][2],'Temperature_4':tmp_BMS[3][3],'B_Status_4':tmp_BMS[3][4],'V_Status_4':tmp_BMS[3][5],'C_Status_4':tmp_BMS[3][6],'T_Status_4':tmp_BMS[3][7],
-                                  'SoC_5':tmp_BMS[4][0],'Voltage_5':tmp_BMS[4][1],'Current_5':tmp_BMS[4][2],'Temperature_5':tmp_BMS[4][3],'B_Status_5':tmp_BMS[4][4],'V_Status_5':tmp_BMS[4][5],'C_Status_5':tmp_BMS[4][6],'T_Status_5':tmp_BMS[4][7],
-                                  'SoC_6':tmp_BMS[5][0],'Voltage_6':tmp_BMS[5][1],'Current_6':tmp_BMS[5][2],'Temperature_6':tmp_BMS[5][3],'B_Status_6':tmp_BMS[5][4],'V_Status_6':tmp_BMS[5][5],'C_Status_6':tmp_BMS[5][6],'T_Status_6':tmp_BMS[5][7],
-                                  'SoC_7':tmp_BMS[6][0],'Voltage_7':tmp_BMS[6][1],'Current_7':tmp_BMS[6][2],'Temperature_7':tmp_BMS[6][3],'B_Status_7':tmp_BMS[6][4],'V_Status_7':tmp_BMS[6][5],'C_Status_7':tmp_BMS[6][6],'T_Status_7':tmp_BMS[6][7]})
-        elif tmp_n_modules == 8:
-            data_writer.writerow({'Time':tmp_time,
-                                  'SoC_1':tmp_BMS[0][0],'Voltage_1':tmp_BMS[0][1],'Current_1':tmp_BMS[0][2],'Temperature_1':tmp_BMS[0][3],'B_Status_1':tmp_BMS[0][4],'V_Status_1':tmp_BMS[0][5],'C_Status_1':tmp_BMS[0][6],'T_Status_1':tmp_BMS[0][7],
-                                  'SoC_2':tmp_BMS[1][0],'Voltage_2':tmp_BMS[1][1],'Current_2':tmp_BMS[1][2],'Temperature_2':tmp_BMS[1][3],'B_Status_2':tmp_BMS[1][4],'V_Status_2':tmp_BMS[1][5],'C_Status_2':tmp_BMS[1][6],'T_Status_2':tmp_BMS[1][7],
-                                  'SoC_3':tmp_BMS[2][0],'Voltage_3':tmp_BMS[2][1],'Current_3':tmp_BMS[2][2],'Temperature_3':tmp_BMS[2][3],'B_Status_3':tmp_BMS[2][4],'V_Status_3':tmp_BMS[2][5],'C_Status_3':tmp_BMS[2][6],'T_Status_3':tmp_BMS[2][7],
-                                  'SoC_4':tmp_BMS[3][0],'Voltage_4':tmp_BMS[3][1],'Current_4':tmp_BMS[3][2],'Temperature_4':tmp_BMS[3][3],'B_Status_4':tmp_BMS[3][4],'V_Status_4':tmp_BMS[3][5],'C_Status_4':tmp_BMS[3][6],'T_Status_4':tmp_BMS[3][7],
-                                  'SoC_5':tmp_BMS[4][0],'Voltage_5':tmp_BMS[4][1],'Current_5':tmp_BMS[4][2],'Temperature_5':tmp_BMS[4][3],'B_Status_5':tmp_BMS[4][4],'V_Status_5':tmp_BMS[4][5],'C_Status_5':tmp_BMS[4][6],'T_Status_5':tmp_BMS[4][7],
-                                  'SoC_6':tmp_BMS[5][0],'Voltage_6':tmp_BMS[5][1],'Current_6':tmp_BMS[5][2],'Temperature_6':tmp_BMS[5][3],'B_Status_6':tmp_BMS[5][4],'V_Status_6':tmp_BMS[5][5],'C_Status_6':tmp_BMS[5][6],'T_Status_6':tmp_BMS[5][7],
-                                  'SoC_7':tmp_BMS[6][0],'Voltage_7':tmp_BMS[6][1],'Current_7':tmp_BMS[6][2],'Temperature_7':tmp_BMS[6][3],'B_Status_7':tmp_BMS[6][4],'V_Status_7':tmp_BMS[6][5],'C_Status_7':tmp_BMS[6][6],'T_Status_7':tmp_BMS[6][7],
-                                  'SoC_8':tmp_BMS[7][0],'Voltage_8':tmp_BMS[7][1],'Current_8':tmp_BMS[7][2],'Temperature_8':tmp_BMS[7][3],'B_Status_8':tmp_BMS[7][4],'V_Status_8':tmp_BMS[7][5],'C_Status_8':tmp_BMS[7][6],'T_Status_8':tmp_BMS[7][7]})
-        else:
+        if not 1 <= tmp_n_modules <= 8:
             print("Unsuported number of battery modules. Only 1-8 modules are supported. The module number parsed is:" + str(tmp_n_modules))
-            csvfile.flush()
-            csvfile.close()
             return False
+        values = []
+        for module in BMS_LIST:
+            values += module  # BMS_Snapshot or plain list
+        return self.log_sink(PATH).write(values, NOW=record_time(BMS_LIST[0]))  # the time of the reading
 
-        csvfile.flush()
-        csvfile.close()
-        return True
+    def log_cells(self, CELLS, PATH='../var/Cell_log'):
+        """This function writes the cell values of the module read by read_cells into a '.csv' file.
+
+        Args:
+            PATH: path to the directory where the .csv file will be saved.
+            CELLS: tuple returned by read_cells.
+
+        Returns: Boolean value True
+
+        """
+        module, cell_voltage, cell_temperature, cell_balancing, cell_time = CELLS
+        values = [module]
+        for cells in (cell_voltage, cell_temperature, cell_balancing.astype(int)):
+            values += cells[module - 1].tolist()
+        return self.log_sink(PATH, HEADER=CELL_HEADER).write(values, NOW=datetime.datetime.fromtimestamp(cell_time[module - 1]))
+
+    def log_sink(self, PATH='../var/BMS_log', HEADER=LOG_HEADER):
+        """Returns the open CSV_Sink of a log directory, log_SoC and log_BMS share one file per day."""
+        if PATH not in self._log_sinks:
+            self._log_sinks[PATH] = CSV_Sink(PATH=PATH, HEADER=HEADER, FSYNC_INTERVAL=self._log_fsync_interval)
+        return self._log_sinks[PATH]
 
 
 
@@ -327,39 +542,12 @@ class US2000B(object):
 
         try:
             while True:
-                self._port.write(str.encode('pwr\r'))
-                time.sleep(0.5)
-                rec_str = str(self._port.read(2200), 'utf-8')
-                rec_int = re.findall(r'\d+', rec_str)
-                #Writes values into SOC_array and returns it.
-                if N_MODULES == 1:
-                    MESSAGE = "SoC"+"\t"+"N=1"+"\t"+"A="+str(rec_int[8])
-
-                elif N_MODULES == 2:
-                    MESSAGE = "SoC"+"\t"+"N=2"+"\t"+"A="+str(rec_int[8])+"\t"+"B="+str(rec_int[23])
-
-                elif N_MODULES == 3:
-                    MESSAGE = "SoC"+"\t"+"N=3"+"\t"+"A="+str(rec_int[8])+"\t"+"B="+str(rec_int[23])+"\t"+"C="+str(rec_int[38])
-
-                elif N_MODULES == 4:
-                    MESSAGE = "SoC"+"\t"+"N=4"+"\t"+"A="+str(rec_int[8])+"\t"+"B="+str(rec_int[23])+"\t"+"C="+str(rec_int[38])+"\t"+"D="+str(rec_int[53])
-
-                elif N_MODULES == 5:
-                    MESSAGE = "SoC"+"\t"+"N=5"+"\t"+"A="+str(rec_int[8])+"\t"+"B="+str(rec_int[23])+"\t"+"C="+str(rec_int[38])+"\t"+"D="+str(rec_int[53])+"\t"+"E="+str(rec_int[68])
-
-                elif N_MODULES == 6:
-                    MESSAGE = "SoC"+"\t"+"N=6"+"\t"+"A="+str(rec_int[8])+"\t"+"B="+str(rec_int[23])+"\t"+"C="+str(rec_int[38])+"\t"+"D="+str(rec_int[53])+"\t"+"E="+str(rec_int[68])+"\t"+"F="+str(rec_int[83])
-
-                elif N_MODULES == 7:
-                    MESSAGE = "SoC"+"\t"+"N=7"+"\t"+"A="+str(rec_int[8])+"\t"+"B="+str(rec_int[23])+"\t"+"C="+str(rec_int[38])+"\t"+"D="+str(rec_int[53])+"\t"+"E="+str(rec_int[68])+"\t"+"F="+str(rec_int[83])+"\t"+"G="+str(rec_int[98])
-
-                elif N_MODULES == 8:
-                    MESSAGE = "SoC"+"\t"+"N=8"+"\t"+"A="+str(rec_int[8])+"\t"+"B="+str(rec_int[23])+"\t"+"C="+str(rec_int[38])+"\t"+"D="+str(rec_int[53])+"\t"+"E="+str(rec_int[68])+"\t"+"F="+str(rec_int[83])+"\t"+"G="+str(rec_int[98])+"\t"+"H="+str(rec_int[113])
-
-                else:
+                MESSAGE = soc_message(self.read_pwr(), N_MODULES)
+                if MESSAGE is None:
                     print("ERROR number of modules not recognised please specify a number between 1 and 8")
                     sock.close()
                     return
+                MESSAGE = MESSAGE.encode()
                 sock.sendto(MESSAGE, (UDP_IP, UDP_PORT1))
                 sock.sendto(MESSAGE, (UDP_IP, UDP_PORT2))
                 sock.sendto(MESSAGE, (UDP_IP, UDP_PORT3))
@@ -389,75 +577,12 @@ class US2000B(object):
         try:
             while True:
 
-                self._port.write(str.encode('pwr\r'))
-                time.sleep(0.5)
-                rec_str = str(self._port.read(2200),'utf-8')
-                rec_int = re.findall(r'\d+', rec_str)
-                #Writes values into BMS_array and returns it.
-
-                if N_MODULES == 1:
-                    MESSAGE = "BMS" + "\t" + "N=1" + "\t" + "A=" + str(rec_int[8])+ "\t"+ str(rec_int[1])+ "\t"+ str(rec_int[2])+ "\t"+ str(rec_int[3])
-
-                elif N_MODULES == 2:
-                    MESSAGE = "BMS" + "\t" + "N=2"\
-                              + "\t" + "A=" + str(rec_int[8]) + "\t" + str(rec_int[1]) + "\t" + str(rec_int[2]) + "\t" + str(rec_int[3])\
-                              + "\t" + "B=" + str(rec_int[23]) + "\t" + str(rec_int[16]) + "\t" + str(rec_int[17]) + "\t" + str(rec_int[18])
-
-                elif N_MODULES == 3:
-                    MESSAGE = "BMS" + "\t" + "N=3" \
-                          + "\t" + "A=" + str(rec_int[8]) + "\t" + str(rec_int[1]) + "\t" + str(rec_int[2]) + "\t" + str(rec_int[3]) \
-                          + "\t" + "B=" + str(rec_int[23]) + "\t" + str(rec_int[16]) + "\t" + str(rec_int[17]) + "\t" + str(rec_int[18])\
-                          + "\t" + "C=" + str(rec_int[38]) + "\t" + str(rec_int[31]) + "\t" + str(rec_int[32]) + "\t" + str(rec_int[33])
-
-                elif N_MODULES == 4:
-                    MESSAGE = "BMS" + "\t" + "N=4" \
-                          + "\t" + "A=" + str(rec_int[8]) + "\t" + str(rec_int[1]) + "\t" + str(rec_int[2]) + "\t" + str(rec_int[3]) \
-                          + "\t" + "B=" + str(rec_int[23]) + "\t" + str(rec_int[16]) + "\t" + str(rec_int[17]) + "\t" + str(rec_int[18])\
-                          + "\t" + "C=" + str(rec_int[38]) + "\t" + str(rec_int[31]) + "\t" + str(rec_int[32]) + "\t" + str(rec_int[33])\
-                          + "\t" + "D=" + str(rec_int[53]) + "\t" + str(rec_int[46]) + "\t" + str(rec_int[47]) + "\t" + str(rec_int[48])
-
-                elif N_MODULES == 5:
-                    MESSAGE = "BMS" + "\t" + "N=5" \
-                          + "\t" + "A=" + str(rec_int[8]) + "\t" + str(rec_int[1]) + "\t" + str(rec_int[2]) + "\t" + str(rec_int[3]) \
-                          + "\t" + "B=" + str(rec_int[23]) + "\t" + str(rec_int[16]) + "\t" + str(rec_int[17]) + "\t" + str(rec_int[18])\
-                          + "\t" + "C=" + str(rec_int[38]) + "\t" + str(rec_int[31]) + "\t" + str(rec_int[32]) + "\t" + str(rec_int[33])\
-                          + "\t" + "D=" + str(rec_int[53]) + "\t" + str(rec_int[46]) + "\t" + str(rec_int[47]) + "\t" + str(rec_int[48])\
-                          + "\t" + "E=" + str(rec_int[68]) + "\t" + str(rec_int[61]) + "\t" + str(rec_int[62]) + "\t" + str(rec_int[63])
-
-                elif N_MODULES == 6:
-                    MESSAGE = "BMS" + "\t" + "N=6" \
-                          + "\t" + "A=" + str(rec_int[8]) + "\t" + str(rec_int[1]) + "\t" + str(rec_int[2]) + "\t" + str(rec_int[3]) \
-                          + "\t" + "B=" + str(rec_int[23]) + "\t" + str(rec_int[16]) + "\t" + str(rec_int[17]) + "\t" + str(rec_int[18])\
-                          + "\t" + "C=" + str(rec_int[38]) + "\t" + str(rec_int[31]) + "\t" + str(rec_int[32]) + "\t" + str(rec_int[33])\
-                          + "\t" + "D=" + str(rec_int[53]) + "\t" + str(rec_int[46]) + "\t" + str(rec_int[47]) + "\t" + str(rec_int[48])\
-                          + "\t" + "E=" + str(rec_int[68]) + "\t" + str(rec_int[61]) + "\t" + str(rec_int[62]) + "\t" + str(rec_int[63])\
-                          + "\t" + "F=" + str(rec_int[83]) + "\t" + str(rec_int[76]) + "\t" + str(rec_int[77]) + "\t" + str(rec_int[78])
-
-                elif N_MODULES == 7:
-                    MESSAGE = "BMS" + "\t" + "N=7" \
-                          + "\t" + "A=" + str(rec_int[8]) + "\t" + str(rec_int[1]) + "\t" + str(rec_int[2]) + "\t" + str(rec_int[3]) \
-                          + "\t" + "B=" + str(rec_int[23]) + "\t" + str(rec_int[16]) + "\t" + str(rec_int[17]) + "\t" + str(rec_int[18])\
-                          + "\t" + "C=" + str(rec_int[38]) + "\t" + str(rec_int[31]) + "\t" + str(rec_int[32]) + "\t" + str(rec_int[33])\
-                          + "\t" + "D=" + str(rec_int[53]) + "\t" + str(rec_int[46]) + "\t" + str(rec_int[47]) + "\t" + str(rec_int[48])\
-                          + "\t" + "E=" + str(rec_int[68]) + "\t" + str(rec_int[61]) + "\t" + str(rec_int[62]) + "\t" + str(rec_int[63])\
-                          + "\t" + "F=" + str(rec_int[83]) + "\t" + str(rec_int[76]) + "\t" + str(rec_int[77]) + "\t" + str(rec_int[78])\
-                          + "\t" + "G=" + str(rec_int[98]) + "\t" + str(rec_int[91]) + "\t" + str(rec_int[92]) + "\t" + str(rec_int[93])
-
-                elif N_MODULES == 8:
-                    MESSAGE = "BMS" + "\t" + "N=8" \
-                          + "\t" + "A=" + str(rec_int[8]) + "\t" + str(rec_int[1]) + "\t" + str(rec_int[2]) + "\t" + str(rec_int[3]) \
-                          + "\t" + "B=" + str(rec_int[23]) + "\t" + str(rec_int[16]) + "\t" + str(rec_int[17]) + "\t" + str(rec_int[18])\
-                          + "\t" + "C=" + str(rec_int[38]) + "\t" + str(rec_int[31]) + "\t" + str(rec_int[32]) + "\t" + str(rec_int[33])\
-                          + "\t" + "D=" + str(rec_int[53]) + "\t" + str(rec_int[46]) + "\t" + str(rec_int[47]) + "\t" + str(rec_int[48])\
-                          + "\t" + "E=" + str(rec_int[68]) + "\t" + str(rec_int[61]) + "\t" + str(rec_int[62]) + "\t" + str(rec_int[63])\
-                          + "\t" + "F=" + str(rec_int[83]) + "\t" + str(rec_int[76]) + "\t" + str(rec_int[77]) + "\t" + str(rec_int[78])\
-                          + "\t" + "G=" + str(rec_int[98]) + "\t" + str(rec_int[91]) + "\t" + str(rec_int[92]) + "\t" + str(rec_int[93])\
-                          + "\t" + "H=" + str(rec_int[113]) + "\t" + str(rec_int[106]) + "\t" + str(rec_int[107]) + "\t" + str(rec_int[108])
-
-                else:
+                MESSAGE = bms_message(self.read_pwr(), N_MODULES)
+                if MESSAGE is None:
                     sock.close()
                     print("ERROR number of modules not recognised please specify a number between 1 and 8")
                     return
+                MESSAGE = MESSAGE.encode()
 
                 sock.sendto(MESSAGE, (UDP_IP, UDP_PORT1))
                 sock.sendto(MESSAGE, (UDP_IP, UDP_PORT2))
@@ -510,77 +635,12 @@ class US2000B_socket_BMS_Thread(threading.Thread):
         try:
             while not self._stopevent.isSet():
 
-                self._port.write(str.encode('pwr\r'))
-                time.sleep(0.5)
-                rec_str = str(self._port.read(2200),'utf-8')
-                rec_int = re.findall(r'\d+', rec_str)
-                # Writes values into BMS_array and returns it.
-
-                if self.N_MODULES == 1:
-                    MESSAGE = "BMS" + "\t" + "N=1" + "\t" + "A=" + str(rec_int[8]) + "\t" + str(
-                        rec_int[1]) + "\t" + str(rec_int[2]) + "\t" + str(rec_int[3])
-
-                elif self.N_MODULES == 2:
-                    MESSAGE = "BMS" + "\t" + "N=2"\
-                              + "\t" + "A=" + str(rec_int[8]) + "\t" + str(rec_int[1]) + "\t" + str(rec_int[2]) + "\t" + str(rec_int[3])\
-                              + "\t" + "B=" + str(rec_int[23]) + "\t" + str(rec_int[16]) + "\t" + str(rec_int[17]) + "\t" + str(rec_int[18])
-
-                elif self.N_MODULES == 3:
-                    MESSAGE = "BMS" + "\t" + "N=3" \
-                          + "\t" + "A=" + str(rec_int[8]) + "\t" + str(rec_int[1]) + "\t" + str(rec_int[2]) + "\t" + str(rec_int[3]) \
-                          + "\t" + "B=" + str(rec_int[23]) + "\t" + str(rec_int[16]) + "\t" + str(rec_int[17]) + "\t" + str(rec_int[18])\
-                          + "\t" + "C=" + str(rec_int[38]) + "\t" + str(rec_int[31]) + "\t" + str(rec_int[32]) + "\t" + str(rec_int[33])
-
-                elif self.N_MODULES == 4:
-                    MESSAGE = "BMS" + "\t" + "N=4" \
-                          + "\t" + "A=" + str(rec_int[8]) + "\t" + str(rec_int[1]) + "\t" + str(rec_int[2]) + "\t" + str(rec_int[3]) \
-                          + "\t" + "B=" + str(rec_int[23]) + "\t" + str(rec_int[16]) + "\t" + str(rec_int[17]) + "\t" + str(rec_int[18])\
-                          + "\t" + "C=" + str(rec_int[38]) + "\t" + str(rec_int[31]) + "\t" + str(rec_int[32]) + "\t" + str(rec_int[33])\
-                          + "\t" + "D=" + str(rec_int[53]) + "\t" + str(rec_int[46]) + "\t" + str(rec_int[47]) + "\t" + str(rec_int[48])
-
-                elif self.N_MODULES == 5:
-                    MESSAGE = "BMS" + "\t" + "N=5" \
-                          + "\t" + "A=" + str(rec_int[8]) + "\t" + str(rec_int[1]) + "\t" + str(rec_int[2]) + "\t" + str(rec_int[3]) \
-                          + "\t" + "B=" + str(rec_int[23]) + "\t" + str(rec_int[16]) + "\t" + str(rec_int[17]) + "\t" + str(rec_int[18])\
-                          + "\t" + "C=" + str(rec_int[38]) + "\t" + str(rec_int[31]) + "\t" + str(rec_int[32]) + "\t" + str(rec_int[33])\
-                          + "\t" + "D=" + str(rec_int[53]) + "\t" + str(rec_int[46]) + "\t" + str(rec_int[47]) + "\t" + str(rec_int[48])\
-                          + "\t" + "E=" + str(rec_int[68]) + "\t" + str(rec_int[61]) + "\t" + str(rec_int[62]) + "\t" + str(rec_int[63])
-
-                elif self.N_MODULES == 6:
-                    MESSAGE = "BMS" + "\t" + "N=6" \
-                          + "\t" + "A=" + str(rec_int[8]) + "\t" + str(rec_int[1]) + "\t" + str(rec_int[2]) + "\t" + str(rec_int[3]) \
-                          + "\t" + "B=" + str(rec_int[23]) + "\t" + str(rec_int[16]) + "\t" + str(rec_int[17]) + "\t" + str(rec_int[18])\
-                          + "\t" + "C=" + str(rec_int[38]) + "\t" + str(rec_int[31]) + "\t" + str(rec_int[32]) + "\t" + str(rec_int[33])\
-                          + "\t" + "D=" + str(rec_int[53]) + "\t" + str(rec_int[46]) + "\t" + str(rec_int[47]) + "\t" + str(rec_int[48])\
-                          + "\t" + "E=" + str(rec_int[68]) + "\t" + str(rec_int[61]) + "\t" + str(rec_int[62]) + "\t" + str(rec_int[63])\
-                          + "\t" + "F=" + str(rec_int[83]) + "\t" + str(rec_int[76]) + "\t" + str(rec_int[77]) + "\t" + str(rec_int[78])
-
-                elif self.N_MODULES == 7:
-                    MESSAGE = "BMS" + "\t" + "N=7" \
-                          + "\t" + "A=" + str(rec_int[8]) + "\t" + str(rec_int[1]) + "\t" + str(rec_int[2]) + "\t" + str(rec_int[3]) \
-                          + "\t" + "B=" + str(rec_int[23]) + "\t" + str(rec_int[16]) + "\t" + str(rec_int[17]) + "\t" + str(rec_int[18])\
-                          + "\t" + "C=" + str(rec_int[38]) + "\t" + str(rec_int[31]) + "\t" + str(rec_int[32]) + "\t" + str(rec_int[33])\
-                          + "\t" + "D=" + str(rec_int[53]) + "\t" + str(rec_int[46]) + "\t" + str(rec_int[47]) + "\t" + str(rec_int[48])\
-                          + "\t" + "E=" + str(rec_int[68]) + "\t" + str(rec_int[61]) + "\t" + str(rec_int[62]) + "\t" + str(rec_int[63])\
-                          + "\t" + "F=" + str(rec_int[83]) + "\t" + str(rec_int[76]) + "\t" + str(rec_int[77]) + "\t" + str(rec_int[78])\
-                          + "\t" + "G=" + str(rec_int[98]) + "\t" + str(rec_int[91]) + "\t" + str(rec_int[92]) + "\t" + str(rec_int[93])
-
-                elif self.N_MODULES == 8:
-                    MESSAGE = "BMS" + "\t" + "N=8" \
-                          + "\t" + "A=" + str(rec_int[8]) + "\t" + str(rec_int[1]) + "\t" + str(rec_int[2]) + "\t" + str(rec_int[3]) \
-                          + "\t" + "B=" + str(rec_int[23]) + "\t" + str(rec_int[16]) + "\t" + str(rec_int[17]) + "\t" + str(rec_int[18])\
-                          + "\t" + "C=" + str(rec_int[38]) + "\t" + str(rec_int[31]) + "\t" + str(rec_int[32]) + "\t" + str(rec_int[33])\
-                          + "\t" + "D=" + str(rec_int[53]) + "\t" + str(rec_int[46]) + "\t" + str(rec_int[47]) + "\t" + str(rec_int[48])\
-                          + "\t" + "E=" + str(rec_int[68]) + "\t" + str(rec_int[61]) + "\t" + str(rec_int[62]) + "\t" + str(rec_int[63])\
-                          + "\t" + "F=" + str(rec_int[83]) + "\t" + str(rec_int[76]) + "\t" + str(rec_int[77]) + "\t" + str(rec_int[78])\
-                          + "\t" + "G=" + str(rec_int[98]) + "\t" + str(rec_int[91]) + "\t" + str(rec_int[92]) + "\t" + str(rec_int[93])\
-                          + "\t" + "H=" + str(rec_int[113]) + "\t" + str(rec_int[106]) + "\t" + str(rec_int[107]) + "\t" + str(rec_int[108])
-
-
-                else:
+                MESSAGE = bms_message(BMS.read_pwr(), self.N_MODULES)
+                if MESSAGE is None:
                     sock.close()
                     print("ERROR number of modules not recognised please specify a number between 1 and 8")
                     return
+                MESSAGE = MESSAGE.encode()
 
                 sock.sendto(MESSAGE, (self.UDP_IP, self.UDP_PORT1))
                 sock.sendto(MESSAGE, (self.UDP_IP, self.UDP_PORT2))
@@ -636,39 +696,12 @@ class US2000B_socket_SoC_Thread(threading.Thread):
         try:
             while not self._stopevent.isSet():
 
-                self._port.write(str.encode('pwr\r'))
-                time.sleep(0.5)
-                rec_str = str(self._port.read(2200),'utf-8')
-                rec_int = re.findall(r'\d+', rec_str)
-                #Writes values into SOC_array and returns it.
-                if self.N_MODULES == 1:
-                    MESSAGE = "SoC"+"\t"+"N=1"+"\t"+"A="+str(rec_int[8])
-
-                elif self.N_MODULES == 2:
-                    MESSAGE = "SoC"+"\t"+"N=2"+"\t"+"A="+str(rec_int[8])+"\t"+"B="+str(rec_int[23])
-
-                elif self.N_MODULES == 3:
-                    MESSAGE = "SoC"+"\t"+"N=3"+"\t"+"A="+str(rec_int[8])+"\t"+"B="+str(rec_int[23])+"\t"+"C="+str(rec_int[38])
-
-                elif self.N_MODULES == 4:
-                    MESSAGE = "SoC"+"\t"+"N=4"+"\t"+"A="+str(rec_int[8])+"\t"+"B="+str(rec_int[23])+"\t"+"C="+str(rec_int[38])+"\t"+"D="+str(rec_int[53])
-
-                elif self.N_MODULES == 5:
-                    MESSAGE = "SoC"+"\t"+"N=5"+"\t"+"A="+str(rec_int[8])+"\t"+"B="+str(rec_int[23])+"\t"+"C="+str(rec_int[38])+"\t"+"D="+str(rec_int[53])+"\t"+"E="+str(rec_int[68])
-
-                elif self.N_MODULES == 6:
-                    MESSAGE = "SoC"+"\t"+"N=6"+"\t"+"A="+str(rec_int[8])+"\t"+"B="+str(rec_int[23])+"\t"+"C="+str(rec_int[38])+"\t"+"D="+str(rec_int[53])+"\t"+"E="+str(rec_int[68])+"\t"+"F="+str(rec_int[83])
-
-                elif self.N_MODULES == 7:
-                    MESSAGE = "SoC"+"\t"+"N=7"+"\t"+"A="+str(rec_int[8])+"\t"+"B="+str(rec_int[23])+"\t"+"C="+str(rec_int[38])+"\t"+"D="+str(rec_int[53])+"\t"+"E="+str(rec_int[68])+"\t"+"F="+str(rec_int[83])+"\t"+"G="+str(rec_int[98])
-
-                elif self.N_MODULES == 8:
-                    MESSAGE = "SoC"+"\t"+"N=8"+"\t"+"A="+str(rec_int[8])+"\t"+"B="+str(rec_int[23])+"\t"+"C="+str(rec_int[38])+"\t"+"D="+str(rec_int[53])+"\t"+"E="+str(rec_int[68])+"\t"+"F="+str(rec_int[83])+"\t"+"G="+str(rec_int[98])+"\t"+"H="+str(rec_int[113])
-
-                else:
+                MESSAGE = soc_message(BMS.read_pwr(), self.N_MODULES)
+                if MESSAGE is None:
                     print("ERROR number of modules not recognised please specify a number between 1 and 8")
                     sock.close()
                     return
+                MESSAGE = MESSAGE.encode()
                 sock.sendto(MESSAGE, (self.UDP_IP, self.UDP_PORT1))
                 sock.sendto(MESSAGE, (self.UDP_IP, self.UDP_PORT2))
                 sock.sendto(MESSAGE, (self.UDP_IP, self.UDP_PORT3))
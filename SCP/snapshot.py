@@ -0,0 +1,69 @@
+""" This module contains the base class of the snapshot records of the devices.
+
+**Description:**
+
+    A snapshot record holds the values of one reading of a device, e.g. one battery module of
+    US2000B.read_BMS or the inverter of XW.read_Inverter_All, as named attributes in __slots__
+    and the unix time of the acquisition ('time'). The values are used by name, e.g.:
+        modules = PYLONTECH.read_BMS(N_MODULES=6)
+        modules[0].soc, modules[0].time
+    values() returns all values as tuple in the column order of the device table with one
+    C call, so the records are written into the logs and the mysql tables without copying
+    field by field. A record is also a read-only sequence of its values, so code that indexes
+    the former lists by position keeps working.
+
+"""
+import datetime
+import operator
+import time
+
+
+# EMBEDDING Snapshot CLASS ----------------------------------------------------
+
+class Snapshot(object):
+    """This class is the base class of the snapshot records, subclasses define FIELDS and __slots__ = FIELDS"""
+
+    __slots__ = ('time',)
+    FIELDS = ()  # names of the values in the column order of the device table
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        fields = tuple(cls.FIELDS)
+        if len(fields) < 2:
+            # attrgetter needs a name and returns a bare value for a single name
+            cls._getter = staticmethod(lambda RECORD: tuple(getattr(RECORD, name) for name in fields))
+        else:
+            cls._getter = operator.attrgetter(*fields)
+
+    def __init__(self, VALUES=(), TIME=None):
+        ''' Constructor for this class. '''
+        values = tuple(VALUES)
+        for i, name in enumerate(self.FIELDS):
+            setattr(self, name, values[i] if i < len(values) else None)
+        self.time = time.time() if TIME is None else TIME  # unix time of the acquisition
+
+    def values(self):
+        """Returns the values as tuple in the order of FIELDS."""
+        return self._getter(self)
+
+    def as_dict(self):
+        """Returns the values as dict {field name: value}."""
+        return dict(zip(self.FIELDS, self.values()))
+
+    def __iter__(self):
+        return iter(self.values())
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def __getitem__(self, INDEX):
+        return self.values()[INDEX]
+
+    def __repr__(self):
+        return type(self).__name__ + '(' + ', '.join(name + '=' + repr(value) for name, value in self.as_dict().items()) + ')'
+
+
+def record_time(RECORD):
+    """Returns the acquisition time of a snapshot record as datetime, None for other rows, e.g. plain lists."""
+    acquired = getattr(RECORD, 'time', None)
+    return None if acquired is None else datetime.datetime.fromtimestamp(acquired)
@@ -0,0 +1,109 @@
+""" This module contains the tick scheduler of the control loop.
+
+**Description:**
+
+    The ticks of the control loop are fired on a fixed grid of PERIOD seconds, which is
+    aligned to the boundaries of the wall clock, e.g. at :00 and :30 of every minute for a
+    period of 30 seconds. The deadlines are kept on the monotonic clock, so the time spent
+    reading the devices does not delay the next tick and the period does not drift. The
+    grid is aligned to the wall clock again if the wall clock was set by more than RESYNC
+    seconds.
+    If a tick takes longer than the period (overrun), the missed deadlines are skipped and
+    the next tick starts on the grid again; with SKIP_OVERRUNS=False the late tick starts
+    immediately instead and is flagged as late.
+    The scheduler keeps rolling statistics of the last WINDOW ticks, which can be queried at
+    runtime with stats() or report():
+        duration:   time from the start of a tick until the next call of wait()
+        jitter:     time between a deadline and the actual wake up
+        missed:     number of skipped deadlines
+
+"""
+import numpy as np
+import collections
+import datetime
+import math
+import time
+
+
+# EMBEDDING Tick_Scheduler CLASS ----------------------------------------------------
+
+class Tick_Scheduler(object):
+    """This class implements drift-free ticks on a fixed grid aligned to the wall clock"""
+
+    def __init__(self, PERIOD=30.0, OFFSET=0.0, SKIP_OVERRUNS=True, WINDOW=1000, RESYNC=1.0):
+        ''' Constructor for this class. '''
+        self.PERIOD = float(PERIOD)
+        self.OFFSET = float(OFFSET)  # seconds after the wall clock boundary
+        self.SKIP_OVERRUNS = SKIP_OVERRUNS
+        self.RESYNC = RESYNC
+        self._durations = collections.deque(maxlen=WINDOW)
+        self._jitter = collections.deque(maxlen=WINDOW)
+        self._deadline = None  # monotonic time of the next tick
+        self._wall_offset = None  # wall clock - monotonic clock when the grid was aligned
+        self._tick_start = None
+        self.ticks = 0
+        self.missed = 0  # skipped deadlines
+        self.overruns = 0  # ticks that took longer than the period
+        self.late = False  # the current tick started after its deadline (overrun without SKIP_OVERRUNS)
+
+    def _align(self, NOW):
+        """Aligns the next deadline to the wall clock grid."""
+        wall = time.time()
+        self._wall_offset = wall - NOW
+        next_wall = (math.floor((wall - self.OFFSET) / self.PERIOD) + 1) * self.PERIOD + self.OFFSET
+        self._deadline = NOW + next_wall - wall
+
+    def wait(self):
+        """This function ends the current tick and sleeps until the deadline of the next tick.
+
+        Returns: datetime of the tick on the wall clock grid
+
+        """
+        now = time.monotonic()
+        if self._tick_start is not None:
+            self._durations.append(now - self._tick_start)
+        self.late = False
+        if self._deadline is None or abs(time.time() - now - self._wall_offset) > self.RESYNC:
+            self._align(now)  # first tick, or the wall clock was set
+        else:
+            self._deadline += self.PERIOD
+            if now > self._deadline:
+                self.overruns += 1
+                self.late = not self.SKIP_OVERRUNS
+                behind = math.floor((now - self._deadline) / self.PERIOD)  # deadlines that are a whole period in the past
+                if self.SKIP_OVERRUNS:
+                    behind += 1
+                self.missed += behind
+                self._deadline += behind * self.PERIOD
+        delay = self._deadline - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self._tick_start = time.monotonic()
+        self._jitter.append(self._tick_start - self._deadline)
+        self.ticks += 1
+        return datetime.datetime.fromtimestamp(round(self._deadline + self._wall_offset, 3))
+
+    def stats(self):
+        """This function returns the statistics of the last WINDOW ticks.
+
+        Returns: dict {'ticks', 'missed', 'overruns', 'duration_p50', 'duration_p99', 'duration_max',
+            'jitter_p50', 'jitter_p99', 'jitter_max'}, times in seconds, NaN without ticks
+
+        """
+        result = {'ticks': self.ticks, 'missed': self.missed, 'overruns': self.overruns}
+        for name, values in (('duration', self._durations), ('jitter', self._jitter)):
+            values = np.array(values, dtype=np.float64)
+            if len(values):
+                result[name + '_p50'], result[name + '_p99'] = np.percentile(values, (50, 99))
+                result[name + '_max'] = values.max()
+            else:
+                result[name + '_p50'] = result[name + '_p99'] = result[name + '_max'] = np.nan
+        return result
+
+    def report(self):
+        """Returns the statistics as a single line string."""
+        stats = self.stats()
+        return ('Ticks: %d, missed: %d, overruns: %d, duration p50/p99/max: %.2f/%.2f/%.2f s, '
+                'jitter p50/p99/max: %.1f/%.1f/%.1f ms' %
+                (stats['ticks'], stats['missed'], stats['overruns'], stats['duration_p50'], stats['duration_p99'],
+                 stats['duration_max'], 1000 * stats['jitter_p50'], 1000 * stats['jitter_p99'], 1000 * stats['jitter_max']))
@@ -37,6 +37,8 @@ CREATE TABLE `pylontech_bms` (
   `t_status` varchar(32) DEFAULT (NULL),
   PRIMARY KEY (`ts`,`device_name`),
   KEY `idx` (`device_name`,`ts`)
-) ENGINE=InnoDB DEFAULT CHARSET=latin1;
+) ENGINE=InnoDB DEFAULT CHARSET=latin1
+/*!50500 PARTITION BY RANGE  COLUMNS(ts)
+(PARTITION pmax VALUES LESS THAN (MAXVALUE) ENGINE = InnoDB) */;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
@@ -38,12 +38,14 @@ CREATE TABLE `conext_mppt` (
   `energy_pv_week` float DEFAULT (NULL),
   `energy_pv_month` float DEFAULT (NULL),
   `energy_pv_year` float DEFAULT (NULL),
-  `mppt_status` varchar(32) DEFAULT (NULL),
-  `mppt_charger_status` varchar(32) DEFAULT (NULL),
-  `mppt_active_warnings_status` varchar(32) DEFAULT (NULL),
-  `mppt_active_faults_status` varchar(32) DEFAULT (NULL),
+  `mppt_status` smallint unsigned DEFAULT (NULL),
+  `mppt_charger_status` smallint unsigned DEFAULT (NULL),
+  `mppt_active_warnings_status` smallint unsigned DEFAULT (NULL),
+  `mppt_active_faults_status` smallint unsigned DEFAULT (NULL),
   PRIMARY KEY (`ts`,`device_name`),
   KEY `idx` (`device_name`,`ts`)
-) ENGINE=InnoDB DEFAULT CHARSET=latin1;
+) ENGINE=InnoDB DEFAULT CHARSET=latin1
+/*!50500 PARTITION BY RANGE  COLUMNS(ts)
+(PARTITION pmax VALUES LESS THAN (MAXVALUE) ENGINE = InnoDB) */;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
@@ -43,13 +43,15 @@ CREATE TABLE `conext_xw` (
   `battery_low_voltage` float DEFAULT (NULL),
   `battery_low_voltage_delay` float DEFAULT (NULL),
   `battery_hysteresis` float DEFAULT (NULL),
-  `inverter_status` varchar(32) DEFAULT (NULL),
-  `inverter_active_warnings_status` varchar(32) DEFAULT (NULL),
-  `inverter_active_faults_status` varchar(32) DEFAULT (NULL),
-  `inverter_grid_support_status` varchar(32) DEFAULT (NULL),
-  `inverter_load_shave_status` varchar(32) DEFAULT (NULL),
+  `inverter_status` smallint unsigned DEFAULT (NULL),
+  `inverter_active_warnings_status` smallint unsigned DEFAULT (NULL),
+  `inverter_active_faults_status` smallint unsigned DEFAULT (NULL),
+  `inverter_grid_support_status` smallint unsigned DEFAULT (NULL),
+  `inverter_load_shave_status` smallint unsigned DEFAULT (NULL),
   PRIMARY KEY (`ts`,`device_name`),
   KEY `idx` (`device_name`,`ts`)
-) ENGINE=InnoDB DEFAULT CHARSET=latin1;
+) ENGINE=InnoDB DEFAULT CHARSET=latin1
+/*!50500 PARTITION BY RANGE  COLUMNS(ts)
+(PARTITION pmax VALUES LESS THAN (MAXVALUE) ENGINE = InnoDB) */;
 /*!40101 SET character_set_client = @saved_cs_client */;
 